@@ -7,11 +7,17 @@ Desc:   Perform a classification procedure on the input data set and output
 """
 
 import sys
+import shutil
 import logging
+import tempfile
 import ConfigParser
+import multiprocessing
 from time import time
 
+import numpy
+
 from sklearn import metrics
+from sklearn.base import clone
 from sklearn import tree
 from sklearn import cross_validation
 from sklearn import naive_bayes
@@ -20,11 +26,44 @@ from sklearn import neighbors
 from sklearn import ensemble
 
 from vectorize_data import vectorize_data
+from reduction import densify, keep_sparse
+from options import get_option
+from parallel_run import run_algorithms, report, worker_count
+from parallel_run import share_matrix, attach_matrix
+from metrics_log import emit_record
+from model_store import save_vectorizer, save_estimator
+from memory import MemoryWatch
+from profiling import Phase
+from sparse_classifier import SparseKNeighborsClassifier
 
 
 
 # Run classifying algorithm {{{
-def run_classification( classifier, data, labels ):
+def run_classification( classifier, data, labels, config=None, name=None,
+                        reduction=None ):
+    """
+    Classify: using a predefined and parameterized classifier, fit a training
+    split of the dataset and measure its accuracy on the held out split.
+
+        classifier: the classification algorithm, from sklearn
+        data:       array-like dataset input
+        labels:     vector of ground-truth labels
+        config:     ConfigParser with documented fields, for the metrics log
+        name:       the algorithm name, for the metrics log
+        reduction:  the fitted TruncatedSVD the data was reduced by, if any,
+                    saved with the classifier
+
+    With [crossval] n_folds of 2 or more, stratified k-fold cross
+    validation is run instead of a single split; see run_cross_validation.
+
+    Returns a dictionary of the metrics computed.
+    """
+
+    if config is not None:
+        n_folds = get_option( config, "crossval", "n_folds", 0 )
+        if n_folds >= 2:
+            return run_cross_validation( classifier, data, labels, n_folds,
+                                         config, name, reduction )
 
     X_train, X_test, y_train, y_test = cross_validation.train_test_split(
         data,
@@ -33,24 +72,251 @@ def run_classification( classifier, data, labels ):
         random_state=0
     )
 
-    # Time the operation
-    t0 = time()
-    classifier.fit(X_train, y_train)
-    t1 = time()
+    # Time the operation, and measure its memory
+    with MemoryWatch() as memory:
+        t0 = time()
+        with Phase( "fit", config, name ):
+            classifier.fit(X_train, y_train)
+        t1 = time()
 
-    y_predict = classifier.predict(X_test)
+        with Phase( "predict", config, name ) as phase:
+            y_predict = classifier.predict(X_test)
+            phase.add( posts=len( y_test ) )
+        t2 = time()
+    peak_rss = memory.peak_mb
 
     # Perform metrics
+    metrics_phase = Phase( "metrics", config, name )
+    metrics_phase.start()
+
     runtime               = (t1 - t0)
+    predict_time          = (t2 - t1)
     accuracy              = metrics.accuracy_score(y_test, y_predict)
     classification_report = metrics.classification_report(y_test, y_predict)
     confusion_matrix      = metrics.confusion_matrix(y_test, y_predict)
 
+    metrics_phase.report()
+
     # Output to logs
     logging.info("  |-        Execution time: %fs"   % runtime)
+    logging.info("  |-       Prediction time: %fs"   % predict_time)
     logging.info("  |-              Accuracy: %0.3f" % accuracy)
     logging.info("  |-          Confusion Matrix:\n" + str (confusion_matrix))
     logging.info("\n|-             Classification Report:\n" + str(classification_report))
+
+    results = {
+        "runtime":      runtime,
+        "predict_time": predict_time,
+        "accuracy":     accuracy,
+    }
+
+    # Write a machine-readable record
+    if config is not None:
+        timings = {
+            "fit_time":     runtime,
+            "predict_time": predict_time,
+            "peak_rss_mb":  peak_rss,
+        }
+        emit_record( config, "classifier", name, data, timings, results )
+        save_estimator( config, name, classifier, data, reduction )
+
+    return results
+# }}}
+
+
+
+# Fit Fold {{{
+def fit_fold( classifier, data, labels, train, test ):
+    """
+    Fit Fold: fit a fresh copy of the classifier on the training rows of one
+    fold and predict its test rows. Returns a dictionary of the fold's fit
+    and predict times, accuracy, predictions and peak memory.
+
+    classifier: the (unfitted) classification algorithm, from sklearn
+    data:       array-like dataset input
+    labels:     numpy array of ground-truth labels
+    train:      indices of the training rows
+    test:       indices of the test rows
+
+    """
+
+    classifier = clone( classifier )
+
+    with MemoryWatch() as memory:
+        t0 = time()
+        classifier.fit( data[ train ], labels[ train ] )
+        t1 = time()
+        y_predict = classifier.predict( data[ test ] )
+        t2 = time()
+
+    return {
+        "fit_time":     t1 - t0,
+        "predict_time": t2 - t1,
+        "accuracy":     metrics.accuracy_score( labels[ test ], y_predict ),
+        "predicted":    y_predict,
+        "peak_rss_mb":  memory.peak_mb,
+    }
+# }}}
+
+
+
+# Run Fold {{{
+def run_fold( job ):
+    """
+    Run Fold: worker entry point. Maps the shared corpus and fits a single
+    fold over it.
+
+    job: a (path, classifier, train, test) tuple
+
+    """
+
+    (path, classifier, train, test) = job
+
+    (data, labels) = attach_matrix( path )
+
+    return fit_fold( classifier, data, numpy.asarray( labels ), train, test )
+# }}}
+
+
+
+# Run Folds {{{
+def run_folds( classifier, data, labels, folds, config ):
+    """
+    Run Folds: fit every fold, fanned out to a process pool if [crossval]
+    n_jobs allows more than one at a time. The corpus is written once as
+    memory-mapped arrays which every worker maps, rather than pickled to
+    each of them. Returns the list of fold results, in fold order.
+
+    classifier: the (unfitted) classification algorithm, from sklearn
+    data:       array-like dataset input
+    labels:     numpy array of ground-truth labels
+    folds:      list of (train, test) index arrays
+    config:     ConfigParser with documented fields
+
+    """
+
+    n_workers = worker_count( len( folds ), config, section="crossval" )
+
+    # daemonic workers (eg. algorithms run concurrently) can't fork
+    if multiprocessing.current_process().daemon:
+        n_workers = 1
+
+    # Serial execution {{{
+    if n_workers <= 1:
+        return [fit_fold( classifier, data, labels, train, test )
+                for (train, test) in folds]
+    # }}}
+
+    # Parallel execution {{{
+    logging.info("Fitting %d folds with %d workers." %
+                 (len( folds ), n_workers) )
+
+    path = tempfile.mkdtemp( prefix="stackmining-" )
+
+    try:
+        share_matrix( path, data, labels )
+
+        jobs = [(path, classifier, train, test) for (train, test) in folds]
+
+        pool = multiprocessing.Pool( processes=n_workers )
+        try:
+            results = pool.map( run_fold, jobs, chunksize=1 )
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree( path, ignore_errors=True )
+
+    return results
+    # }}}
+# }}}
+
+
+
+# Run Cross Validation {{{
+def run_cross_validation( classifier, data, labels, n_folds, config, name,
+                          reduction=None ):
+    """
+    Cross Validate: fit and score the classifier on each fold of a
+    stratified k-fold split, in parallel if configured, and report the mean
+    and standard deviation of its accuracy and timings. The classification
+    report covers the held out predictions of every fold together. If the
+    model is saved, the classifier is then refitted on every row.
+
+        classifier: the classification algorithm, from sklearn
+        data:       array-like dataset input
+        labels:     vector of ground-truth labels
+        n_folds:    number of folds
+        config:     ConfigParser with documented fields
+        name:       the algorithm name, for the metrics log
+        reduction:  the fitted TruncatedSVD the data was reduced by, if any,
+                    saved with the classifier
+
+    Returns a dictionary of the metrics computed.
+    """
+
+    labels = numpy.asarray( labels )
+    folds  = list( cross_validation.StratifiedKFold( labels, n_folds ) )
+
+    with MemoryWatch() as memory:
+        with Phase( "crossval", config, name ) as phase:
+            fold_results = run_folds( classifier, data, labels, folds,
+                                      config )
+            phase.add( posts=len( labels ) )
+
+    # folds fitted in workers report their own peaks
+    peak_rss = max( [memory.peak_mb] +
+                    [fold["peak_rss_mb"] for fold in fold_results] )
+
+    # Perform metrics
+    accuracies    = numpy.array( [fold["accuracy"] for fold in fold_results] )
+    fit_times     = numpy.array( [fold["fit_time"] for fold in fold_results] )
+    predict_times = numpy.array( [fold["predict_time"]
+                                  for fold in fold_results] )
+
+    y_predict = numpy.empty( len( labels ), dtype=labels.dtype )
+    for ((train, test), fold) in zip( folds, fold_results ):
+        y_predict[ test ] = fold["predicted"]
+
+    classification_report = metrics.classification_report(labels, y_predict)
+    confusion_matrix      = metrics.confusion_matrix(labels, y_predict)
+
+    # Output to logs
+    logging.info("  |-                 Folds: %d" % n_folds)
+    logging.info("  |-        Execution time: %fs (+/- %fs)" %
+                 (fit_times.mean(), fit_times.std()))
+    logging.info("  |-       Prediction time: %fs (+/- %fs)" %
+                 (predict_times.mean(), predict_times.std()))
+    logging.info("  |-              Accuracy: %0.3f (+/- %0.3f)" %
+                 (accuracies.mean(), accuracies.std()))
+    logging.info("  |-          Confusion Matrix:\n" + str (confusion_matrix))
+    logging.info("\n|-             Classification Report:\n" + str(classification_report))
+
+    results = {
+        "runtime":          fit_times.mean(),
+        "runtime_std":      fit_times.std(),
+        "predict_time":     predict_times.mean(),
+        "predict_time_std": predict_times.std(),
+        "accuracy":         accuracies.mean(),
+        "accuracy_std":     accuracies.std(),
+    }
+
+    # Write a machine-readable record
+    timings = {
+        "fit_time":     fit_times.mean(),
+        "predict_time": predict_times.mean(),
+        "peak_rss_mb":  peak_rss,
+    }
+    emit_record( config, "classifier", name, data, timings, results )
+
+    # Every fold left rows out, so save a fit over all of them
+    if get_option( config, "output", "model_dir", "" ) and name is not None:
+        classifier = clone( classifier )
+        with Phase( "fit", config, name ):
+            classifier.fit( data, labels )
+        save_estimator( config, name, classifier, data, reduction )
+
+    return results
 # }}}
 
 
@@ -65,8 +331,8 @@ def do_dtree( data, labels, config ):
     )
 
     logging.info("Beginning Decision Tree classification.")
-    data = data.toarray()
-    run_classification( dt, data, labels )
+    (data, svd) = densify( data, config )
+    return run_classification( dt, data, labels, config, "dtree", svd )
 # }}}
 
 
@@ -77,8 +343,9 @@ def do_randomForest( data, labels, config ):
     rf = ensemble.RandomForestClassifier()
 
     logging.info("Beginning Random Forest classification.")
-    data = data.toarray()
-    run_classification( rf, data, labels )
+    (data, svd) = densify( data, config )
+    return run_classification( rf, data, labels, config, "randomforest",
+                               svd )
 # }}}
 
 
@@ -86,11 +353,19 @@ def do_randomForest( data, labels, config ):
 # Perform NaiveBayes {{{
 def do_naiveBayes( data, labels, config ):
 
-    nb = naive_bayes.GaussianNB()
+    model = get_option( config, "nbayes", "model", "gaussian" )
+
+    # multinomial naive bayes works directly on the sparse term weights
+    svd = None
+    if model == "multinomial":
+        nb = naive_bayes.MultinomialNB()
+        data = keep_sparse( data )
+    else:
+        nb = naive_bayes.GaussianNB()
+        (data, svd) = densify( data, config )
 
     logging.info("Beginning NaiveBayes classification.")
-    data = data.toarray()
-    run_classification( nb, data, labels )
+    return run_classification( nb, data, labels, config, "nbayes", svd )
 # }}}
 
 
@@ -99,14 +374,30 @@ def do_naiveBayes( data, labels, config ):
 def do_kNeighbor( data, labels, config ):
 
     n_neighbors = config.getint("knn", "n_neighbors")
+    mode        = get_option( config, "knn", "mode", "exact" )
+
+    # sparse mode searches an inverted index of the training posts
+    if mode == "sparse":
+        kn = SparseKNeighborsClassifier(
+            n_neighbors=n_neighbors,    # neighbors voting on each label
+            query_terms=get_option( config, "knn", "query_terms", 0 ),
+            postings=get_option( config, "knn", "postings", 0 ),
+            n_candidates=get_option( config, "knn", "n_candidates", 50 ),
+            weights=get_option( config, "knn", "weights", "uniform" ),
+            block_size=get_option( config, "knn", "block_size", 1000 ),
+        )
+
+        logging.info("Beginning sparse K-Nearest Neighbor classification.")
+        data = keep_sparse( data )
+        return run_classification( kn, data, labels, config, "kNeighbor" )
 
     kn = neighbors.KNeighborsClassifier(
         n_neighbors=n_neighbors
     )
 
     logging.info("Beginning K-Nearest Neighbor classification.")
-    data = data.toarray()
-    run_classification( kn, data, labels )
+    data = keep_sparse( data )
+    return run_classification( kn, data, labels, config, "kNeighbor" )
 # }}}
 
 
@@ -117,8 +408,20 @@ def do_svm( data, labels, config ):
     sv = svm.LinearSVC()
 
     logging.info("Beginning SVM classification.")
-    data = data.toarray()
-    run_classification( sv, data, labels )
+    data = keep_sparse( data )
+    return run_classification( sv, data, labels, config, "svm" )
+# }}}
+
+
+
+# Algorithm table {{{
+algorithms = {
+    "dtree":        do_dtree,
+    "randomforest": do_randomForest,
+    "nbayes":       do_naiveBayes,
+    "kNeighbor":    do_kNeighbor,
+    "svm":          do_svm,
+}
 # }}}
 
 
@@ -152,28 +455,21 @@ if __name__ == "__main__":
     # available algorithms
     known_algorithms = ["dtree","randomforest","nbayes","kNeighbor","svm"]
 
-    # read and vectorize the data
-    (labels, data) = vectorize_data( config )
-
-    # loop over all requested algorithms
+    # verify that requested algorithms are known
     for algorithm in requested_algorithms:
-
-        # verify that requested algorithm is known
         if algorithm not in known_algorithms:
             logging.error( "Algorithm \"%s\" is not recognized." % algorithm )
 
-        if algorithm == "dtree":
-            do_dtree( data, labels, config )
-
-        if algorithm == "randomforest":
-            do_randomForest( data, labels, config )
-
-        if algorithm == "nbayes":
-            do_naiveBayes( data, labels, config )
+    requested_algorithms = [algorithm for algorithm in requested_algorithms
+                            if algorithm in known_algorithms]
 
-        if algorithm == "kNeighbor":
-            do_kNeighbor( data, labels, config )
+    # read and vectorize the data, keeping the vectorizer if models are saved
+    (labels, data, vectorizer) = vectorize_data( config,
+                                                 return_vectorizer=True )
+    save_vectorizer( config, vectorizer )
 
-        if algorithm == "svm":
-            do_svm( data, labels, config )
+    # run all requested algorithms, concurrently if configured
+    results = run_algorithms( "classifier", requested_algorithms,
+                              data, labels, config )
+    report( results )
 # }}}
@@ -11,15 +11,28 @@ import logging
 import ConfigParser
 from time import time
 
+import scipy.sparse
+
 from sklearn import metrics
 from sklearn import cluster
 
+from options import get_option
 from vectorize_data import vectorize_data
+from reduction import densify, keep_sparse, reduce_dimensions
+from parallel_run import run_algorithms, report
+from metrics_log import emit_record
+from model_store import save_vectorizer, save_estimator
+from memory import MemoryWatch
+from profiling import Phase
+from sparse_cluster import SparseDBSCAN, SparseAffinityPropagation
+from sparse_cluster import SparseSpectralClustering, ConnectedWard
+from sparse_cluster import ParallelMeanShift, ward_clusterer
 
 
 
 # Run clustering algorithm {{{
-def run_clustering( clusterer, data, labels ):
+def run_clustering( clusterer, data, labels, config=None, name=None,
+                    reduction=None ):
     """
     Cluster: Using a predefined and parameterized clustering algorithm, fit
     some dataset and perform metrics given a set of ground-truth labels.
@@ -27,15 +40,26 @@ def run_clustering( clusterer, data, labels ):
         clusterer: the clustering algorithm, from sklearn
         data:      array-like dataset input
         labels:    vector of ground-truth labels
+        config:    ConfigParser with documented fields, for the metrics log
+        name:      the algorithm name, for the metrics log
+        reduction: the fitted TruncatedSVD the data was reduced by, if any,
+                   saved with the clusterer
 
+    Returns a dictionary of the metrics computed.
     """
 
-    # Time the operation
-    t0 = time()
-    clusterer.fit(data)
-    t1 = time()
+    # Time the operation, and measure its memory
+    with MemoryWatch() as memory:
+        t0 = time()
+        with Phase( "fit", config, name ):
+            clusterer.fit(data)
+        t1 = time()
+    peak_rss = memory.peak_mb
 
     # Perform metrics
+    metrics_phase = Phase( "metrics", config, name )
+    metrics_phase.start()
+
     runtime         = (t1 - t0)
     homogeneity     = metrics.homogeneity_score(   labels, clusterer.labels_ )
     completeness    = metrics.completeness_score(  labels, clusterer.labels_ )
@@ -44,6 +68,8 @@ def run_clustering( clusterer, data, labels ):
     adjusted_mutual = metrics.adjusted_mutual_info_score( labels,
                                                           clusterer.labels_ )
 
+    metrics_phase.report()
+
     # Output to logs
     logging.info("  |-        Execution time: %fs"   % runtime)
     logging.info("  |-           Homogeneity: %0.3f" % homogeneity)
@@ -51,6 +77,27 @@ def run_clustering( clusterer, data, labels ):
     logging.info("  |-             V-measure: %0.3f" % v_measure)
     logging.info("  |-   Adjusted Rand-Index: %.3f"  % adjusted_rand)
     logging.info("  |-  Adjusted Mutual Info: %.3f"  % adjusted_mutual)
+
+    results = {
+        "runtime":         runtime,
+        "homogeneity":     homogeneity,
+        "completeness":    completeness,
+        "v_measure":       v_measure,
+        "adjusted_rand":   adjusted_rand,
+        "adjusted_mutual": adjusted_mutual,
+    }
+
+    # Write a machine-readable record; clusterers label during the fit
+    if config is not None:
+        timings = {
+            "fit_time":     runtime,
+            "predict_time": None,
+            "peak_rss_mb":  peak_rss,
+        }
+        emit_record( config, "cluster", name, data, timings, results )
+        save_estimator( config, name, clusterer, data, reduction )
+
+    return results
 # }}}
 
 
@@ -78,7 +125,8 @@ def do_kmeans( data, labels, config ):
 
     logging.info("Beginning KMeans clustering.")
 
-    run_clustering( km, data, labels )
+    data = keep_sparse( data )
+    return run_clustering( km, data, labels, config, "kmeans" )
 # }}}
 
 
@@ -94,6 +142,28 @@ def do_affinity_propagation( data, labels, config ):
     damping          = config.getfloat("ap", "damping")
     convergence_iter = config.getint("ap", "convergence_iter")
     affinity         = config.get("ap", "affinity")
+    mode             = get_option( config, "ap", "mode", "dense" )
+
+    # sparse mode passes messages only along a k-nearest-neighbor graph
+    if mode == "sparse":
+        n_neighbors = get_option( config, "ap", "n_neighbors", 10 )
+        max_iter    = get_option( config, "ap", "max_iter", 200 )
+        block_size  = get_option( config, "ap", "block_size", 1000 )
+        preference  = get_option( config, "ap", "preference", "" )
+
+        ap = SparseAffinityPropagation(
+            n_neighbors=n_neighbors,           # neighbors linked to each post
+            damping=damping,                   # damping factor
+            convergence_iter=convergence_iter, # convergence threshold
+            max_iter=max_iter,                 # iteration limit
+            preference=float( preference ) if preference else None,
+            block_size=block_size,             # rows compared at a time
+        )
+
+        logging.info("Beginning sparse Affinity Propagation clustering.")
+
+        data = keep_sparse( data )
+        return run_clustering( ap, data, labels, config, "ap" )
 
     ap = cluster.AffinityPropagation(
         damping=damping,                   # damping factor
@@ -103,7 +173,7 @@ def do_affinity_propagation( data, labels, config ):
 
     logging.info("Beginning Affinity Propagation clustering.")
 
-    run_clustering( ap, data, labels )
+    return run_clustering( ap, data, labels, config, "ap" )
 # }}}
 
 
@@ -115,6 +185,33 @@ def do_mean_shift( data, labels, config ):
     is expected to be a dictionary of categories to tf-idf vectors.
     """
 
+    mode = get_option( config, "meanshift", "mode", "dense" )
+
+    # binned mode shifts bin seeds over reduced vectors, in parallel
+    if mode == "binned":
+        n_components = get_option( config, "meanshift", "n_components", 10 )
+        quantile     = get_option( config, "meanshift", "quantile", 0.3 )
+        n_samples    = get_option( config, "meanshift", "bandwidth_samples",
+                                   1000 )
+        min_bin_freq = get_option( config, "meanshift", "min_bin_freq", 1 )
+        n_jobs       = get_option( config, "meanshift", "n_jobs", 1 )
+
+        ms = ParallelMeanShift(
+            quantile=quantile,              # bandwidth distance quantile
+            bandwidth_samples=n_samples,    # points sampled for bandwidth
+            min_bin_freq=min_bin_freq,      # minimum posts in a seed bin
+            n_jobs=n_jobs,                  # worker processes
+        )
+
+        logging.info("Beginning binned Mean Shift clustering.")
+
+        (data, svd) = reduce_dimensions( keep_sparse( data ), config,
+                                         n_components )
+        if scipy.sparse.issparse( data ):
+            data = data.toarray()
+
+        return run_clustering( ms, data, labels, config, "meanshift", svd )
+
     ms = cluster.MeanShift(
         min_bin_freq=1,     # only use bins with at least min frequency
         cluster_all=True,   # use all points
@@ -123,8 +220,8 @@ def do_mean_shift( data, labels, config ):
     logging.info("Beginning Mean Shift clustering.")
     logging.warn("Meanshift is not a scalable clustering algorithm.")
 
-    data = data.toarray()
-    run_clustering( ms, data, labels )
+    (data, svd) = densify( data, config )
+    return run_clustering( ms, data, labels, config, "meanshift", svd )
 # }}}
 
 
@@ -136,6 +233,35 @@ def do_spectral( data, labels, config ):
     expected to be a dictionary of categories to tf-idf vectors.
     """
 
+    mode = get_option( config, "spectral", "mode", "dense" )
+
+    # sparse modes work from a kNN cosine graph and/or Nystrom landmarks
+    if mode in ["sparse", "nystrom"]:
+        n_neighbors  = get_option( config, "spectral", "n_neighbors", 10 )
+        n_landmarks  = get_option( config, "spectral", "n_landmarks", 0 )
+        eigen_solver = get_option( config, "spectral", "eigen_solver",
+                                   "lobpcg" )
+        max_iter     = get_option( config, "spectral", "max_iter", 200 )
+        block_size   = get_option( config, "spectral", "block_size", 1000 )
+
+        if mode == "nystrom" and n_landmarks <= 0:
+            n_landmarks = 1000
+
+        sc = SparseSpectralClustering(
+            n_clusters=len(set(labels)), # expected number of clusters
+            n_neighbors=n_neighbors,     # neighbors linked to each post
+            n_landmarks=n_landmarks,     # Nystrom sample size
+            eigen_solver=eigen_solver,   # eigenvalue decomposition strategy
+            use_graph=(mode == "sparse"),
+            max_iter=max_iter,           # LOBPCG iteration limit
+            block_size=block_size,       # rows compared at a time
+        )
+
+        logging.info("Beginning %s Spectral clustering." % mode)
+
+        data = keep_sparse( data )
+        return run_clustering( sc, data, labels, config, "spectral" )
+
     sc = cluster.SpectralClustering(
         n_clusters=len(set(labels)), # expected number of clusters
         eigen_solver="arpack",       # eigenvalue decomposition strategy
@@ -144,7 +270,7 @@ def do_spectral( data, labels, config ):
 
     logging.info("Beginning Spectral clustering.")
 
-    run_clustering( sc, data, labels )
+    return run_clustering( sc, data, labels, config, "spectral" )
 # }}}
 
 
@@ -157,15 +283,40 @@ def do_wards( data, labels, config ):
     tf-idf vectors.
     """
 
-    wh = cluster.Ward(
+    mode = get_option( config, "wards", "mode", "dense" )
+
+    # connected mode merges reduced vectors along a kNN graph
+    if mode == "connected":
+        n_components  = get_option( config, "wards", "n_components", 100 )
+        n_neighbors   = get_option( config, "wards", "n_neighbors", 10 )
+        n_subclusters = get_option( config, "wards", "n_subclusters", 0 )
+        block_size    = get_option( config, "wards", "block_size", 1000 )
+
+        wh = ConnectedWard(
+            n_clusters=len(set(labels)), # expected number of clusters
+            n_neighbors=n_neighbors,     # neighbors linked to each post
+            n_subclusters=n_subclusters, # pre-clustering centroids
+            block_size=block_size,       # rows compared at a time
+        )
+
+        logging.info("Beginning connected Ward's Hierarhical clustering.")
+
+        (data, svd) = reduce_dimensions( keep_sparse( data ), config,
+                                         n_components )
+        if scipy.sparse.issparse( data ):
+            data = data.toarray()
+
+        return run_clustering( wh, data, labels, config, "wards", svd )
+
+    wh = ward_clusterer(
         n_clusters=len(set(labels)), # expected number of clusters
         connectivity=None,           # no connectivity matrix
     )
 
     logging.info("Beginning Ward's Hierarhical clustering.")
 
-    data = data.toarray()
-    run_clustering( wh, data, labels )
+    (data, svd) = densify( data, config )
+    return run_clustering( wh, data, labels, config, "wards", svd )
 # }}}
 
 
@@ -179,6 +330,23 @@ def do_dbscan( data, labels, config ):
 
     eps         = config.getfloat("dbscan", "eps")
     min_samples = config.getint("dbscan", "min_samples")
+    mode        = get_option( config, "dbscan", "mode", "dense" )
+
+    # sparse mode searches cosine neighborhoods block by block, never
+    # building the full distance matrix
+    if mode == "sparse":
+        block_size = get_option( config, "dbscan", "block_size", 1000 )
+
+        db = SparseDBSCAN(
+            eps=eps,                  # max cosine distance between neighbours
+            min_samples=min_samples,  # number of neighbors for a core point
+            block_size=block_size,    # rows compared at a time
+        )
+
+        logging.info("Beginning sparse cosine DBSCAN clustering.")
+
+        data = keep_sparse( data )
+        return run_clustering( db, data, labels, config, "dbscan" )
 
     db = cluster.DBSCAN(
         eps=eps,                  # max distance between two neighbours
@@ -187,8 +355,21 @@ def do_dbscan( data, labels, config ):
 
     logging.info("Beginning DBSCAN clustering.")
 
-    data = data.toarray()
-    run_clustering( db, data, labels )
+    (data, svd) = densify( data, config )
+    return run_clustering( db, data, labels, config, "dbscan", svd )
+# }}}
+
+
+
+# Algorithm table {{{
+algorithms = {
+    "kmeans":    do_kmeans,
+    "ap":        do_affinity_propagation,
+    "meanshift": do_mean_shift,
+    "spectral":  do_spectral,
+    "wards":     do_wards,
+    "dbscan":    do_dbscan,
+}
 # }}}
 
 
@@ -227,34 +408,21 @@ if __name__ == "__main__":
                         "wards",
                         "dbscan"]
 
-    # read and vectorize the data
-    (labels, data) = vectorize_data( config )
-
-    # loop over all requested algorithms
+    # verify that requested algorithms are known
     for algorithm in requested_algorithms:
-
-        # verify that requested algorithm is known
         if algorithm not in known_algorithms:
             logging.error( "Algorithm \"%s\" is not recognized." % algorithm )
 
-        if algorithm == "kmeans":
-            do_kmeans( data, labels, config )
-
-        if algorithm == "ap":
-            do_affinity_propagation( data, labels, config )
+    requested_algorithms = [algorithm for algorithm in requested_algorithms
+                            if algorithm in known_algorithms]
 
-        if algorithm == "meanshift":
-            do_mean_shift( data, labels, config )
+    # read and vectorize the data, keeping the vectorizer if models are saved
+    (labels, data, vectorizer) = vectorize_data( config,
+                                                 return_vectorizer=True )
+    save_vectorizer( config, vectorizer )
 
-        if algorithm == "spectral":
-            do_spectral( data, labels, config )
-
-        if algorithm == "wards":
-            do_wards( data, labels, config )
-
-        if algorithm == "dbscan":
-            do_dbscan( data, labels, config )
+    # run all requested algorithms, concurrently if configured
+    results = run_algorithms( "cluster", requested_algorithms,
+                              data, labels, config )
+    report( results )
 # }}}
-
-
-
@@ -0,0 +1,154 @@
+"""
+Date:   2026-10-18
+Desc:   Compare two metrics logs written by the drivers, and flag runs whose
+        time or memory regressed between them.
+"""
+
+import sys
+import json
+import logging
+import ConfigParser
+
+from metrics_log import result_key
+
+
+
+# Measurements checked for regressions.
+MEASUREMENTS = ["fit_time", "predict_time", "peak_rss_mb"]
+
+
+
+# Record Key {{{
+def record_key( record ):
+    """
+    Record Key: the result key of a record's configuration, the same one the
+    sweep runner uses. Records written before keys were stored have it
+    recomputed from their configuration.
+    """
+
+    if "key" in record:
+        return record["key"]
+
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    for (section, options) in record["config"].items():
+        config.add_section( section )
+        for (option, value) in options.items():
+            config.set( section, option, value )
+
+    return result_key( record["driver"], record["algorithm"], config )[0]
+# }}}
+
+
+
+# Load Records {{{
+def load_records( metrics_file ):
+    """
+    Load Records: read a metrics log, grouping records by driver, algorithm,
+    dataset shape and configuration, so only runs of the same parameters
+    are compared. Returns a dictionary from those keys to lists of records.
+
+    metrics_file: JSON lines file written by the drivers
+
+    """
+
+    records = {}
+
+    with open( metrics_file ) as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            record = json.loads( line )
+            key = (record["driver"], record["algorithm"],
+                   record["rows"], record["columns"], record_key( record ))
+            records.setdefault( key, [] ).append( record )
+
+    return records
+# }}}
+
+
+
+# Mean Measurement {{{
+def mean_measurement( records, measurement ):
+    """
+    Mean Measurement: the mean of a measurement over a list of records,
+    ignoring records where it wasn't taken. Returns None if it never was.
+    """
+
+    values = [record[ measurement ] for record in records
+              if record.get( measurement ) is not None]
+
+    if len( values ) == 0:
+        return None
+
+    return sum( values ) / float( len( values ) )
+# }}}
+
+
+
+# Compare {{{
+def compare( baseline, current, tolerance ):
+    """
+    Compare: flag every measurement of a run which grew by more than the
+    tolerance relative to the baseline. Returns a list of (key,
+    measurement, baseline value, current value) regressions.
+
+    baseline:  records of the baseline log, as from load_records
+    current:   records of the current log, as from load_records
+    tolerance: allowed relative growth, eg. 0.1 for 10%
+
+    """
+
+    regressions = []
+
+    for key in sorted( current ):
+        if key not in baseline:
+            logging.info("No baseline for %s %s (%dx%d, %.8s)." % key)
+            continue
+
+        for measurement in MEASUREMENTS:
+            before = mean_measurement( baseline[ key ], measurement )
+            after  = mean_measurement( current[ key ], measurement )
+
+            if before is None or after is None:
+                continue
+
+            change = (after - before) / max( before, 1e-9 )
+
+            logging.info("  |- %s %s (%dx%d, %.8s) %s: %.3f -> %.3f (%+.1f%%)" %
+                         (key + (measurement, before, after, 100 * change)))
+
+            if change > tolerance:
+                regressions.append( (key, measurement, before, after) )
+
+    return regressions
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    if len( sys.argv ) not in [3, 4]:
+        logging.error( "Usage: python compare_metrics.py [baseline.jsonl] "
+                       "[current.jsonl] [tolerance]" )
+        sys.exit( 1 )
+
+    baseline  = load_records( sys.argv[1] )
+    current   = load_records( sys.argv[2] )
+    tolerance = float( sys.argv[3] ) if len( sys.argv ) == 4 else 0.1
+
+    regressions = compare( baseline, current, tolerance )
+
+    for (key, measurement, before, after) in regressions:
+        logging.warn("Regression in %s %s (%dx%d, %.8s) %s: %.3f -> %.3f" %
+                     (key + (measurement, before, after)))
+
+    if len( regressions ) > 0:
+        sys.exit( 1 )
+
+# }}}
@@ -0,0 +1,76 @@
+"""
+Date:   2026-10-18
+Desc:   Convert every site's Posts.xml into a pre-parsed binary store, once,
+        so later runs with the binary post format read cleaned posts
+        straight from memory-mapped files instead of parsing XML and
+        stripping html again.
+"""
+
+
+import sys
+import logging
+import ConfigParser
+from time import time
+
+from options import get_option
+from vectorize_data import list_sites, map_sites, iter_clean_posts
+from post_store import write_store
+
+
+
+# Convert Site {{{
+def convert_site( job ):
+    """
+    Convert Site: worker entry point for conversion. Parses a single site's
+    Posts.xml and writes its cleaned posts into the site's binary store.
+    Returns a (category, number of posts) tuple.
+
+    job: a (fullpath, category, config, handle) tuple
+
+    """
+
+    (fullpath, category, config, handle) = job
+
+    compression = get_option( config, "input", "store_compression", 0 )
+
+    with open( fullpath, "r" ) as f:
+        num_posts = write_store( fullpath, category, iter_clean_posts( f ),
+                                 compression )
+
+    logging.info("Converted %d posts from %s." % (num_posts, fullpath))
+
+    return (category, num_posts)
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    if len( sys.argv ) != 2:
+        logging.error( "Usage: python convert_corpus.py [input.ini]" )
+        sys.exit( 1 )
+
+    # read configuration file
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    config.readfp( open( sys.argv[1] ) )
+
+    # stores are written next to each Posts.xml
+    if config.get("input", "in_protocol") != "disk":
+        logging.error( "Only sites on disk can be converted." )
+        sys.exit( 1 )
+
+    # convert every site, in parallel if configured
+    t0 = time()
+    num_posts = sum( count for (category, count)
+                     in map_sites( convert_site, list_sites( config ),
+                                   config ) )
+    t1 = time()
+
+    logging.info("Converted %d posts in %.3fs." % (num_posts, t1 - t0))
+
+# }}}
@@ -0,0 +1,206 @@
+"""
+Date:   2026-10-18
+Desc:   Persistent on-disk cache of the vectorized corpus. Entries are keyed
+        by a fingerprint of the input and tfidf configuration along with the
+        size and modification time of every source file, and are loaded back
+        through memory-mapping.
+"""
+
+
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+
+import numpy
+import scipy.sparse
+
+from options import get_option, section_values
+from features import vectorizer_arrays
+from post_index import index_path
+from post_store import store_current
+from s3_store import make_store
+
+
+
+# Fingerprint {{{
+def fingerprint( config, sites ):
+    """
+    Fingerprint: hash the configuration values which affect vectorization,
+    together with the size and version (mtime, or s3 ETag) of every source
+    file and whether it is read through a row index or a binary store.
+
+    config: ConfigParser with documented fields
+    sites:  list of (fullpath, category) tuples, as from list_sites
+
+    """
+
+    in_protocol = config.get("input", "in_protocol")
+    post_format = get_option( config, "input", "post_format", "xml" )
+
+    digest = hashlib.sha1()
+
+    # hash the relevant configuration sections
+    values = section_values( config, ["input", "tfidf"] )
+    for section in sorted( values ):
+        for (option, value) in sorted( values[ section ].items() ):
+            digest.update( "%s.%s=%s\n" % (section, option, value) )
+
+    store = make_store( config ) if in_protocol == "s3" else None
+
+    # hash the source files
+    for (fullpath, category) in sites:
+        size, version = -1, ""
+
+        if store is not None:
+            (size, version) = store.stat( fullpath )
+
+        elif os.path.exists( fullpath ):
+            stat = os.stat( fullpath )
+            size, version = stat.st_size, str( int( stat.st_mtime ) )
+
+        # sampling goes through the binary store or row index, if there is one
+        stored  = (post_format == "binary" and store is None and
+                   store_current( fullpath ))
+        indexed = os.path.exists( index_path( fullpath ) )
+
+        digest.update( "%s:%s:%d:%s:%d:%d\n" %
+                       (fullpath, category, size, version, stored, indexed) )
+
+    return digest.hexdigest()
+# }}}
+
+
+
+# Save CSR {{{
+def save_csr( path, matrix ):
+    """
+    Save CSR: write the component arrays of a sparse matrix as .npy files in
+    a directory, so they can be memory-mapped later.
+
+    path:   the directory to write into
+    matrix: a scipy.sparse matrix
+
+    """
+
+    matrix = scipy.sparse.csr_matrix( matrix )
+
+    numpy.save( os.path.join( path, "data.npy" ),    matrix.data )
+    numpy.save( os.path.join( path, "indices.npy" ), matrix.indices )
+    numpy.save( os.path.join( path, "indptr.npy" ),  matrix.indptr )
+    numpy.save( os.path.join( path, "shape.npy" ),   numpy.array( matrix.shape ) )
+# }}}
+
+
+
+# Load CSR {{{
+def load_csr( path, mmap_mode="c" ):
+    """
+    Load CSR: rebuild a sparse matrix saved by save_csr. By default the
+    arrays are memory-mapped copy-on-write, so pages are only read in as
+    they are touched and the files on disk are never modified.
+
+    path:      the directory to read from
+    mmap_mode: numpy.load memory-map mode, or None to read into memory
+
+    """
+
+    data    = numpy.load( os.path.join( path, "data.npy" ),    mmap_mode=mmap_mode )
+    indices = numpy.load( os.path.join( path, "indices.npy" ), mmap_mode=mmap_mode )
+    indptr  = numpy.load( os.path.join( path, "indptr.npy" ),  mmap_mode=mmap_mode )
+    shape   = numpy.load( os.path.join( path, "shape.npy" ) )
+
+    return scipy.sparse.csr_matrix( (data, indices, indptr),
+                                    shape=tuple( shape ), copy=False )
+# }}}
+
+
+
+# Load Corpus {{{
+def load_corpus( config, sites ):
+    """
+    Load Corpus: look up the vectorized corpus in the cache. Returns a
+    (labels, data, arrays) tuple on a hit, where arrays holds the fitted
+    vectorizer state, or None on a miss or if caching is disabled.
+
+    config: ConfigParser with documented fields
+    sites:  list of (fullpath, category) tuples, as from list_sites
+
+    """
+
+    cache_dir = get_option( config, "input", "cache_dir", "" )
+    if not cache_dir:
+        return None
+
+    key  = fingerprint( config, sites )
+    path = os.path.join( cache_dir, key )
+
+    if not os.path.isdir( path ):
+        logging.info("Corpus cache miss (%s)." % key)
+        return None
+
+    logging.info("Corpus cache hit (%s)." % key)
+
+    data   = load_csr( path )
+    labels = numpy.load( os.path.join( path, "labels.npy" ) ).tolist()
+
+    arrays = {}
+    for name in os.listdir( path ):
+        if name.startswith( "vectorizer." ):
+            arrays[ name.split(".")[1] ] = numpy.load(
+                os.path.join( path, name ), mmap_mode="r" )
+
+    return (labels, data, arrays)
+# }}}
+
+
+
+# Store Corpus {{{
+def store_corpus( config, sites, labels, data, vectorizer ):
+    """
+    Store Corpus: write the vectorized corpus, its labels and the fitted
+    vectorizer state into the cache. Entries are written to a temporary
+    directory first and moved into place, so concurrent runs never see a
+    half-written entry.
+
+    config:     ConfigParser with documented fields
+    sites:      list of (fullpath, category) tuples, as from list_sites
+    labels:     vector of ground-truth labels
+    data:       the vectorized corpus
+    vectorizer: the fitted vectorizer
+
+    """
+
+    cache_dir = get_option( config, "input", "cache_dir", "" )
+    if not cache_dir:
+        return
+
+    key  = fingerprint( config, sites )
+    path = os.path.join( cache_dir, key )
+
+    if os.path.isdir( path ):
+        return
+
+    if not os.path.isdir( cache_dir ):
+        os.makedirs( cache_dir )
+
+    staging = tempfile.mkdtemp( dir=cache_dir, prefix=".staging-" )
+
+    try:
+        save_csr( staging, data )
+        numpy.save( os.path.join( staging, "labels.npy" ), numpy.array( labels ) )
+
+        for (name, array) in vectorizer_arrays( vectorizer ).items():
+            numpy.save( os.path.join( staging, "vectorizer.%s.npy" % name ),
+                        array )
+
+        os.rename( staging, path )
+    except OSError:
+        # another run stored the same entry first
+        shutil.rmtree( staging, ignore_errors=True )
+        if not os.path.isdir( path ):
+            raise
+
+    logging.info("Stored vectorized corpus in cache (%s)." % key)
+# }}}
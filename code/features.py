@@ -0,0 +1,263 @@
+"""
+Date:   2026-10-18
+Desc:   Construct the text vectorizers used over the corpus, and convert
+        fitted vectorizers to and from plain numpy arrays so they can be
+        stored on disk.
+"""
+
+
+import inspect
+
+import numpy
+import scipy.sparse
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from options import get_option
+
+
+
+# Keep hashed counts positive: newer scikit-learn releases replace the
+# non_negative option with alternate_sign, and deprecate the former.
+if "alternate_sign" in inspect.getargspec( HashingVectorizer.__init__ ).args:
+    POSITIVE_COUNTS = {"alternate_sign": False}
+else:
+    POSITIVE_COUNTS = {"non_negative": True}
+
+
+
+# Make TF-IDF Vectorizer {{{
+def make_tfidf_vectorizer( config, vocabulary=None ):
+    """
+    Make TF-IDF Vectorizer: build the (unfitted) TF-IDF vectorizer described
+    by the tfidf section of the configuration.
+
+    config:     ConfigParser with documented fields
+    vocabulary: optional fixed mapping of terms to feature indices
+
+    """
+
+    # Read in necessary config values.
+    max_df   = config.getfloat("tfidf", "max_df")
+    min_df     = config.getint("tfidf", "min_df")
+
+    # create a tf_idf vectorizer machine
+    tfidf_vectorizer = TfidfVectorizer(
+        input="content",        # will pass input directly
+        encoding="ascii",       # use basic ascii encoding
+        decode_error="ignore",  # ignore decoding errors
+        strip_accents="ascii",  # strip fancy characters
+        stop_words="english",   # remove english stopwords
+        lowercase=True,         # lowercase everything
+        use_idf=True,           # inverse document frequency (weighting)
+        smooth_idf=True,        # smooth the data out
+
+        max_df=max_df,          # terms must occur in under X documents
+        min_df=min_df,          # terms must occur in at least X documents
+
+        vocabulary=vocabulary,  # fixed vocabulary, if already fitted
+    )
+
+    return tfidf_vectorizer
+# }}}
+
+
+
+# Hashing TF-IDF {{{
+class HashingTfidf( object ):
+    """
+    Hashing TF-IDF: a TF-IDF vectorizer over a fixed, hashed feature space.
+    Term counts need no vocabulary, so they can be built chunk by chunk
+    from a stream of posts; the document frequency pruning and idf weights
+    are fitted afterwards over the counts alone.
+
+    config: ConfigParser with documented fields
+    kept:   indices of the hashed features surviving pruning, if fitted
+    idf:    idf weights of the kept features, if fitted
+
+    """
+
+    def __init__( self, config, kept=None, idf=None ):
+
+        self.max_df     = config.getfloat("tfidf", "max_df")
+        self.min_df     = config.getint("tfidf", "min_df")
+        self.n_features = get_option( config, "tfidf", "n_features", 2 ** 20 )
+        self.chunk_size = get_option( config, "tfidf", "chunk_size", 10000 )
+
+        self.kept = kept
+        self.idf  = idf
+
+        # same text processing as the TF-IDF vectorizer, minus the weighting
+        self.hasher = HashingVectorizer(
+            input="content",        # will pass input directly
+            encoding="ascii",       # use basic ascii encoding
+            decode_error="ignore",  # ignore decoding errors
+            strip_accents="ascii",  # strip fancy characters
+            stop_words="english",   # remove english stopwords
+            lowercase=True,         # lowercase everything
+
+            n_features=self.n_features, # size of the hashed feature space
+            norm=None,              # normalize only after weighting
+
+            **POSITIVE_COUNTS       # raw term counts
+        )
+
+
+    def count( self, posts ):
+        """
+        Count: hash an iterable of posts into a term count matrix, one chunk
+        of posts at a time.
+        """
+
+        chunks = []
+        chunk  = []
+
+        for post in posts:
+            chunk.append( post )
+
+            if len( chunk ) >= self.chunk_size:
+                chunks.append( self.hasher.transform( chunk ) )
+                chunk = []
+
+        if len( chunk ) > 0 or len( chunks ) == 0:
+            chunks.append( self.hasher.transform( chunk ) )
+
+        return scipy.sparse.vstack( chunks, format="csr" )
+
+
+    def fit_counts( self, counts ):
+        """
+        Fit Counts: compute document frequencies over a term count matrix,
+        prune features by min_df and max_df, and fit the idf weights.
+        """
+
+        counts   = scipy.sparse.csr_matrix( counts )
+        num_docs = counts.shape[0]
+
+        return self.fit_frequencies( self.frequencies( counts ), num_docs )
+
+
+    def frequencies( self, counts ):
+        """
+        Frequencies: the number of documents each hashed feature occurs in,
+        over a term count matrix.
+        """
+
+        # the hasher sums duplicates, so each stored entry is one document,
+        # once any explicitly stored zeros are dropped
+        counts = scipy.sparse.csr_matrix( counts )
+        counts.eliminate_zeros()
+        return numpy.bincount( counts.indices, minlength=self.n_features )
+
+
+    def fit_frequencies( self, df, num_docs ):
+        """
+        Fit Frequencies: prune features by min_df and max_df and fit the idf
+        weights, given the document frequency of every hashed feature. The
+        frequencies can be summed chunk by chunk over a stream of posts.
+        """
+
+        keep = (df >= self.min_df) & (df <= self.max_df * num_docs)
+        self.kept = numpy.flatnonzero( keep )
+
+        # smoothed idf, matching the TF-IDF vectorizer
+        df = df[ self.kept ].astype( numpy.float64 )
+        self.idf = numpy.log( (1.0 + num_docs) / (1.0 + df) ) + 1.0
+
+        return self
+
+
+    def weight( self, counts ):
+        """
+        Weight: restrict a term count matrix to the kept features, apply the
+        idf weights and normalize each row.
+        """
+
+        counts = scipy.sparse.csr_matrix( counts )[ :, self.kept ]
+
+        n_features = len( self.idf )
+        idf_diag = scipy.sparse.spdiags(
+            self.idf, diags=0, m=n_features, n=n_features )
+
+        return normalize( counts * idf_diag, norm="l2", copy=False )
+
+
+    def fit_transform_counts( self, counts ):
+        """
+        Fit Transform Counts: fit over a term count matrix and weight it.
+        """
+
+        return self.fit_counts( counts ).weight( counts )
+
+
+    def transform( self, posts ):
+        """
+        Transform: vectorize an iterable of posts with the fitted weights.
+        """
+
+        return self.weight( self.count( posts ) )
+# }}}
+
+
+
+# Vectorizer Arrays {{{
+def vectorizer_arrays( vectorizer ):
+    """
+    Vectorizer Arrays: flatten a fitted vectorizer into a dictionary of
+    numpy arrays, suitable for numpy.save.
+
+    vectorizer: a fitted TfidfVectorizer or HashingTfidf
+
+    """
+
+    if isinstance( vectorizer, HashingTfidf ):
+        return {
+            "kept": numpy.asarray( vectorizer.kept ),
+            "idf":  numpy.asarray( vectorizer.idf, dtype=numpy.float64 ),
+        }
+
+    vocabulary = vectorizer.vocabulary_
+
+    # order the terms by their feature index
+    terms = sorted( vocabulary, key=vocabulary.get )
+
+    return {
+        "terms": numpy.array( terms ),
+        "idf":   numpy.asarray( vectorizer.idf_, dtype=numpy.float64 ),
+    }
+# }}}
+
+
+
+# Vectorizer From Arrays {{{
+def vectorizer_from_arrays( arrays, config ):
+    """
+    Vectorizer From Arrays: rebuild a fitted vectorizer from the arrays
+    produced by vectorizer_arrays, without refitting it over the corpus.
+
+    arrays: dictionary of numpy arrays, as from vectorizer_arrays
+    config: ConfigParser with documented fields
+
+    """
+
+    # the hashing engine only needs its pruning and weights
+    if "kept" in arrays:
+        return HashingTfidf( config, kept=numpy.asarray( arrays["kept"] ),
+                             idf=numpy.asarray( arrays["idf"] ) )
+
+    terms = arrays["terms"]
+    idf   = numpy.asarray( arrays["idf"] )
+
+    vocabulary = dict( (term, index) for (index, term) in enumerate( terms ) )
+    vectorizer = make_tfidf_vectorizer( config, vocabulary=vocabulary )
+    vectorizer.vocabulary_ = vocabulary
+
+    # restore the fitted inverse document frequency weights
+    n_features = len( idf )
+    vectorizer._tfidf._idf_diag = scipy.sparse.spdiags(
+        idf, diags=0, m=n_features, n=n_features )
+
+    return vectorizer
+# }}}
@@ -0,0 +1,160 @@
+"""
+Date:   2026-10-18
+Desc:   Strip HTML markup out of post bodies. Well-formed bodies are handled
+        by a compiled tokenizer; anything it can't be sure about falls back
+        to building a full lxml DOM.
+"""
+
+
+import re
+import htmlentitydefs
+
+from lxml import etree
+from lxml.html import document_fromstring
+
+
+
+# A start or end tag, allowing quoted attribute values to contain brackets.
+TAG_RE = re.compile( r"""</?[A-Za-z][^<>"']*(?:(?:"[^"]*"|'[^']*')[^<>"']*)*>""" )
+
+# Markup whose text the tokenizer doesn't treat the same way as lxml does:
+# comments, doctypes, processing instructions, CDATA, scripts and styles.
+UNSAFE_RE = re.compile( r"<(?:!|\?|script|style)", re.IGNORECASE )
+
+# A character or named entity reference.
+ENTITY_RE = re.compile( r"&(?:#([0-9]+)|#[xX]([0-9a-fA-F]+)|([A-Za-z][A-Za-z0-9]*));" )
+
+# An ampersand which looks like the start of a reference but isn't one.
+BARE_ENTITY_RE = re.compile( r"&[#A-Za-z]" )
+
+# Characters outside the XML character range, which libxml2 drops from text.
+CONTROL_RE = re.compile( u"[\x01-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]" )
+
+# Named entities, including the XML-only &apos; which HTML 4 lacks.
+ENTITIES = dict( htmlentitydefs.name2codepoint, apos=39 )
+
+
+
+# XML Char {{{
+def xml_char( codepoint ):
+    """
+    XML Char: whether a code point is an allowed XML character. References
+    to any other code point are dropped by libxml2.
+    """
+
+    return (codepoint in [0x9, 0xA, 0xD] or
+            0x20    <= codepoint <= 0xD7FF or
+            0xE000  <= codepoint <= 0xFFFD or
+            0x10000 <= codepoint <= 0x10FFFF)
+# }}}
+
+
+
+# Decode Entity {{{
+def decode_entity( match ):
+    """
+    Decode Entity: regular expression callback replacing a single entity
+    reference with its character. References to characters XML doesn't
+    allow are dropped, and unknown names are left untouched.
+
+    match: a match object from ENTITY_RE
+
+    """
+
+    decimal, hexadecimal, name = match.groups()
+
+    if name is not None:
+        if name in ENTITIES:
+            return unichr( ENTITIES[ name ] )
+        return match.group( 0 )
+
+    if decimal is not None:
+        codepoint = int( decimal )
+    else:
+        codepoint = int( hexadecimal, 16 )
+
+    if not xml_char( codepoint ):
+        return u""
+
+    # astral characters don't fit unichr on narrow builds
+    if codepoint > 0xFFFF:
+        return ("\\U%08x" % codepoint).decode( "unicode-escape" )
+
+    return unichr( codepoint )
+# }}}
+
+
+
+# Fast Text Content {{{
+def fast_text_content( body ):
+    """
+    Fast Text Content: strip tags and decode entities with the compiled
+    tokenizer. Returns None if the body contains anything the tokenizer
+    can't handle exactly like the DOM path.
+
+    body: the raw HTML post body
+
+    """
+
+    # libxml2 turns a raw NUL into a space, wherever it is
+    if UNSAFE_RE.search( body ) or u"\x00" in body:
+        return None
+
+    text = TAG_RE.sub( u"", body )
+
+    # any remaining bracket is the start of a tag we couldn't tokenize
+    if u"<" in text:
+        return None
+
+    text = CONTROL_RE.sub( u"", text )
+
+    if u"&" in text:
+        decoded = ENTITY_RE.sub( decode_entity, text )
+
+        # unterminated references are decoded leniently by libxml2
+        if BARE_ENTITY_RE.search( ENTITY_RE.sub( u"", text ) ):
+            return None
+
+        text = decoded
+
+    return text
+# }}}
+
+
+
+# DOM Text Content {{{
+def dom_text_content( body ):
+    """
+    DOM Text Content: strip tags by building a full lxml document. Returns
+    None if lxml can't parse the body at all.
+
+    body: the raw HTML post body
+
+    """
+
+    try:
+        return document_fromstring( body ).text_content()
+    except (etree.LxmlError, ValueError):
+        return None
+# }}}
+
+
+
+# Strip HTML {{{
+def strip_html( body ):
+    """
+    Strip HTML: return the text content of an HTML post body, using the fast
+    tokenizer where possible and the DOM otherwise. Returns None if the body
+    can't be parsed.
+
+    body: the raw HTML post body
+
+    """
+
+    text = fast_text_content( body )
+
+    if text is None:
+        text = dom_text_content( body )
+
+    return text
+# }}}
@@ -0,0 +1,150 @@
+"""
+Date:   2026-10-18
+Desc:   Measure the peak resident memory of the current process, overall
+        and over single phases of work.
+"""
+
+
+import resource
+import threading
+
+
+
+# Peak RSS {{{
+def peak_rss_mb():
+    """
+    Peak RSS: the high-water mark of resident memory for this process, in
+    megabytes.
+    """
+
+    try:
+        with open( "/proc/self/status" ) as status:
+            for line in status:
+                if line.startswith( "VmHWM:" ):
+                    return int( line.split()[1] ) / 1024.0
+    except IOError:
+        pass
+
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss / 1024.0
+# }}}
+
+
+
+# RSS {{{
+def rss_mb():
+    """
+    RSS: the current resident memory of this process, in megabytes, or None
+    where it can't be read.
+    """
+
+    try:
+        with open( "/proc/self/status" ) as status:
+            for line in status:
+                if line.startswith( "VmRSS:" ):
+                    return int( line.split()[1] ) / 1024.0
+    except IOError:
+        pass
+
+    return None
+# }}}
+
+
+
+# Memory Watch {{{
+class MemoryWatch( object ):
+    """
+    Memory Watch: measure the peak resident memory of this process over one
+    phase, and how far it rose above the memory in use when the phase
+    began, without resetting the process-wide high-water mark. If the phase
+    raises that mark, the new mark is its peak; otherwise the peak is taken
+    from sampling the resident size in a background thread.
+
+    interval: seconds between samples
+
+    """
+
+    def __init__( self, interval=0.05 ):
+
+        self.interval = interval
+        self.thread   = None
+        self.peak_mb  = None
+        self.delta_mb = None
+
+
+    def start( self ):
+        """
+        Start: begin watching.
+        """
+
+        self.start_mb  = rss_mb()
+        self.mark_mb   = peak_rss_mb()
+        self.sampled   = self.start_mb
+        self.done      = threading.Event()
+
+        if self.start_mb is not None:
+            self.thread = threading.Thread( target=self.sample )
+            self.thread.daemon = True
+            self.thread.start()
+
+
+    def sample( self ):
+        """
+        Sample: record the largest resident size seen until stopped.
+        """
+
+        while not self.done.wait( self.interval ):
+            self.sampled = max( self.sampled, rss_mb() )
+
+
+    def stop( self ):
+        """
+        Stop: finish watching, setting peak_mb and delta_mb.
+        """
+
+        self.done.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        mark_mb = peak_rss_mb()
+
+        if mark_mb > self.mark_mb or self.start_mb is None:
+            self.peak_mb = mark_mb
+        else:
+            self.peak_mb = max( self.sampled, rss_mb() )
+
+        self.delta_mb = self.peak_mb - (self.start_mb or self.mark_mb)
+
+
+    def __enter__( self ):
+
+        self.start()
+        return self
+
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+
+        self.stop()
+        return False
+# }}}
+
+
+
+# Available Memory {{{
+def available_memory_mb():
+    """
+    Available Memory: memory available for new work on this machine, in
+    megabytes, or None where it can't be determined.
+    """
+
+    try:
+        with open( "/proc/meminfo" ) as meminfo:
+            for line in meminfo:
+                if line.startswith( "MemAvailable:" ):
+                    return int( line.split()[1] ) / 1024.0
+    except IOError:
+        pass
+
+    return None
+# }}}
@@ -0,0 +1,159 @@
+"""
+Date:   2026-10-18
+Desc:   Write machine-readable records of every algorithm run, so that
+        performance can be tracked across corpus sizes and library versions.
+"""
+
+
+import json
+import socket
+import hashlib
+import logging
+import datetime
+
+import numpy
+import scipy
+import scipy.sparse
+import sklearn
+
+from options import get_option, section_values
+
+
+
+# Configuration section read by each algorithm, per driver module.
+ALGORITHM_SECTIONS = {
+    "cluster": {
+        "kmeans":       "kmeans",
+        "ap":           "ap",
+        "meanshift":    "meanshift",
+        "spectral":     "spectral",
+        "wards":        "wards",
+        "dbscan":       "dbscan",
+    },
+    "classifier": {
+        "dtree":        "dtree",
+        "randomforest": "randomforest",
+        "nbayes":       "nbayes",
+        "kNeighbor":    "knn",
+        "svm":          "svm",
+    },
+}
+
+
+
+# Dataset Shape {{{
+def dataset_shape( data ):
+    """
+    Dataset Shape: the number of rows, columns and stored (non-zero) values
+    of a sparse or dense matrix. Datasets which were only ever streamed are
+    described by a (rows, columns, nnz) tuple, which is returned as is.
+    """
+
+    if isinstance( data, tuple ):
+        return tuple( int( value ) for value in data )
+
+    if scipy.sparse.issparse( data ):
+        nnz = data.nnz
+    else:
+        nnz = int( numpy.count_nonzero( data ) )
+
+    return (int( data.shape[0] ), int( data.shape[1] ), int( nnz ))
+# }}}
+
+
+
+# Config Values {{{
+def config_values( config ):
+    """
+    Config Values: every configuration value, as a dictionary of
+    dictionaries keyed by section.
+    """
+
+    return dict( (section, dict( config.items( section, raw=True ) ))
+                 for section in config.sections() )
+# }}}
+
+
+
+# Result Key {{{
+def result_key( driver, algorithm, config ):
+    """
+    Result Key: identify a single run by its driver, algorithm, and the
+    values of every configuration section that could affect its results:
+    all of them, less the other known algorithms' sections and the values
+    with no effect on any result. Returns a (key, params) tuple.
+
+    driver:    the driver module, "cluster" or "classifier"
+    algorithm: the algorithm name
+    config:    ConfigParser with documented fields
+
+    """
+
+    # unknown algorithms (eg. online or streamed runs) keep every section
+    own = ALGORITHM_SECTIONS.get( driver, {} ).get( algorithm )
+
+    others = set()
+    if own is not None:
+        for sections in ALGORITHM_SECTIONS.values():
+            others.update( sections.values() )
+        others.discard( own )
+
+    params = section_values( config, [section for section in config.sections()
+                                      if section not in others] )
+
+    digest = hashlib.sha1()
+    digest.update( json.dumps( [driver, algorithm, params], sort_keys=True ) )
+
+    return (digest.hexdigest(), params)
+# }}}
+
+
+
+# Emit Record {{{
+def emit_record( config, driver, algorithm, data, timings, metrics ):
+    """
+    Emit Record: append a JSON line describing a single algorithm run to
+    [output] metrics_file, if one is configured.
+
+    config:    ConfigParser with documented fields
+    driver:    the driver module, "cluster" or "classifier"
+    algorithm: the algorithm name
+    data:      the dataset the algorithm was run on, or its shape
+    timings:   dictionary of fit_time, predict_time and peak_rss_mb
+    metrics:   dictionary of metric values
+
+    """
+
+    metrics_file = get_option( config, "output", "metrics_file", "" )
+    if not metrics_file:
+        return
+
+    (rows, columns, nnz) = dataset_shape( data )
+
+    record = {
+        "key":          result_key( driver, algorithm, config )[0],
+        "timestamp":    datetime.datetime.utcnow().isoformat(),
+        "host":         socket.gethostname(),
+        "driver":       driver,
+        "algorithm":    algorithm,
+        "rows":         rows,
+        "columns":      columns,
+        "nnz":          nnz,
+        "sparse":       scipy.sparse.issparse( data ),
+        "fit_time":     timings.get( "fit_time" ),
+        "predict_time": timings.get( "predict_time" ),
+        "peak_rss_mb":  timings.get( "peak_rss_mb" ),
+        "metrics":      metrics,
+        "config":       config_values( config ),
+        "versions": {
+            "numpy":   numpy.__version__,
+            "scipy":   scipy.__version__,
+            "sklearn": sklearn.__version__,
+        },
+    }
+
+    with open( metrics_file, "a" ) as f:
+        f.write( json.dumps( record, sort_keys=True ) + "\n" )
+
+    logging.debug("Wrote metrics record to %s." % metrics_file)
+# }}}
@@ -0,0 +1,242 @@
+"""
+Date:   2026-10-18
+Desc:   Persist a fitted vectorizer together with the state of a fitted
+        model as a directory holding a joblib dump and a small JSON
+        description, so new posts can be vectorized and labelled later
+        without refitting over the corpus. Arrays are loaded back through
+        memory-mapping.
+"""
+
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import ConfigParser
+
+import scipy.sparse
+
+from sklearn.externals import joblib
+
+from options import get_option
+from features import vectorizer_arrays, vectorizer_from_arrays
+
+
+
+# Configuration sections needed to rebuild the vectorizer.
+VECTORIZER_SECTIONS = ["tfidf"]
+
+
+
+# Save Model {{{
+def save_model( model_dir, config, vectorizer, state, info ):
+    """
+    Save Model: write the fitted vectorizer's arrays and the model state
+    into model_dir as a single joblib dump, beside a JSON description. The
+    model is written to a temporary directory first and swapped into place,
+    replacing any earlier model, so readers never see a half-written one.
+
+    model_dir:  the directory to write the model to
+    config:     ConfigParser with documented fields
+    vectorizer: the fitted vectorizer, or None to save the state alone
+    state:      the model state: a dictionary of numpy arrays, or a fitted
+                estimator
+    info:       JSON-serializable dictionary describing the model
+
+    """
+
+    parent = os.path.dirname( os.path.abspath( model_dir ) )
+    if not os.path.isdir( parent ):
+        os.makedirs( parent )
+
+    staging = tempfile.mkdtemp( dir=parent, prefix=".staging-" )
+
+    try:
+        arrays = None
+        if vectorizer is not None:
+            arrays = vectorizer_arrays( vectorizer )
+
+        # numpy arrays are written uncompressed so they can be mapped
+        joblib.dump( {"vectorizer": arrays, "state": state},
+                     os.path.join( staging, "model.pkl" ) )
+
+        options = {}
+        for section in VECTORIZER_SECTIONS:
+            options[ section ] = dict( config.items( section, raw=True ) )
+
+        with open( os.path.join( staging, "model.json" ), "w" ) as f:
+            json.dump( {"info": info, "options": options}, f,
+                       indent=2, sort_keys=True )
+
+    except:
+        shutil.rmtree( staging, ignore_errors=True )
+        raise
+
+    replace_dir( staging, model_dir )
+
+    logging.info("Saved model to %s." % model_dir)
+# }}}
+
+
+
+# Replace Dir {{{
+def replace_dir( staging, path ):
+    """
+    Replace Dir: move a fully written staging directory to path, moving any
+    earlier directory there aside first and removing it afterwards.
+
+    staging: the fully written directory
+    path:    the directory to replace
+
+    """
+
+    retired = None
+    if os.path.isdir( path ):
+        retired = tempfile.mkdtemp( dir=os.path.dirname( staging ),
+                                    prefix=".retired-" )
+        os.rmdir( retired )
+        os.rename( path, retired )
+
+    try:
+        os.rename( staging, path )
+    except:
+        shutil.rmtree( staging, ignore_errors=True )
+        raise
+
+    if retired is not None:
+        shutil.rmtree( retired, ignore_errors=True )
+# }}}
+
+
+
+# Load Model {{{
+def load_model( model_dir, mmap_mode="r" ):
+    """
+    Load Model: read back a model written by save_model. Returns a
+    (vectorizer, state, info) tuple, the vectorizer being None if none was
+    saved. The numpy arrays of the state are memory-mapped by default, so
+    they are only paged in as they are used; copy them before changing
+    them.
+
+    model_dir: the directory the model was written to
+    mmap_mode: numpy.load memory-map mode, or None to read into memory
+
+    """
+
+    with open( os.path.join( model_dir, "model.json" ) ) as f:
+        description = json.load( f )
+
+    saved = joblib.load( os.path.join( model_dir, "model.pkl" ),
+                         mmap_mode=mmap_mode )
+
+    vectorizer = None
+    if saved["vectorizer"] is not None:
+
+        # rebuild the configuration the vectorizer was fitted under
+        config = ConfigParser.ConfigParser( allow_no_value=True )
+        for (section, options) in description["options"].items():
+            config.add_section( section )
+            for (option, value) in options.items():
+                config.set( section, option, value )
+
+        vectorizer = vectorizer_from_arrays( saved["vectorizer"], config )
+
+    return (vectorizer, saved["state"], description["info"])
+# }}}
+
+
+
+# Save Vectorizer {{{
+def save_vectorizer( config, vectorizer ):
+    """
+    Save Vectorizer: write the fitted vectorizer into [output] model_dir, if
+    one is configured, for the estimators saved alongside it.
+
+    config:     ConfigParser with documented fields
+    vectorizer: the fitted vectorizer
+
+    """
+
+    model_dir = get_option( config, "output", "model_dir", "" )
+    if not model_dir:
+        return
+
+    save_model( os.path.join( model_dir, "vectorizer" ), config, vectorizer,
+                {}, {"algorithm": "vectorizer"} )
+# }}}
+
+
+
+# Load Vectorizer {{{
+def load_vectorizer( model_dir ):
+    """
+    Load Vectorizer: read back a vectorizer written by save_vectorizer.
+
+    model_dir: the [output] model_dir it was written into
+
+    """
+
+    (vectorizer, arrays, info) = load_model( os.path.join( model_dir,
+                                                           "vectorizer" ) )
+    return vectorizer
+# }}}
+
+
+
+# Save Estimator {{{
+def save_estimator( config, name, estimator, data, reduction=None ):
+    """
+    Save Estimator: write a fitted classifier or clusterer, and the fitted
+    reduction its input went through, into [output] model_dir if one is
+    configured, next to the vectorizer saved by save_vectorizer.
+
+    config:    ConfigParser with documented fields
+    name:      the algorithm name
+    estimator: the fitted estimator
+    data:      the dataset the estimator was fitted on
+    reduction: the fitted TruncatedSVD the dataset was reduced by, if any
+
+    """
+
+    model_dir = get_option( config, "output", "model_dir", "" )
+    if not model_dir or name is None:
+        return
+
+    # the input the estimator expects, to check new posts against
+    info = {
+        "algorithm":  name,
+        "estimator":  type( estimator ).__name__,
+        "sparse":     scipy.sparse.issparse( data ),
+        "n_features": int( data.shape[1] ),
+    }
+
+    state = {
+        "estimator": estimator,
+        "reduction": reduction,
+    }
+
+    save_model( os.path.join( model_dir, name ), config, None, state, info )
+# }}}
+
+
+
+# Load Estimator {{{
+def load_estimator( model_dir, name, mmap_mode="r" ):
+    """
+    Load Estimator: read back an estimator written by save_estimator,
+    memory-mapping its arrays by default. Returns an (estimator, reduction,
+    info) tuple, the reduction being None if the estimator was fitted on
+    unreduced posts.
+
+    model_dir: the [output] model_dir it was written into
+    name:      the algorithm name
+    mmap_mode: numpy.load memory-map mode, or None to read into memory
+
+    """
+
+    (vectorizer, state, info) = load_model( os.path.join( model_dir, name ),
+                                            mmap_mode )
+
+    return (state["estimator"], state["reduction"], info)
+# }}}
@@ -0,0 +1,238 @@
+"""
+Date:   2026-10-18
+Desc:   Keep a MiniBatchKMeans clustering of the corpus current as new posts
+        arrive. The fitted vectorizer and the cluster centroids are saved
+        once; later Posts.xml deltas are vectorized with the saved
+        vectorizer, folded into the centroids through partial_fit and
+        assigned to clusters in batches, at a cost proportional to the
+        delta alone.
+"""
+
+
+import sys
+import logging
+import ConfigParser
+from time import time
+
+import numpy
+
+from sklearn import cluster
+
+from options import get_option
+from vectorize_data import vectorize_data, iter_batches
+from model_store import save_model, load_model
+from cluster import run_clustering
+from reduction import keep_sparse
+
+
+
+# Make Clusterer {{{
+def make_clusterer( config, n_clusters ):
+    """
+    Make Clusterer: build the (unfitted) MiniBatchKMeans clusterer described
+    by the kmeans section of the configuration.
+
+    config:     ConfigParser with documented fields
+    n_clusters: number of clusters
+
+    """
+
+    init       = config.get("kmeans", "init")
+    n_init     = config.getint("kmeans", "n_init")
+    init_size  = config.getint("kmeans", "init_size")
+    batch_size = config.getint("kmeans", "batch_size")
+
+    return cluster.MiniBatchKMeans(
+        n_clusters=n_clusters,       # expected number of clusters
+
+        init=init,                   # initialization method (smart)
+        n_init=n_init,               # number of random retries
+        init_size=init_size,
+        batch_size=batch_size,
+        random_state=0,              # repeatable updates
+    )
+# }}}
+
+
+
+# Restore Clusterer {{{
+def restore_clusterer( config, arrays ):
+    """
+    Restore Clusterer: rebuild a fitted MiniBatchKMeans clusterer from its
+    saved centroids and per-centroid counts, ready for partial_fit.
+
+    config: ConfigParser with documented fields
+    arrays: dictionary of model arrays, as from load_model
+
+    """
+
+    centers = numpy.array( arrays["centers"] )
+    km = make_clusterer( config, centers.shape[0] )
+
+    # partial_fit updates these in place, so copy them off the mapped files
+    km.cluster_centers_ = centers
+    km.counts_          = numpy.array( arrays["counts"] )
+    km.random_state_    = numpy.random.RandomState( 0 )
+
+    return km
+# }}}
+
+
+
+# Clusterer Arrays {{{
+def clusterer_arrays( km ):
+    """
+    Clusterer Arrays: the state of a fitted MiniBatchKMeans clusterer needed
+    to resume it, as a dictionary of numpy arrays.
+    """
+
+    return {
+        "centers": km.cluster_centers_,
+        "counts":  km.counts_,
+    }
+# }}}
+
+
+
+# Fit Model {{{
+def fit_model( config ):
+    """
+    Fit Model: cluster the whole corpus once and save the vectorizer and
+    centroids as the starting point for later updates.
+
+    config: ConfigParser with documented fields
+
+    """
+
+    model_dir = config.get("online", "model_dir")
+
+    (labels, data, vectorizer) = vectorize_data( config,
+                                                 return_vectorizer=True )
+
+    km = make_clusterer( config, len( set( labels ) ) )
+
+    logging.info("Beginning online KMeans clustering.")
+
+    data = keep_sparse( data )
+    run_clustering( km, data, labels, config, "online" )
+
+    info = {
+        "algorithm": "kmeans",
+        "n_posts":   data.shape[0],
+        "updates":   [],
+    }
+
+    save_model( model_dir, config, vectorizer, clusterer_arrays( km ), info )
+# }}}
+
+
+
+# Update Model {{{
+def update_model( config, delta_files, learn=True ):
+    """
+    Update Model: stream new posts through the saved vectorizer in batches,
+    fold each batch into the centroids (if learning) and assign its posts
+    to clusters. Assignments are written as tab separated lines of file,
+    post number within the file and cluster.
+
+    config:      ConfigParser with documented fields
+    delta_files: list of Posts.xml files holding the new posts
+    learn:       update the centroids, or only assign the new posts
+
+    """
+
+    model_dir  = config.get("online", "model_dir")
+    batch_size = get_option( config, "online", "batch_size", 1000 )
+    out_file   = get_option( config, "online", "assignments_file", "" )
+
+    t0 = time()
+    (vectorizer, arrays, info) = load_model( model_dir )
+    km = restore_clusterer( config, arrays )
+    t1 = time()
+
+    logging.info("Loaded model from %s in %.3fs." % (model_dir, t1 - t0))
+
+    out = open( out_file, "a" ) if out_file else None
+    sizes = numpy.zeros( km.cluster_centers_.shape[0], dtype=numpy.int64 )
+    n_posts = 0
+
+    try:
+        for in_file in delta_files:
+            position = 0
+
+            for batch in iter_batches( in_file, batch_size ):
+                data = vectorizer.transform( batch )
+
+                if learn:
+                    km.partial_fit( data )
+
+                assigned = km.predict( data )
+                sizes += numpy.bincount( assigned, minlength=len( sizes ) )
+
+                if out is not None:
+                    for (offset, label) in enumerate( assigned ):
+                        out.write( "%s\t%d\t%d\n" %
+                                   (in_file, position + offset, label) )
+
+                position += len( batch )
+
+            logging.info("Assigned %d posts from %s." % (position, in_file))
+            n_posts += position
+
+    finally:
+        if out is not None:
+            out.close()
+
+    t2 = time()
+
+    logging.info("  |-        Posts assigned: %d" % n_posts)
+    logging.info("  |-            Throughput: %.0f posts/s" %
+                 (n_posts / max( t2 - t1, 1e-9 )))
+    logging.info("  |-         Cluster sizes: %s" % sizes.tolist())
+
+    if learn and n_posts > 0:
+        info["n_posts"] += n_posts
+        info["updates"].append( {"files": delta_files, "n_posts": n_posts,
+                                 "time": t0} )
+        save_model( model_dir, config, vectorizer, clusterer_arrays( km ),
+                    info )
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    usage = ("Usage: python online_cluster.py [fit|update|assign] "
+             "[input.ini] [cluster.ini] [Posts.xml ...]")
+
+    # ensure we have at least the minimum required params
+    if len( sys.argv ) < 4 or sys.argv[1] not in ["fit", "update", "assign"]:
+        logging.error( usage )
+        sys.exit( 1 )
+
+    # pull in parameters from the command line
+    command     = sys.argv[1]
+    input_file  = sys.argv[2]
+    config_file = sys.argv[3]
+    delta_files = sys.argv[4:]
+
+    # read configuration file
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    config.readfp( open( input_file ) )
+    config.readfp( open( config_file ) )
+
+    if command == "fit":
+        fit_model( config )
+
+    elif len( delta_files ) == 0:
+        logging.error( usage )
+        sys.exit( 1 )
+
+    else:
+        update_model( config, delta_files, learn=(command == "update") )
+# }}}
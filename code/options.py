@@ -0,0 +1,114 @@
+"""
+Date:   2026-10-18
+Desc:   Helpers for reading optional configuration values, so that older
+        configuration files without the newer keys keep working.
+"""
+
+
+import ConfigParser
+
+
+
+# Configuration values which have no effect on any result, as section.option.
+IGNORED_OPTIONS = [
+    "input.cache_dir",
+    "input.n_workers",
+    "input.s3_prefetch",
+    "input.s3_buffer_mb",
+    "input.s3_fake_dir",
+    "input.store_compression",
+    "crossval.n_jobs",
+    "crossval.job_memory_mb",
+    "meanshift.n_jobs",
+]
+
+# Configuration sections which have no effect on any result.
+IGNORED_SECTIONS = ["parallel", "output", "profile", "predict", "sweep"]
+
+
+
+# Get Option {{{
+def get_option( config, section, option, default ):
+    """
+    Get Option: read a configuration value, falling back to a default if the
+    section or key is missing or left blank. The value is cast to the type of
+    the default.
+
+    config:  ConfigParser with documented fields
+    section: the configuration section to read from
+    option:  the key within that section
+    default: the value to use if the key is not set
+
+    """
+
+    if not config.has_option( section, option ):
+        return default
+
+    value = config.get( section, option )
+    if value is None or value.strip() == "":
+        return default
+
+    value = value.strip()
+
+    if isinstance( default, bool ):
+        return value.lower() in ["1", "yes", "true", "on"]
+
+    if isinstance( default, int ):
+        return int( value )
+
+    if isinstance( default, float ):
+        return float( value )
+
+    return value
+# }}}
+
+
+
+# Section Values {{{
+def section_values( config, sections ):
+    """
+    Section Values: the raw values of a set of configuration sections, as a
+    dictionary of dictionaries, leaving out the sections and values which
+    have no effect on any result.
+
+    config:   ConfigParser with documented fields
+    sections: list of section names
+
+    """
+
+    values = {}
+
+    for section in sections:
+        if section in IGNORED_SECTIONS or not config.has_section( section ):
+            continue
+
+        values[ section ] = dict(
+            (option, value)
+            for (option, value) in config.items( section, raw=True )
+            if "%s.%s" % (section, option) not in IGNORED_OPTIONS )
+
+    return values
+# }}}
+
+
+
+# Copy Config {{{
+def copy_config( config ):
+    """
+    Copy Config: an independent copy of a configuration, which can then be
+    changed without affecting the original.
+
+    config: ConfigParser with documented fields
+
+    """
+
+    copied = ConfigParser.ConfigParser( allow_no_value=True )
+
+    for section in config.sections():
+        copied.add_section( section )
+
+        for (option, value) in config.items( section, raw=True ):
+            copied.set( section, option, value )
+
+    return copied
+# }}}
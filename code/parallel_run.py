@@ -0,0 +1,213 @@
+"""
+Date:   2026-10-18
+Desc:   Run several algorithms over the same vectorized corpus concurrently.
+        The corpus is written once as memory-mapped arrays which every worker
+        process maps, instead of pickling a copy to each of them.
+"""
+
+
+import os
+import shutil
+import logging
+import tempfile
+import importlib
+import multiprocessing
+
+import numpy
+import scipy.sparse
+
+from options import get_option
+from memory import available_memory_mb
+from corpus_cache import save_csr, load_csr
+
+
+
+# Share Matrix {{{
+def share_matrix( path, data, labels ):
+    """
+    Share Matrix: write a sparse or dense matrix and its labels into a
+    directory as .npy files, for attach_matrix to memory-map.
+
+    path:   the directory to write into
+    data:   the vectorized corpus, sparse or dense
+    labels: vector of ground-truth labels
+
+    """
+
+    if scipy.sparse.issparse( data ):
+        save_csr( path, data )
+    else:
+        numpy.save( os.path.join( path, "dense.npy" ), numpy.asarray( data ) )
+
+    numpy.save( os.path.join( path, "labels.npy" ), numpy.asarray( labels ) )
+# }}}
+
+
+
+# Attach Matrix {{{
+def attach_matrix( path ):
+    """
+    Attach Matrix: memory-map a matrix and labels written by share_matrix.
+    Pages are shared between every process mapping them, and are copied
+    only if a process writes to them. Returns a (data, labels) tuple.
+
+    path: the directory to read from
+
+    """
+
+    dense_path = os.path.join( path, "dense.npy" )
+
+    if os.path.exists( dense_path ):
+        data = numpy.load( dense_path, mmap_mode="c" )
+    else:
+        data = load_csr( path )
+
+    labels = numpy.load( os.path.join( path, "labels.npy" ) ).tolist()
+
+    return (data, labels)
+# }}}
+
+
+
+# Worker Count {{{
+def worker_count( n_tasks, config, section="parallel" ):
+    """
+    Worker Count: how many worker processes to run at once. Capped by the
+    configured number of jobs, the number of cores, the number of tasks and
+    how many jobs of the configured size fit in available memory.
+
+    n_tasks: the number of tasks to run
+    config:  ConfigParser with documented fields
+    section: the configuration section holding n_jobs and job_memory_mb
+
+    """
+
+    n_jobs        = get_option( config, section, "n_jobs", 1 )
+    job_memory_mb = get_option( config, section, "job_memory_mb", 0 )
+
+    if n_jobs <= 0:
+        n_jobs = multiprocessing.cpu_count()
+
+    n_workers = min( n_jobs, multiprocessing.cpu_count(), n_tasks )
+
+    available = available_memory_mb()
+    if job_memory_mb > 0 and available is not None:
+        n_workers = min( n_workers, int( available // job_memory_mb ) )
+
+    return max( n_workers, 1 )
+# }}}
+
+
+
+# Run Task {{{
+def run_task( job ):
+    """
+    Run Task: worker entry point. Maps the shared corpus and runs a single
+    algorithm from a driver module's algorithm table over it. Returns the
+    algorithm's metrics.
+
+    job: a (module_name, algorithm, path, config) tuple
+
+    """
+
+    (module_name, algorithm, path, config) = job
+
+    module = importlib.import_module( module_name )
+    (data, labels) = attach_matrix( path )
+
+    return module.algorithms[ algorithm ]( data, labels, config )
+# }}}
+
+
+
+# Run Tasks {{{
+def run_tasks( module_name, tasks, data, labels, config ):
+    """
+    Run Tasks: run a list of algorithms, each with its own configuration,
+    over the corpus. Tasks are fanned out to a process pool if [parallel]
+    n_jobs allows more than one at a time. Returns the list of metrics, in
+    task order.
+
+    module_name: the driver module holding the algorithm table
+    tasks:       list of (algorithm, config) tuples
+    data:        the vectorized corpus
+    labels:      vector of ground-truth labels
+    config:      ConfigParser with documented fields
+
+    """
+
+    module = importlib.import_module( module_name )
+    n_workers = worker_count( len( tasks ), config )
+
+    # Serial execution {{{
+    if n_workers <= 1:
+        return [module.algorithms[ algorithm ]( data, labels, task_config )
+                for (algorithm, task_config) in tasks]
+    # }}}
+
+    # Parallel execution {{{
+    logging.info("Running %d algorithms with %d workers." %
+                 (len( tasks ), n_workers) )
+
+    path = tempfile.mkdtemp( prefix="stackmining-" )
+
+    try:
+        share_matrix( path, data, labels )
+
+        jobs = [(module_name, algorithm, path, task_config)
+                for (algorithm, task_config) in tasks]
+
+        pool = multiprocessing.Pool( processes=n_workers )
+        try:
+            results = pool.map( run_task, jobs, chunksize=1 )
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree( path, ignore_errors=True )
+
+    return results
+    # }}}
+# }}}
+
+
+
+# Run Algorithms {{{
+def run_algorithms( module_name, requested, data, labels, config ):
+    """
+    Run Algorithms: run each requested algorithm over the corpus with the
+    same configuration, concurrently if configured. Returns a list of
+    (algorithm, metrics) tuples in request order.
+
+    module_name: the driver module holding the algorithm table
+    requested:   list of algorithm names
+    data:        the vectorized corpus
+    labels:      vector of ground-truth labels
+    config:      ConfigParser with documented fields
+
+    """
+
+    tasks   = [(algorithm, config) for algorithm in requested]
+    results = run_tasks( module_name, tasks, data, labels, config )
+
+    return zip( requested, results )
+# }}}
+
+
+
+# Report {{{
+def report( results ):
+    """
+    Report: log the metrics of every algorithm run side by side.
+
+    results: list of (algorithm, metrics) tuples
+
+    """
+
+    logging.info("Summary:")
+
+    for (algorithm, metrics) in results:
+        values = ", ".join( "%s: %.3f" % (name, metrics[ name ])
+                            for name in sorted( metrics ) )
+        logging.info("  |- %s: %s" % (algorithm, values))
+# }}}
@@ -0,0 +1,153 @@
+"""
+Date:   2026-10-18
+Desc:   Build and read byte-offset indices of the rows in Posts.xml files, so
+        that sampled rows can be read directly without scanning the file.
+        The index is a .npy array of offsets stored next to the XML file.
+"""
+
+
+import os
+import sys
+import mmap
+import logging
+
+import numpy
+
+from lxml import etree
+
+
+
+# Index Path {{{
+def index_path( posts_path ):
+    """
+    Index Path: location of the offset index sidecar for a Posts.xml file.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    return posts_path + ".idx.npy"
+# }}}
+
+
+
+# Build Index {{{
+def build_index( posts_path ):
+    """
+    Build Index: record the byte offset of every row in a Posts.xml file and
+    save the offsets next to it. Assumes one row per line, as in the dumps.
+    Returns the number of rows indexed.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    offsets = []
+    offset  = 0
+
+    with open( posts_path, "rb" ) as f:
+        for line in f:
+            if line.lstrip().startswith( "<row" ):
+                offsets.append( offset + len( line ) - len( line.lstrip() ) )
+            offset += len( line )
+
+    offsets = numpy.array( offsets, dtype=numpy.uint64 )
+    numpy.save( index_path( posts_path ), offsets )
+
+    return len( offsets )
+# }}}
+
+
+
+# Load Index {{{
+def load_index( posts_path ):
+    """
+    Load Index: memory-map the offset index of a Posts.xml file. Returns None
+    if there is no index, or if the file has changed since it was built.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    path = index_path( posts_path )
+
+    if not os.path.exists( path ):
+        return None
+
+    if os.path.getmtime( path ) < os.path.getmtime( posts_path ):
+        logging.warn("Ignoring stale row index for %s." % posts_path)
+        return None
+
+    return numpy.load( path, mmap_mode="r" )
+# }}}
+
+
+
+# Row Reader {{{
+class RowReader( object ):
+    """
+    Row Reader: read individual rows of a memory-mapped Posts.xml file by
+    their byte offsets.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    def __init__( self, posts_path ):
+
+        self.handle = open( posts_path, "rb" )
+        self.mm = mmap.mmap( self.handle.fileno(), 0, access=mmap.ACCESS_READ )
+
+
+    def body( self, offset ):
+        """
+        Body: parse the row starting at a byte offset and return its raw
+        Body attribute.
+        """
+
+        offset = int( offset )
+
+        end = self.mm.find( "\n", offset )
+        if end < 0:
+            end = len( self.mm )
+
+        row = etree.fromstring( self.mm[ offset : end ] )
+        return row.get( "Body", u"" )
+
+
+    def close( self ):
+        """
+        Close: release the memory map and file handle.
+        """
+
+        self.mm.close()
+        self.handle.close()
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    if len( sys.argv ) != 3:
+        logging.error( "Usage: python post_index.py [data_dir] [post_file]" )
+        sys.exit( 1 )
+
+    data_dir  = sys.argv[1]
+    post_file = sys.argv[2]
+
+    # index every site in the data directory
+    for site in sorted( os.listdir( data_dir ) ):
+
+        posts_path = os.path.join( data_dir, site, post_file )
+        if not os.path.exists( posts_path ):
+            continue
+
+        num_rows = build_index( posts_path )
+        logging.info("Indexed %d rows in %s." % (num_rows, posts_path))
+
+# }}}
@@ -0,0 +1,209 @@
+"""
+Date:   2026-10-18
+Desc:   Write and read pre-parsed binary stores of the posts in Posts.xml
+        files, so the corpus can be read without parsing XML or stripping
+        html again. Each store is a directory next to the XML file holding
+        the cleaned bodies back to back in a blob, their byte offsets and
+        post ids as .npy arrays, and a small JSON description.
+"""
+
+
+import os
+import json
+import mmap
+import zlib
+import shutil
+import logging
+import tempfile
+
+import numpy
+
+
+
+# Store Path {{{
+def store_path( posts_path ):
+    """
+    Store Path: location of the binary store for a Posts.xml file.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    return posts_path + ".store"
+# }}}
+
+
+
+# Write Store {{{
+def write_store( posts_path, label, posts, compression=0 ):
+    """
+    Write Store: write the cleaned posts of a Posts.xml file into its binary
+    store, replacing any earlier one. Bodies are streamed into the blob as
+    they come, so only their offsets are held in memory. Byte strings are
+    written as they are and unicode bodies as UTF-8. Returns the number of
+    posts written.
+
+    posts_path:  the Posts.xml file the posts were read from
+    label:       the site's category
+    posts:       iterable of (post id, cleaned body) pairs
+    compression: zlib level each body is compressed with, 0 for none
+
+    """
+
+    path    = store_path( posts_path )
+    staging = tempfile.mkdtemp( dir=os.path.dirname( os.path.abspath( path ) ),
+                                prefix=".staging-" )
+
+    offsets = [0]
+    ids     = []
+
+    try:
+        with open( os.path.join( staging, "blob" ), "wb" ) as blob:
+            for (post_id, body) in posts:
+                record = body
+                if isinstance( record, unicode ):
+                    record = record.encode( "utf-8" )
+                if compression > 0:
+                    record = zlib.compress( record, compression )
+
+                blob.write( record )
+                offsets.append( offsets[-1] + len( record ) )
+                ids.append( post_id )
+
+        numpy.save( os.path.join( staging, "offsets.npy" ),
+                    numpy.array( offsets, dtype=numpy.uint64 ) )
+        numpy.save( os.path.join( staging, "ids.npy" ),
+                    numpy.array( ids, dtype=numpy.int64 ) )
+
+        description = {
+            "label":       label,
+            "compression": compression,
+            "n_posts":     len( ids ),
+        }
+        with open( os.path.join( staging, "store.json" ), "w" ) as f:
+            json.dump( description, f, indent=2, sort_keys=True )
+
+    except:
+        shutil.rmtree( staging, ignore_errors=True )
+        raise
+
+    if os.path.isdir( path ):
+        shutil.rmtree( path )
+    os.rename( staging, path )
+
+    return len( ids )
+# }}}
+
+
+
+# Load Store {{{
+def load_store( posts_path ):
+    """
+    Load Store: open the binary store of a Posts.xml file. Returns None if
+    there is no store, or if the file has changed since it was written.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    if not store_current( posts_path ):
+        return None
+
+    return PostStore( store_path( posts_path ) )
+# }}}
+
+
+
+# Store Current {{{
+def store_current( posts_path ):
+    """
+    Store Current: whether a Posts.xml file has a binary store written since
+    the file last changed.
+
+    posts_path: the Posts.xml file
+
+    """
+
+    path = store_path( posts_path )
+
+    if not os.path.exists( os.path.join( path, "store.json" ) ):
+        return False
+
+    if (os.path.exists( posts_path ) and
+            os.path.getmtime( path ) < os.path.getmtime( posts_path )):
+        logging.warn("Ignoring stale post store for %s." % posts_path)
+        return False
+
+    return True
+# }}}
+
+
+
+# Post Store {{{
+class PostStore( object ):
+    """
+    Post Store: read the posts of a binary store by their position, through
+    a memory map of its blob.
+
+    path: the store directory
+
+    """
+
+    def __init__( self, path ):
+
+        with open( os.path.join( path, "store.json" ) ) as f:
+            description = json.load( f )
+
+        self.label       = description["label"]
+        self.compression = description["compression"]
+
+        self.offsets = numpy.load( os.path.join( path, "offsets.npy" ),
+                                   mmap_mode="r" )
+        self.ids     = numpy.load( os.path.join( path, "ids.npy" ),
+                                   mmap_mode="r" )
+
+        # an empty file cannot be mapped
+        self.handle = open( os.path.join( path, "blob" ), "rb" )
+        self.mm = None
+        if self.offsets[-1] > 0:
+            self.mm = mmap.mmap( self.handle.fileno(), 0,
+                                 access=mmap.ACCESS_READ )
+
+
+    def __len__( self ):
+
+        return len( self.ids )
+
+
+    def body( self, position ):
+        """
+        Body: the cleaned body of the post at a position in the store, as
+        the byte string it was written as (clean_body yields ASCII str).
+        """
+
+        record = self.mm[ int( self.offsets[ position ] ) :
+                          int( self.offsets[ position + 1 ] ) ]
+
+        if self.compression > 0:
+            record = zlib.decompress( record )
+
+        return record
+
+
+    def size( self, position ):
+        """
+        Size: the number of bytes stored for the post at a position.
+        """
+
+        return int( self.offsets[ position + 1 ] - self.offsets[ position ] )
+
+
+    def close( self ):
+        """
+        Close: release the memory map and file handle.
+        """
+
+        if self.mm is not None:
+            self.mm.close()
+        self.handle.close()
+# }}}
@@ -0,0 +1,132 @@
+"""
+Date:   2026-10-18
+Desc:   Label new posts in batches with a classifier or clusterer saved by
+        classifier.py or cluster.py. The saved vectorizer, reduction and
+        estimator are loaded once, their arrays memory-mapped rather than
+        read in, and the new posts are streamed through them a batch at a
+        time.
+"""
+
+
+import sys
+import logging
+import ConfigParser
+from time import time
+from collections import Counter
+
+from options import get_option
+from vectorize_data import iter_batches
+from model_store import load_vectorizer, load_estimator
+
+
+
+# Predict Posts {{{
+def predict_posts( config, name, post_files ):
+    """
+    Predict Posts: label the posts of each file with the saved estimator.
+    Predictions are written as tab separated lines of file, post number
+    within the file and label. Returns the number of posts labelled.
+
+    config:     ConfigParser with documented fields
+    name:       the algorithm name the estimator was saved under
+    post_files: list of Posts.xml files holding the new posts
+
+    """
+
+    model_dir  = config.get("output", "model_dir")
+    batch_size = get_option( config, "predict", "batch_size", 1000 )
+    out_file   = get_option( config, "predict", "predictions_file", "" )
+
+    # cold start: everything needed before the first post can be labelled
+    t0 = time()
+    vectorizer = load_vectorizer( model_dir )
+    (estimator, reduction, info) = load_estimator( model_dir, name )
+    t1 = time()
+
+    logging.info("Loaded %s (%s) from %s in %.3fs." %
+                 (name, info["estimator"], model_dir, t1 - t0))
+
+    if not hasattr( estimator, "predict" ):
+        logging.error("Saved %s estimator cannot label new posts." % name)
+        sys.exit(1)
+
+    out = open( out_file, "a" ) if out_file else None
+    counts = Counter()
+    n_posts = 0
+
+    try:
+        for in_file in post_files:
+            position = 0
+
+            for batch in iter_batches( in_file, batch_size ):
+                data = vectorizer.transform( batch )
+
+                # reduce the posts as the estimator's input was
+                if reduction is not None:
+                    data = reduction.transform( data )
+                elif not info["sparse"]:
+                    data = data.toarray()
+
+                if data.shape[1] != info["n_features"]:
+                    logging.error("Saved %s estimator expects %d features, "
+                                  "not the %d of the saved vectorizer." %
+                                  (name, info["n_features"], data.shape[1]))
+                    sys.exit(1)
+
+                predicted = estimator.predict( data )
+                counts.update( predicted )
+
+                if out is not None:
+                    for (offset, label) in enumerate( predicted ):
+                        out.write( "%s\t%d\t%s\n" %
+                                   (in_file, position + offset, label) )
+
+                position += len( batch )
+
+            logging.info("Labelled %d posts from %s." % (position, in_file))
+            n_posts += position
+
+    finally:
+        if out is not None:
+            out.close()
+
+    t2 = time()
+
+    logging.info("  |-      Cold start time: %fs" % (t1 - t0))
+    logging.info("  |-      Prediction time: %fs" % (t2 - t1))
+    logging.info("  |-       Posts labelled: %d" % n_posts)
+    logging.info("  |-           Throughput: %.0f posts/s" %
+                 (n_posts / max( t2 - t1, 1e-9 )))
+    logging.info("  |-         Label counts: %s" % sorted( counts.items() ))
+
+    return n_posts
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    # ensure we have at least the minimum required params
+    if len( sys.argv ) < 5:
+        logging.error( "Usage: python predict.py [input.ini] [config.ini] "
+                       "[algorithm] [Posts.xml ...]" )
+        sys.exit( 1 )
+
+    # pull in parameters from the command line
+    input_file  = sys.argv[1]
+    config_file = sys.argv[2]
+    algorithm   = sys.argv[3]
+    post_files  = sys.argv[4:]
+
+    # read configuration file
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    config.readfp( open( input_file ) )
+    config.readfp( open( config_file ) )
+
+    predict_posts( config, algorithm, post_files )
+# }}}
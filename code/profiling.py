@@ -0,0 +1,210 @@
+"""
+Date:   2026-10-18
+Desc:   Lightweight per-phase instrumentation of the pipeline: wall time, CPU
+        time, posts and bytes processed and peak memory, plus optional
+        cProfile output for a single phase. Switched on through the
+        [profile] configuration section.
+"""
+
+
+import os
+import time
+import logging
+import cProfile
+
+from options import get_option
+from memory import MemoryWatch
+
+
+# Number of cProfile dumps written by this process.
+dump_count = 0
+
+
+# CPU Time {{{
+def cpu_time():
+    """
+    CPU Time: user plus system CPU seconds used by this process so far.
+    """
+
+    times = os.times()
+    return times[0] + times[1]
+# }}}
+
+
+
+# Counting Reader {{{
+class CountingReader( object ):
+    """
+    Counting Reader: wrap a file handle, counting the bytes read through it.
+
+    handle: the file handle to wrap
+
+    """
+
+    def __init__( self, handle ):
+
+        self.handle = handle
+        self.count  = 0
+
+
+    def read( self, size=-1 ):
+        """
+        Read: read from the wrapped handle, counting the bytes returned.
+        """
+
+        data = self.handle.read( size )
+        self.count += len( data )
+        return data
+
+
+    def close( self ):
+        """
+        Close: close the wrapped handle.
+        """
+
+        self.handle.close()
+# }}}
+
+
+
+# Phase {{{
+class Phase( object ):
+    """
+    Phase: accumulate measurements of one phase of the pipeline. A phase can
+    be used as a context manager, or started and stopped repeatedly (eg.
+    around each step of a generator) and reported once at the end. When
+    profiling is disabled every method returns immediately.
+
+    name:   the phase name, also used to select it for cProfile
+    config: ConfigParser with documented fields, or None to disable
+    detail: optional description of what the phase is working on
+
+    """
+
+    def __init__( self, name, config, detail=None ):
+
+        self.name   = name
+        self.detail = detail
+
+        self.enabled = (config is not None and
+                        get_option( config, "profile", "enabled", False ))
+
+        self.profiler = None
+        if self.enabled:
+            cprofile_phase = get_option( config, "profile",
+                                         "cprofile_phase", "" )
+            self.dump_dir  = get_option( config, "profile", "dump_dir", "." )
+
+            if cprofile_phase == name:
+                self.profiler = cProfile.Profile()
+
+        self.wall    = 0.0
+        self.cpu     = 0.0
+        self.posts   = 0
+        self.bytes   = 0
+        self.started = None
+        self.memory  = None
+
+
+    def start( self ):
+        """
+        Start: begin (or resume) timing the phase.
+        """
+
+        if not self.enabled or self.started is not None:
+            return
+
+        # watch memory from the first start until the report
+        if self.memory is None:
+            self.memory = MemoryWatch()
+            self.memory.start()
+
+        self.started = (time.time(), cpu_time())
+
+        if self.profiler is not None:
+            self.profiler.enable()
+
+
+    def stop( self ):
+        """
+        Stop: pause timing the phase, adding the elapsed time to its totals.
+        """
+
+        if not self.enabled or self.started is None:
+            return
+
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        (wall_start, cpu_start) = self.started
+        self.wall += time.time() - wall_start
+        self.cpu  += cpu_time() - cpu_start
+        self.started = None
+
+
+    def add( self, posts=0, num_bytes=0 ):
+        """
+        Add: count posts and bytes processed during the phase.
+        """
+
+        self.posts += posts
+        self.bytes += num_bytes
+
+
+    def report( self ):
+        """
+        Report: log the phase totals, and dump its cProfile statistics if it
+        was selected for profiling.
+        """
+
+        if not self.enabled:
+            return
+
+        self.stop()
+
+        message = "Phase %s" % self.name
+        if self.detail is not None:
+            message += " (%s)" % self.detail
+
+        message += ": wall %.3fs, cpu %.3fs" % (self.wall, self.cpu)
+
+        if self.posts > 0:
+            message += ", %d posts (%.0f posts/s)" % (
+                self.posts, self.posts / max( self.wall, 1e-9 ))
+
+        if self.bytes > 0:
+            megabytes = self.bytes / 1048576.0
+            message += ", %.1f MB read (%.1f MB/s)" % (
+                megabytes, megabytes / max( self.wall, 1e-9 ))
+
+        if self.memory is not None:
+            self.memory.stop()
+            message += ", peak memory %.1f MB (%+.1f MB)" % (
+                self.memory.peak_mb, self.memory.delta_mb)
+            self.memory = None
+
+        logging.info( message )
+
+        if self.profiler is not None:
+            # A phase may run once per site; number the dumps so they do
+            # not overwrite one another.
+            global dump_count
+            dump_count += 1
+            path = os.path.join( self.dump_dir, "%s.%d.%d.pstats" %
+                                 (self.name, os.getpid(), dump_count) )
+            self.profiler.dump_stats( path )
+            logging.info("Wrote cProfile statistics for %s to %s." %
+                         (self.name, path))
+
+
+    def __enter__( self ):
+
+        self.start()
+        return self
+
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+
+        self.report()
+        return False
+# }}}
@@ -0,0 +1,181 @@
+"""
+Date:   2026-10-18
+Desc:   Prepare the sparse TF-IDF matrix for estimators, keeping it sparse
+        where they support it and reducing its dimensionality before
+        densifying it where they don't.
+"""
+
+
+import logging
+
+import numpy
+import scipy.sparse
+
+from sklearn.decomposition import TruncatedSVD
+
+from options import get_option
+from profiling import Phase
+
+
+
+# Width reduced to when densifying at full width would exceed max_dense_mb.
+DEFAULT_COMPONENTS = 200
+
+
+
+# Megabytes {{{
+def megabytes( num_bytes ):
+    """
+    Megabytes: convert a byte count to megabytes.
+    """
+
+    return num_bytes / (1024.0 * 1024.0)
+# }}}
+
+
+
+# Sparse Bytes {{{
+def sparse_bytes( data ):
+    """
+    Sparse Bytes: memory held by the arrays of a sparse (or dense) matrix.
+    """
+
+    if scipy.sparse.issparse( data ):
+        data = scipy.sparse.csr_matrix( data )
+        return data.data.nbytes + data.indices.nbytes + data.indptr.nbytes
+
+    return numpy.asarray( data ).nbytes
+# }}}
+
+
+
+# Dense Bytes {{{
+def dense_bytes( data ):
+    """
+    Dense Bytes: memory needed to hold a matrix as a dense float64 array.
+    """
+
+    return data.shape[0] * data.shape[1] * numpy.dtype( numpy.float64 ).itemsize
+# }}}
+
+
+
+# Keep Sparse {{{
+def keep_sparse( data ):
+    """
+    Keep Sparse: hand the sparse matrix to an estimator as is, logging the
+    memory this saves over densifying it.
+
+    data: the sparse TF-IDF matrix
+
+    """
+
+    logging.info("Keeping input sparse: %.1f MB instead of %.1f MB dense." %
+                 (megabytes( sparse_bytes( data ) ),
+                  megabytes( dense_bytes( data ) )) )
+
+    return data
+# }}}
+
+
+
+# Reduce Dimensions {{{
+def reduce_dimensions( data, config, n_components=None ):
+    """
+    Reduce Dimensions: project the sparse matrix onto its leading singular
+    vectors with TruncatedSVD, without densifying it first. Returns a
+    (reduced, svd) tuple of the dense array and the fitted TruncatedSVD, to
+    reduce new posts the same way, or of the input unchanged and None if no
+    reduction is configured.
+
+    data:         the sparse TF-IDF matrix
+    config:       ConfigParser with documented fields
+    n_components: width to reduce to, defaults to [reduce] n_components
+
+    """
+
+    if n_components is None:
+        n_components = get_option( config, "reduce", "n_components", 0 )
+
+    random_state = get_option( config, "reduce", "random_state", 0 )
+
+    if n_components <= 0 or n_components >= data.shape[1]:
+        return (data, None)
+
+    svd = TruncatedSVD(
+        n_components=n_components,  # width of the reduced space
+        random_state=random_state,  # repeatable projections
+    )
+
+    reduced = svd.fit_transform( data )
+
+    logging.info("Reduced %d features to %d components "
+                 "(%.3f of variance explained)." %
+                 (data.shape[1], n_components,
+                  svd.explained_variance_ratio_.sum()) )
+
+    return (reduced, svd)
+# }}}
+
+
+
+# Densify {{{
+def densify( data, config ):
+    """
+    Densify: produce a dense array for estimators which can't take sparse
+    input. If [reduce] n_components is set the matrix is reduced to that
+    width first. Otherwise it is densified at full width only if that fits
+    in [reduce] max_dense_mb, and is reduced to at most DEFAULT_COMPONENTS
+    (fewer, if need be, to fit) if it doesn't. Returns a (dense, svd)
+    tuple, svd being the fitted TruncatedSVD or None if the matrix was
+    densified at full width. Raises MemoryError if not even a single
+    component fits.
+
+    data:   the sparse TF-IDF matrix
+    config: ConfigParser with documented fields
+
+    """
+
+    if not scipy.sparse.issparse( data ):
+        return (data, None)
+
+    n_components = get_option( config, "reduce", "n_components", 0 )
+    max_dense_mb = get_option( config, "reduce", "max_dense_mb", 1024.0 )
+
+    full_size = dense_bytes( data )
+
+    # refuse to densify at full width beyond the memory limit
+    if (n_components <= 0 and max_dense_mb > 0 and
+            megabytes( full_size ) > max_dense_mb):
+
+        column_mb    = megabytes( dense_bytes( data[:, :1] ) )
+        n_components = min( DEFAULT_COMPONENTS,
+                            int( max_dense_mb / max( column_mb, 1e-9 ) ) )
+
+        if n_components < 1:
+            raise MemoryError( "A single dense column of %d posts exceeds "
+                               "max_dense_mb (%.1f MB)." %
+                               (data.shape[0], max_dense_mb) )
+
+        logging.warn("Densifying full input would take %.1f MB, over "
+                     "max_dense_mb (%.1f MB); reducing to %d components." %
+                     (megabytes( full_size ), max_dense_mb, n_components))
+
+    with Phase( "densify", config ) as phase:
+        (reduced, svd) = reduce_dimensions( data, config, n_components )
+
+        if scipy.sparse.issparse( reduced ):
+            logging.warn("Densifying full input: %.1f MB." %
+                         megabytes( full_size ))
+            reduced = reduced.toarray()
+
+        phase.add( posts=data.shape[0] )
+
+    if svd is None:
+        return (reduced, None)
+
+    logging.info("Densified reduced input: %.1f MB instead of %.1f MB." %
+                 (megabytes( reduced.nbytes ), megabytes( full_size )) )
+
+    return (reduced, svd)
+# }}}
@@ -0,0 +1,240 @@
+"""
+Date:   2026-10-18
+Desc:   Read objects from s3 as streams, and prefetch upcoming objects in
+        background threads while the current one is being parsed. A
+        directory-backed store stands in for s3 when testing.
+"""
+
+
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from urlparse import urlparse
+from multiprocessing.pool import ThreadPool
+
+from options import get_option
+
+
+
+# Size of each chunk copied into a prefetch buffer.
+CHUNK_SIZE = 1024 * 1024
+
+
+
+# S3 Location {{{
+def s3_location( url ):
+    """
+    S3 Location: split an s3 url into its bucket name and key name, the same
+    way s3file does.
+
+    url: an s3:// or http(s):// url to an s3 object
+
+    """
+
+    parsed = urlparse( url )
+
+    bucket = parsed.netloc
+    if bucket.endswith( ".s3.amazonaws.com" ):
+        bucket = bucket[ : -len( ".s3.amazonaws.com" ) ]
+
+    return (bucket, parsed.path.lstrip( "/" ))
+# }}}
+
+
+
+# S3 Store {{{
+class S3Store( object ):
+    """
+    S3 Store: open s3 objects as streams. Each thread keeps its own
+    connection, which boto reuses (and pools HTTP connections for) across
+    every object that thread reads.
+    """
+
+    def __init__( self ):
+
+        self.local = threading.local()
+
+
+    def locate( self, url ):
+        """
+        Locate: the bucket holding an s3 object, on this thread's connection,
+        and the object's key name. Nothing is requested from s3.
+        """
+
+        from boto.s3.connection import S3Connection
+
+        if not hasattr( self.local, "connection" ):
+            self.local.connection = S3Connection()
+
+        (bucket_name, key_name) = s3_location( url )
+        bucket = self.local.connection.get_bucket( bucket_name, validate=False )
+
+        return (bucket, key_name)
+
+
+    def open( self, url ):
+        """
+        Open: stream an s3 object. The returned key supports read and close.
+        The object is requested with a single GET; its headers were already
+        read by stat for the corpus cache, if caching is on.
+        """
+
+        from boto.exception import S3ResponseError
+
+        (bucket, key_name) = self.locate( url )
+        key = bucket.new_key( key_name )
+
+        try:
+            key.open_read()
+        except S3ResponseError as e:
+            if e.status == 404:
+                raise IOError( "No such s3 object: %s" % url )
+            raise
+
+        return key
+
+
+    def stat( self, url ):
+        """
+        Stat: the size and ETag of an s3 object, from its headers alone.
+        Returns (-1, "") for a missing object.
+        """
+
+        (bucket, key_name) = self.locate( url )
+
+        key = bucket.get_key( key_name )
+        if key is None:
+            return (-1, "")
+
+        return (int( key.size ), key.etag or key.last_modified or "")
+# }}}
+
+
+
+# Directory Store {{{
+class DirectoryStore( object ):
+    """
+    Directory Store: a local stand-in for s3, where the object at
+    s3://bucket/key lives at root/bucket/key.
+
+    root: the directory holding one subdirectory per bucket
+
+    """
+
+    def __init__( self, root ):
+
+        self.root = root
+
+
+    def open( self, url ):
+        """
+        Open: open the file standing in for an s3 object.
+        """
+
+        (bucket_name, key_name) = s3_location( url )
+        return open( os.path.join( self.root, bucket_name, key_name ), "rb" )
+
+
+    def stat( self, url ):
+        """
+        Stat: the size and mtime of the file standing in for an s3 object.
+        Returns (-1, "") for a missing object.
+        """
+
+        (bucket_name, key_name) = s3_location( url )
+        path = os.path.join( self.root, bucket_name, key_name )
+
+        if not os.path.exists( path ):
+            return (-1, "")
+
+        stat = os.stat( path )
+        return (stat.st_size, str( int( stat.st_mtime ) ))
+# }}}
+
+
+
+# Make Store {{{
+def make_store( config ):
+    """
+    Make Store: the store to read s3 input through. If s3_fake_dir is set,
+    objects are read from that directory instead of from s3.
+
+    config: ConfigParser with documented fields
+
+    """
+
+    fake_dir = get_option( config, "input", "s3_fake_dir", "" )
+
+    if fake_dir:
+        return DirectoryStore( fake_dir )
+
+    return S3Store()
+# }}}
+
+
+
+# Fetch {{{
+def fetch( store, url, buffer_size ):
+    """
+    Fetch: copy an object into a buffer which is held in memory up to
+    buffer_size bytes and spills to a temporary file beyond that. Returns
+    the buffer, rewound to the start.
+
+    store:       the store to read from
+    url:         the object to read
+    buffer_size: bytes to hold in memory before spilling to disk
+
+    """
+
+    buffer = tempfile.SpooledTemporaryFile( max_size=buffer_size )
+
+    handle = store.open( url )
+    try:
+        shutil.copyfileobj( handle, buffer, CHUNK_SIZE )
+    finally:
+        handle.close()
+
+    buffer.seek( 0 )
+    return buffer
+# }}}
+
+
+
+# Prefetch {{{
+def prefetch( store, urls, depth, buffer_size ):
+    """
+    Prefetch: yield a (url, handle) pair for each url, in order, while
+    background threads download up to depth of the following objects. At
+    most depth objects are buffered ahead of the consumer at any time.
+
+    store:       the store to read from
+    urls:        list of object urls
+    depth:       number of objects to fetch ahead
+    buffer_size: bytes of each object to hold in memory
+
+    """
+
+    pool    = ThreadPool( processes=depth )
+    pending = []
+
+    try:
+        for (index, url) in enumerate( urls ):
+
+            # keep the next depth objects in flight
+            while len( pending ) < depth and index + len( pending ) < len( urls ):
+                next_url = urls[ index + len( pending ) ]
+                pending.append(
+                    pool.apply_async( fetch, (store, next_url, buffer_size) ) )
+
+            buffer = pending.pop( 0 ).get()
+
+            try:
+                yield (url, buffer)
+            finally:
+                buffer.close()
+    finally:
+        pool.terminate()
+        pool.join()
+# }}}
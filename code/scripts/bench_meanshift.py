@@ -0,0 +1,114 @@
+"""
+Date:   2026-10-18
+Desc:   Benchmark how binned, parallel Mean Shift scales with the number of
+        posts, against sklearn's seed-per-post Mean Shift, over growing
+        samples of the reduced corpus.
+"""
+
+
+import os
+import sys
+import logging
+import ConfigParser
+from time import time
+
+import numpy
+import scipy.sparse
+
+from sklearn import cluster
+from sklearn import metrics
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from options import get_option
+from vectorize_data import vectorize_data
+from reduction import reduce_dimensions
+from sparse_cluster import ParallelMeanShift
+
+
+
+# Time Fit {{{
+def time_fit( clusterer, points, labels ):
+    """
+    Time Fit: fit a clusterer, returning the runtime, the number of clusters
+    found and the V-measure against the ground-truth labels.
+    """
+
+    t0 = time()
+    clusterer.fit( points )
+    t1 = time()
+
+    n_clusters = len( set( clusterer.labels_ ) )
+    v_measure  = metrics.v_measure_score( labels, clusterer.labels_ )
+
+    return (t1 - t0, n_clusters, v_measure)
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.INFO,
+                        format='%(levelname)s: %(message)s')
+
+    if len( sys.argv ) not in [3, 4]:
+        logging.error( "Usage: python bench_meanshift.py [input.ini] "
+                       "[cluster.ini] [dense limit]" )
+        sys.exit( 1 )
+
+    # read configuration file
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    config.readfp( open( sys.argv[1] ) )
+    config.readfp( open( sys.argv[2] ) )
+
+    # largest sample to also run the seed-per-post sklearn Mean Shift over
+    dense_limit = int( sys.argv[3] ) if len( sys.argv ) == 4 else 4000
+
+    n_components = get_option( config, "meanshift", "n_components", 10 )
+    n_jobs       = get_option( config, "meanshift", "n_jobs", 0 )
+
+    (labels, data) = vectorize_data( config )
+    labels = numpy.asarray( labels )
+
+    (points, svd) = reduce_dimensions( data, config, n_components )
+    if scipy.sparse.issparse( points ):
+        points = points.toarray()
+
+    # fit over doubling samples of the corpus, up to all of it
+    random = numpy.random.RandomState( 0 )
+    order  = random.permutation( points.shape[0] )
+
+    sizes = []
+    size  = 1000
+    while size < points.shape[0]:
+        sizes.append( size )
+        size *= 2
+    sizes.append( points.shape[0] )
+
+    logging.info("%8s %8s %5s %9s %10s %9s %9s" %
+                 ("posts", "method", "jobs", "seconds", "posts/s",
+                  "clusters", "v-measure"))
+
+    for size in sizes:
+        sample = order[:size]
+
+        runs = [("binned", 1, ParallelMeanShift( n_jobs=1 ))]
+        if n_jobs != 1:
+            runs.append( ("binned", n_jobs,
+                          ParallelMeanShift( n_jobs=n_jobs )) )
+        if size <= dense_limit:
+            runs.append( ("sklearn", 1,
+                          cluster.MeanShift( cluster_all=True )) )
+
+        for (method, jobs, clusterer) in runs:
+            (runtime, n_clusters, v_measure) = time_fit( clusterer,
+                                                         points[sample],
+                                                         labels[sample] )
+            logging.info("%8d %8s %5s %9.3f %10.0f %9d %9.3f" %
+                         (size, method, jobs or "all", runtime,
+                          size / max( runtime, 1e-9 ), n_clusters,
+                          v_measure))
+
+# }}}
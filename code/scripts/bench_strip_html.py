@@ -0,0 +1,106 @@
+"""
+Date:   2026-10-18
+Desc:   Benchmark HTML stripping throughput, in posts per second, for the
+        fast tokenizer path against the full lxml DOM path over a sample
+        Posts.xml file.
+"""
+
+
+import os
+import sys
+import logging
+from time import time
+
+from lxml import etree
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from html_text import strip_html, fast_text_content, dom_text_content
+
+
+
+# Read Bodies {{{
+def read_bodies( in_file, limit ):
+    """
+    Read Bodies: pull the raw, non-empty post bodies out of a Posts.xml file.
+
+    in_file: the Posts.xml file to read
+    limit:   maximum number of bodies to read, or 0 for all of them
+
+    """
+
+    bodies = []
+    for event, element in etree.iterparse( in_file, tag="row" ):
+
+        body = element.get( "Body", u"" ).strip()
+        element.clear()
+
+        if len( body ) == 0:
+            continue
+
+        bodies.append( body )
+
+        if limit > 0 and len( bodies ) >= limit:
+            break
+
+    return bodies
+# }}}
+
+
+
+# Time Stripper {{{
+def time_stripper( stripper, bodies ):
+    """
+    Time Stripper: run a stripping function over every body, returning the
+    throughput in posts per second and the list of outputs.
+
+    stripper: function from a raw body to its text content
+    bodies:   list of raw post bodies
+
+    """
+
+    t0 = time()
+    texts = [stripper( body ) for body in bodies]
+    t1 = time()
+
+    return (len( bodies ) / max( t1 - t0, 1e-9 ), texts)
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    if len( sys.argv ) not in [2, 3]:
+        logging.error( "Usage: python bench_strip_html.py [Posts.xml] [limit]" )
+        sys.exit( 1 )
+
+    in_file = sys.argv[1]
+    limit   = int( sys.argv[2] ) if len( sys.argv ) == 3 else 0
+
+    bodies = read_bodies( in_file, limit )
+    logging.info("Read %d post bodies from %s." % (len( bodies ), in_file))
+
+    (dom_rate, dom_texts)   = time_stripper( dom_text_content, bodies )
+    (fast_rate, fast_texts) = time_stripper( strip_html, bodies )
+
+    # how often the fast tokenizer handled a body without falling back, and
+    # how often its output matched the DOM output exactly (modulo padding)
+    fast_hits = sum( 1 for body in bodies
+                     if fast_text_content( body ) is not None )
+    matches   = sum( 1 for (a, b) in zip( dom_texts, fast_texts )
+                     if (a or u"").strip() == (b or u"").strip() )
+
+    logging.info("  |-        DOM throughput: %.0f posts/s" % dom_rate)
+    logging.info("  |-       Fast throughput: %.0f posts/s" % fast_rate)
+    logging.info("  |-               Speedup: %.2fx" % (fast_rate / dom_rate))
+    logging.info("  |-    Fast path hit rate: %.3f" %
+                 (float( fast_hits ) / max( len( bodies ), 1 )))
+    logging.info("  |-   Matching DOM output: %.3f" %
+                 (float( matches ) / max( len( bodies ), 1 )))
+
+# }}}
@@ -1,56 +1,223 @@
 """
 Author: Michel Rouly
 Date:   2014-05-07
-Desc:   Small, hackish script to sequentially pull files on s3 pointed to
-        by an index file into a local directory.
+Desc:   Small, hackish script to pull files on s3 pointed to by an index file
+        into a local directory. Sites are downloaded concurrently in fixed
+        size chunks, and partially downloaded files are resumed.
 """
 
 
 import os
 import sys
+import hashlib
 import logging
+import threading
+from time import time
+from multiprocessing.pool import ThreadPool
+
+from boto.s3.connection import S3Connection
 from s3file import s3open
 
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from s3_store import s3_location
+
+
+
+# Size of each chunk streamed from s3 to disk.
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# One s3 connection per download thread.
+connections = threading.local()
+
+
+
+# Get Key {{{
+def get_key( url ):
+    """
+    Get Key: look up an s3 object (with its size and etag) over this
+    thread's connection, or None if it doesn't exist.
+
+    url: an s3:// or http(s):// url to an s3 object
+
+    """
+
+    if not hasattr( connections, "s3" ):
+        connections.s3 = S3Connection()
+
+    (bucket_name, key_name) = s3_location( url )
+    bucket = connections.s3.get_bucket( bucket_name, validate=False )
+
+    return bucket.get_key( key_name )
+# }}}
+
+
+
+# File MD5 {{{
+def file_md5( path ):
+    """
+    File MD5: hex digest of a local file, read in chunks.
+
+    path: the local file
+
+    """
+
+    digest = hashlib.md5()
+
+    with open( path, "rb" ) as f:
+        for chunk in iter( lambda: f.read( CHUNK_SIZE ), "" ):
+            digest.update( chunk )
+
+    return digest.hexdigest()
+# }}}
+
+
+
+# Pull Site {{{
+def pull_site( job ):
+    """
+    Pull Site: download (or finish downloading) a single site's Posts.xml.
+    Partial local files are resumed with a ranged read, and the result is
+    checked against the remote size and, for single-part uploads, the
+    etag. A file failing the check is removed, so that a rerun starts it
+    over. Returns the site name, the number of bytes transferred and
+    whether the local file is complete.
+
+    job: a (s3_url, site_name, output_dir) tuple
 
+    """
+
+    (s3_url, site_name, output_dir) = job
+
+    site_posts = site_name + "/Posts.xml"
+    local_path = os.path.join( output_dir, site_posts )
+
+    key = get_key( s3_url + "/" + site_posts )
+    if key is None:
+        logging.error("Site '%s' has no posts on s3." % site_name)
+        return (site_name, 0, False)
+
+    # make the output directory if needed
+    if not os.path.isdir( os.path.dirname( local_path ) ):
+        os.makedirs( os.path.dirname( local_path ) )
+
+    offset = 0
+    if os.path.exists( local_path ):
+        offset = os.path.getsize( local_path )
+
+    # a local file larger than the remote one is stale, start over
+    if offset > key.size:
+        logging.warn("Site '%s' is larger locally, restarting." % site_name)
+        offset = 0
+        open( local_path, "wb" ).close()
+
+    transferred = 0
+
+    if offset < key.size:
+        if offset > 0:
+            logging.info("Resuming '%s' at byte %d of %d." %
+                         (site_name, offset, key.size))
 
-# Read Posts {{{
-def pull_from_s3( s3_url, s3_index_file, output_dir ):
+        # stream the remainder of the object in fixed size chunks
+        key.open_read( headers={ "Range": "bytes=%d-" % offset } )
+
+        try:
+            with open( local_path, "ab" ) as local_posts_handle:
+                for chunk in iter( lambda: key.read( CHUNK_SIZE ), "" ):
+                    local_posts_handle.write( chunk )
+                    transferred += len( chunk )
+        finally:
+            key.close()
+
+    # verify the download
+    complete = os.path.getsize( local_path ) == key.size
+
+    etag = key.etag.strip( '"' )
+    if complete and "-" not in etag:
+        complete = file_md5( local_path ) == etag
+
+    # a corrupt file can't be resumed, so drop it to restart on a rerun
+    if not complete:
+        logging.error("Site '%s' failed verification, removing it." %
+                      site_name)
+        os.remove( local_path )
+    else:
+        logging.debug("Site '%s' complete (%d bytes transferred)." %
+                      (site_name, transferred))
+
+    return (site_name, transferred, complete)
+# }}}
+
+
+
+# Try Pull Site {{{
+def try_pull_site( job ):
+    """
+    Try Pull Site: pull a single site, logging any error instead of raising
+    it, so one failed site doesn't abort the others or the report. Returns
+    the same tuple as pull_site, marking failed sites incomplete.
+
+    job: a (s3_url, site_name, output_dir) tuple
+
+    """
+
+    try:
+        return pull_site( job )
+    except Exception:
+        logging.exception("Error pulling site '%s'." % job[1])
+        return (job[1], 0, False)
+# }}}
+
+
+
+# Pull From S3 {{{
+def pull_from_s3( s3_url, s3_index_file, output_dir, n_threads=8 ):
     """
     Pull From s3: copy data from an S3 bucket given an index file.
 
     s3_url:     URL of the S3 bucket
     s3_index_file: A link to an index file in an s3 bucket.
-    output_dor: Location where we're saving stuff locally
+    output_dir: Location where we're saving stuff locally
+    n_threads:  Number of sites to download at once
 
     """
 
     # open index file
     remote_index_handle = s3open( s3_url + "/" + s3_index_file )
 
+    jobs = []
     for site_name in remote_index_handle.readlines():
 
-        site_name = site_name[:-1] # strip out newlines
-        site_posts = site_name + "/Posts.xml"
+        site_name = site_name.strip() # strip out newlines
+        if site_name:
+            jobs.append( (s3_url, site_name, output_dir) )
 
-        # make the output directory; if it exists simply continue
-        try:
-            os.makedirs( output_dir + "/" + site_name )
-        except OSError:
-            print( "Site directory '%s' exists locally, skipping." % site_name )
-            continue
+    remote_index_handle.close()
 
-        # create pointers to the remote and local files
-        remote_posts_handle = s3open( s3_url + "/" + site_posts )
-        local_posts_handle = open( output_dir + "/" + site_posts, "w+" )
+    # download the sites concurrently
+    t0 = time()
 
-        for line in remote_posts_handle.readlines():
-            local_posts_handle.write( line )
+    pool = ThreadPool( processes=n_threads )
+    results = pool.map( try_pull_site, jobs, chunksize=1 )
+    pool.close()
+    pool.join()
 
-        local_posts_handle.close()
-        remote_posts_handle.close()
+    t1 = time()
 
-    remote_index_handle.close()
+    # report aggregate throughput
+    transferred = sum( result[1] for result in results )
+    failed      = [result[0] for result in results if not result[2]]
+
+    logging.info("  |-       Sites pulled: %d" % (len( results ) - len( failed )))
+    logging.info("  |-       Sites failed: %d" % len( failed ))
+    logging.info("  |-  Bytes transferred: %d" % transferred)
+    logging.info("  |-         Throughput: %.2f MB/s" %
+                 (transferred / (1024.0 * 1024.0) / max( t1 - t0, 1e-9 )))
+
+    for site_name in failed:
+        logging.error("Failed to pull '%s', rerun to retry." % site_name)
 
+    return len( failed ) == 0
 # }}}
 
 
@@ -62,19 +229,18 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG,
                         format='%(levelname)s: %(message)s')
 
-    if len( sys.argv ) != 4:
-        logging.error( "Usage: python pull_from_s3.py [s3_url]"
-                       "[s3_index_file] [output_dir]" )
+    if len( sys.argv ) not in [4, 5]:
+        logging.error( "Usage: python pull_from_s3.py [s3_url] "
+                       "[s3_index_file] [output_dir] [n_threads]" )
         sys.exit( 1 )
 
     s3_url = sys.argv[1]
     s3_index_file = sys.argv[2]
     output_dir = sys.argv[3]
+    n_threads = int( sys.argv[4] ) if len( sys.argv ) == 5 else 8
 
     # pull in data from s3
-    pull_from_s3( s3_url, s3_index_file, output_dir )
+    if not pull_from_s3( s3_url, s3_index_file, output_dir, n_threads ):
+        sys.exit( 1 )
 
 # }}}
-
-
-
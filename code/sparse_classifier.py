@@ -0,0 +1,134 @@
+"""
+Date:   2026-10-18
+Desc:   Classifiers which work directly on the sparse TF-IDF matrix through
+        cosine neighbor searches, for corpora too large to scan in full for
+        every prediction. Each follows the sklearn estimator interface.
+"""
+
+
+import logging
+
+import numpy
+import scipy.sparse
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+from sparse_neighbors import unit_rows, top_k_rows
+
+
+
+# Sparse K Neighbors Classifier {{{
+class SparseKNeighborsClassifier( BaseEstimator, ClassifierMixin ):
+    """
+    Sparse K Neighbors Classifier: k-nearest-neighbor classification by
+    cosine similarity over an inverted index of the training posts.
+
+    Candidates are found by scoring queries against the index through a
+    sparse matrix product, a block of queries at a time. Two knobs trade
+    recall for speed: each query can be cut to its heaviest terms, and each
+    term's postings list can be cut to the posts weighting it most, which
+    bounds the work per query by query_terms * postings however large the
+    corpus grows. The best candidates are then re-ranked by their exact
+    cosine similarity. With neither cut the search is exact.
+
+    n_neighbors:  number of neighbors voting on each label
+    query_terms:  number of heaviest terms of each query searched, 0 for all
+    postings:     number of posts kept in each term's postings, 0 for all
+    n_candidates: number of candidates re-ranked exactly, per query
+    weights:      "uniform" votes, or "similarity" weighted votes
+    block_size:   number of queries searched at a time
+
+    """
+
+    def __init__( self, n_neighbors=5, query_terms=0, postings=0,
+                  n_candidates=50, weights="uniform", block_size=1000 ):
+
+        self.n_neighbors  = n_neighbors
+        self.query_terms  = query_terms
+        self.postings     = postings
+        self.n_candidates = n_candidates
+        self.weights      = weights
+        self.block_size   = block_size
+
+
+    def fit( self, data, labels ):
+        """
+        Fit: index the training posts.
+        """
+
+        labels = numpy.asarray( labels )
+        (self.classes_, self.targets_) = numpy.unique( labels,
+                                                       return_inverse=True )
+        self.data_ = unit_rows( data )
+
+        # postings lists: one row per term, of the posts weighting it
+        index = self.data_.T.tocsr()
+        if self.postings > 0:
+            index = top_k_rows( index, self.postings )
+        self.index_ = index
+
+        # the fallback for posts sharing no terms with the training set
+        self.prior_ = numpy.argmax( numpy.bincount( self.targets_ ) )
+
+        logging.info("Indexed %d posts, %d postings." %
+                     (self.data_.shape[0], self.index_.nnz))
+
+        return self
+
+
+    def kneighbors( self, queries ):
+        """
+        K Neighbors: the sparse matrix of cosine similarities from each query
+        to its n_neighbors nearest training posts.
+        """
+
+        queries = unit_rows( queries )
+        n_candidates = max( self.n_candidates, self.n_neighbors )
+        blocks = []
+
+        for start in xrange( 0, queries.shape[0], self.block_size ):
+            block = queries[start:start + self.block_size]
+
+            # approximate candidates from the (cut) query and postings
+            searched = block
+            if self.query_terms > 0:
+                searched = top_k_rows( block, self.query_terms )
+
+            candidates = top_k_rows( (searched * self.index_).tocsr(),
+                                     n_candidates ).tocoo()
+
+            # re-rank the candidates by their exact similarity
+            exact = numpy.asarray( block[candidates.row].multiply(
+                self.data_[candidates.col] ).sum( axis=1 ) ).ravel()
+
+            reranked = scipy.sparse.csr_matrix(
+                (exact, (candidates.row, candidates.col)),
+                shape=(block.shape[0], self.data_.shape[0]) )
+            reranked.eliminate_zeros()
+
+            blocks.append( top_k_rows( reranked, self.n_neighbors ) )
+
+        return scipy.sparse.vstack( blocks, format="csr" )
+
+
+    def predict( self, queries ):
+        """
+        Predict: label each query by a vote of its nearest training posts.
+        """
+
+        neighbors = self.kneighbors( queries ).tocoo()
+
+        votes = numpy.ones( neighbors.nnz )
+        if self.weights == "similarity":
+            votes = neighbors.data
+
+        # sum the votes for each (query, class) pair
+        tally = scipy.sparse.csr_matrix(
+            (votes, (neighbors.row, self.targets_[neighbors.col])),
+            shape=(neighbors.shape[0], len( self.classes_ )) ).toarray()
+
+        predicted = numpy.argmax( tally, axis=1 )
+        predicted[tally.sum( axis=1 ) == 0] = self.prior_
+
+        return self.classes_[predicted]
+# }}}
@@ -0,0 +1,794 @@
+"""
+Date:   2026-10-18
+Desc:   Clustering algorithms which work directly on the sparse TF-IDF
+        matrix through cosine neighbor graphs, for corpora too large for
+        the dense N x N formulations in sklearn. Each follows the sklearn
+        estimator interface: fit(data) sets labels_.
+"""
+
+
+import logging
+import multiprocessing
+
+import numpy
+import scipy.sparse
+import scipy.linalg
+
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import eigsh, lobpcg
+
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.cluster import estimate_bandwidth, get_bin_seeds
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import normalize
+
+from sparse_neighbors import radius_graph, knn_graph, unit_rows
+from sparse_neighbors import similarity_blocks
+
+# pyamg is only needed for the amg eigensolver
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+# AgglomerativeClustering replaced Ward, which was removed in 0.17
+try:
+    from sklearn.cluster import AgglomerativeClustering
+except ImportError:
+    from sklearn.cluster import Ward
+    AgglomerativeClustering = None
+
+
+# Points shifted by the mean shift workers, set once per worker process.
+shift_state = {}
+
+
+
+# Sparse DBSCAN {{{
+class SparseDBSCAN( object ):
+    """
+    Sparse DBSCAN: DBSCAN over cosine distance. Neighborhoods come from a
+    blocked radius search, core points are those with at least min_samples
+    neighbors (themselves included), clusters are the connected components
+    of the core points, and border points join the cluster of a core
+    neighbor. Points reachable from no core point are noise, labelled -1.
+
+    eps:         maximum cosine distance between two neighbors
+    min_samples: number of neighbors for a core point
+    block_size:  number of rows compared at a time in the radius search
+
+    """
+
+    def __init__( self, eps=0.5, min_samples=5, block_size=1000 ):
+
+        self.eps         = eps
+        self.min_samples = min_samples
+        self.block_size  = block_size
+
+
+    def fit( self, data ):
+        """
+        Fit: label every row of the data.
+        """
+
+        graph    = radius_graph( data, self.eps, self.block_size )
+        n_points = graph.shape[0]
+
+        degree = numpy.diff( graph.indptr )
+        core   = numpy.flatnonzero( degree >= self.min_samples )
+        border = numpy.flatnonzero( degree < self.min_samples )
+
+        labels = -numpy.ones( n_points, dtype=numpy.int64 )
+
+        # clusters are the connected components of the core points
+        core_graph = graph[core][:, core]
+        (n_clusters, components) = connected_components( core_graph,
+                                                         directed=False )
+        labels[core] = components
+
+        # border points take the cluster of their first core neighbor
+        reached = graph[border][:, core].tocsr()
+        linked  = numpy.diff( reached.indptr ) > 0
+        first   = reached.indices[reached.indptr[:-1][linked]]
+        labels[border[linked]] = components[first]
+
+        logging.info("DBSCAN: %d clusters, %d core points, %d noise points." %
+                     (n_clusters, len( core ), numpy.sum( labels == -1 )))
+
+        self.core_sample_indices_ = core
+        self.labels_ = labels
+
+        return self
+# }}}
+
+
+
+# Sparse Affinity Propagation {{{
+class SparseAffinityPropagation( object ):
+    """
+    Sparse Affinity Propagation: affinity propagation over a symmetric
+    k-nearest-neighbor cosine similarity graph. Responsibilities and
+    availabilities are only kept for the links of the graph (and each
+    post's link to itself, weighted by the preference), so memory grows
+    with N * k rather than N * N. Messages are updated block_size posts at
+    a time, so the working arrays of each update only span one block's
+    links. Each post is then labelled with its most similar exemplar.
+
+    n_neighbors:      number of neighbors linked to each post
+    damping:          damping factor, between 0.5 and 1.0
+    convergence_iter: number of iterations with no change in the exemplars
+    max_iter:         maximum number of iterations
+    preference:       self similarity of each post, defaults to the lowest
+                      similarity in the graph; the graph only holds close
+                      pairs, so its median would yield far more exemplars
+                      than the median over all pairs does
+    block_size:       number of rows compared at a time in the graph search,
+                      and whose messages are updated at a time
+    random_state:     seed for the noise breaking ties between similarities
+
+    """
+
+    def __init__( self, n_neighbors=10, damping=0.5, convergence_iter=15,
+                  max_iter=200, preference=None, block_size=1000,
+                  random_state=0 ):
+
+        self.n_neighbors      = n_neighbors
+        self.damping          = damping
+        self.convergence_iter = convergence_iter
+        self.max_iter         = max_iter
+        self.preference       = preference
+        self.block_size       = block_size
+        self.random_state     = random_state
+
+
+    def links( self, data ):
+        """
+        Links: the (rows, columns, similarities) of every link passing
+        messages, ordered by row then column. Neighbor links run both ways,
+        and every post is linked to itself.
+        """
+
+        graph    = knn_graph( data, self.n_neighbors, self.block_size )
+        graph    = graph.tocoo()
+        n_points = graph.shape[0]
+
+        rows = numpy.concatenate( (graph.row, graph.col) )
+        cols = numpy.concatenate( (graph.col, graph.row) )
+        sims = numpy.concatenate( (graph.data, graph.data) )
+
+        preference = self.preference
+        if preference is None:
+            preference = numpy.min( sims ) if len( sims ) > 0 else 0.0
+
+        rows = numpy.concatenate( (rows, numpy.arange( n_points )) )
+        cols = numpy.concatenate( (cols, numpy.arange( n_points )) )
+        sims = numpy.concatenate( (sims,
+                                   numpy.repeat( preference, n_points )) )
+
+        # drop links found from both ends, sorting by row then column
+        keys = rows.astype( numpy.int64 ) * n_points + cols
+        (keys, first) = numpy.unique( keys, return_index=True )
+
+        return (rows[first], cols[first], sims[first])
+
+
+    def update_responsibility( self, sims, rows, starts, availability,
+                               responsibility, first, last, low, high ):
+        """
+        Update Responsibility: damp in the new responsibilities of one
+        block's links, posts first to last holding links low to high: each
+        link's similarity less that of the post's best competing exemplar.
+        """
+
+        block_sims   = sims[low:high]
+        block_rows   = rows[low:high] - first
+        block_starts = starts[first:last] - low
+
+        combined = availability[low:high] + block_sims
+        best     = numpy.maximum.reduceat( combined, block_starts )
+        at_best  = numpy.where( combined == best[block_rows],
+                                numpy.arange( high - low ), high - low )
+        best_at  = numpy.minimum.reduceat( at_best, block_starts )
+
+        combined[best_at] = -numpy.inf
+        second = numpy.maximum.reduceat( combined, block_starts )
+
+        # a post linked only to itself competes with the lowest cosine
+        second[numpy.isneginf( second )] = -1.0
+
+        update = block_sims - best[block_rows]
+        update[best_at] = block_sims[best_at] - second
+
+        responsibility[low:high] *= self.damping
+        responsibility[low:high] += (1 - self.damping) * update
+
+
+    def positive( self, responsibility, self_link, low, high ):
+        """
+        Positive: the responsibilities of links low to high counted as
+        support for their exemplar: positive ones, and self links as is.
+        """
+
+        block = responsibility[low:high]
+        return numpy.where( self_link[low:high], block,
+                            numpy.maximum( block, 0 ) )
+
+
+    def update_availability( self, support, cols, self_link, availability,
+                             responsibility, low, high ):
+        """
+        Update Availability: damp in the new availabilities of links low to
+        high, from the support each exemplar has from the other posts.
+        """
+
+        positive = self.positive( responsibility, self_link, low, high )
+
+        update = support[cols[low:high]] - positive
+        update = numpy.where( self_link[low:high], update,
+                              numpy.minimum( update, 0 ) )
+
+        availability[low:high] *= self.damping
+        availability[low:high] += (1 - self.damping) * update
+
+
+    def fit( self, data ):
+        """
+        Fit: find the exemplars and label every row of the data.
+        """
+
+        data     = unit_rows( data )
+        n_points = data.shape[0]
+
+        (rows, cols, sims) = self.links( data )
+        n_links = len( sims )
+
+        # remove degeneracies, as the dense implementation does
+        random = numpy.random.RandomState( self.random_state )
+        sims = sims + 1e-12 * random.randn( n_links )
+
+        starts    = numpy.searchsorted( rows, numpy.arange( n_points ) )
+        diagonal  = numpy.flatnonzero( rows == cols )
+        self_link = rows == cols
+
+        # each block's posts and the range of their links
+        blocks = [(start, min( start + self.block_size, n_points ))
+                  for start in xrange( 0, n_points, self.block_size )]
+        blocks = [(first, last, starts[first],
+                   starts[last] if last < n_points else n_links)
+                  for (first, last) in blocks]
+
+        responsibility = numpy.zeros( n_links )
+        availability   = numpy.zeros( n_links )
+
+        exemplars = numpy.zeros( n_points, dtype=bool )
+        unchanged = 0
+
+        for iteration in xrange( self.max_iter ):
+
+            for (first, last, low, high) in blocks:
+                self.update_responsibility( sims, rows, starts, availability,
+                                            responsibility,
+                                            first, last, low, high )
+
+            # every exemplar's support sums over links from all blocks
+            support = numpy.zeros( n_points )
+            for (first, last, low, high) in blocks:
+                positive = self.positive( responsibility, self_link,
+                                          low, high )
+                support += numpy.bincount( cols[low:high], weights=positive,
+                                           minlength=n_points )
+
+            for (first, last, low, high) in blocks:
+                self.update_availability( support, cols, self_link,
+                                          availability, responsibility,
+                                          low, high )
+
+            # stop once the exemplars have settled
+            current = (availability[diagonal] + responsibility[diagonal]) > 0
+
+            if numpy.array_equal( current, exemplars ):
+                unchanged += 1
+            else:
+                unchanged = 0
+            exemplars = current
+
+            if unchanged >= self.convergence_iter and numpy.any( exemplars ):
+                break
+
+        else:
+            logging.warn("Affinity propagation did not converge.")
+
+        centers = numpy.flatnonzero( exemplars )
+        labels  = -numpy.ones( n_points, dtype=numpy.int64 )
+
+        if len( centers ) == 0:
+            logging.warn("Affinity propagation found no exemplars.")
+
+        else:
+            # label each post with its most similar exemplar
+            nearest = knn_graph( data[centers], 1, self.block_size,
+                                 queries=data )
+            linked  = numpy.diff( nearest.indptr ) > 0
+            labels[linked] = nearest.indices[nearest.indptr[:-1][linked]]
+            labels[centers] = numpy.arange( len( centers ) )
+
+        logging.info("Affinity propagation: %d exemplars after %d iterations"
+                     " over %d links." %
+                     (len( centers ), iteration + 1, n_links))
+
+        self.cluster_centers_indices_ = centers
+        self.labels_  = labels
+        self.n_iter_  = iteration + 1
+
+        return self
+# }}}
+
+
+
+# Sparse Spectral Clustering {{{
+class SparseSpectralClustering( object ):
+    """
+    Sparse Spectral Clustering: spectral clustering over the normalized
+    affinity of a k-nearest-neighbor cosine graph, embedding each post with
+    the leading eigenvectors and labelling the embedding with KMeans.
+
+    The eigenvectors are found with a sparse eigensolver on the normalized
+    Laplacian: ARPACK, LOBPCG, or LOBPCG preconditioned with algebraic
+    multigrid. With landmarks the solver is warm started from a Nystrom
+    approximation over the full cosine kernel of that many sampled posts,
+    which can also be used on its own for corpora too large for the graph.
+
+    n_clusters:   number of clusters
+    n_neighbors:  number of neighbors linked to each post
+    n_landmarks:  number of posts sampled for the Nystrom approximation, 0
+                  to start the eigensolver from random vectors
+    eigen_solver: "arpack", "lobpcg" or "amg"
+    use_graph:    if false, skip the graph and use the Nystrom embedding
+    max_iter:     maximum number of LOBPCG iterations
+    tol:          eigensolver tolerance
+    block_size:   number of rows compared at a time in the graph search
+    random_state: seed for the landmarks, initial vectors and KMeans
+
+    """
+
+    def __init__( self, n_clusters=8, n_neighbors=10, n_landmarks=0,
+                  eigen_solver="lobpcg", use_graph=True, max_iter=200,
+                  tol=1e-5, block_size=1000, random_state=0 ):
+
+        self.n_clusters   = n_clusters
+        self.n_neighbors  = n_neighbors
+        self.n_landmarks  = n_landmarks
+        self.eigen_solver = eigen_solver
+        self.use_graph    = use_graph
+        self.max_iter     = max_iter
+        self.tol          = tol
+        self.block_size   = block_size
+        self.random_state = random_state
+
+
+    def affinity( self, data ):
+        """
+        Affinity: the symmetric, non-negative kNN cosine affinity graph.
+        """
+
+        graph = knn_graph( data, self.n_neighbors, self.block_size )
+        graph = ((graph + graph.T) * 0.5).tocsr()
+
+        graph.data[graph.data < 0] = 0
+        graph.eliminate_zeros()
+
+        return graph
+
+
+    def nystrom( self, data, random ):
+        """
+        Nystrom: approximate leading eigenvectors of the normalized cosine
+        affinity from its columns at a sample of landmark posts.
+        """
+
+        n_points    = data.shape[0]
+        n_landmarks = min( self.n_landmarks, n_points )
+        landmarks   = random.choice( n_points, n_landmarks, replace=False )
+
+        # cosine similarity of every post to every landmark
+        columns = numpy.empty( (n_points, n_landmarks) )
+        for (start, block) in similarity_blocks( data[landmarks],
+                                                 self.block_size,
+                                                 queries=data ):
+            columns[start:start + block.shape[0]] = block.toarray()
+        numpy.maximum( columns, 0, out=columns )
+
+        # pseudo-inverse of the landmark block, through its eigenvectors
+        (values, vectors) = scipy.linalg.eigh( columns[landmarks] )
+        kept    = values > 1e-10 * max( values.max(), 1e-300 )
+        values  = values[kept]
+        vectors = vectors[:, kept]
+
+        # approximate degrees, then the normalized affinity as B * B'
+        inverse = numpy.dot( vectors / values, vectors.T )
+        degree  = numpy.dot( columns,
+                             numpy.dot( inverse, columns.sum( axis=0 ) ) )
+        scale   = 1.0 / numpy.sqrt( numpy.maximum( degree, 1e-12 ) )
+
+        factor  = numpy.dot( columns * scale[:, None],
+                             vectors / numpy.sqrt( values ) )
+
+        # the leading left singular vectors of B approximate the eigenvectors
+        (squares, right) = scipy.linalg.eigh( numpy.dot( factor.T, factor ) )
+        top   = numpy.argsort( squares )[::-1][:self.n_clusters]
+        sigma = numpy.sqrt( numpy.maximum( squares[top], 1e-12 ) )
+
+        embedding = numpy.dot( factor, right[:, top] ) / sigma
+
+        # a low rank landmark block may give fewer vectors than clusters
+        missing = self.n_clusters - embedding.shape[1]
+        if missing > 0:
+            embedding = numpy.hstack( (embedding,
+                                       random.rand( n_points, missing )) )
+
+        return embedding
+
+
+    def embed( self, graph, initial, random ):
+        """
+        Embed: leading eigenvectors of the normalized affinity of the graph,
+        as the smallest eigenvectors of its normalized Laplacian.
+        """
+
+        n_points = graph.shape[0]
+
+        degree = numpy.asarray( graph.sum( axis=1 ) ).ravel()
+        scale  = numpy.zeros( n_points )
+        scale[degree > 0] = 1.0 / numpy.sqrt( degree[degree > 0] )
+        scaling = scipy.sparse.spdiags( scale, 0, n_points, n_points )
+
+        normalized = (scaling * graph * scaling).tocsr()
+        laplacian  = (scipy.sparse.identity( n_points, format="csr" ) -
+                      normalized).tocsr()
+
+        if initial is None:
+            initial = random.rand( n_points, self.n_clusters )
+
+        # too small for the iterative solvers
+        if n_points < 5 * self.n_clusters + 1:
+            (values, vectors) = scipy.linalg.eigh( laplacian.toarray() )
+            return vectors[:, :self.n_clusters]
+
+        if self.eigen_solver == "arpack":
+            (values, vectors) = eigsh( normalized, k=self.n_clusters,
+                                       which="LA", tol=self.tol,
+                                       v0=initial[:, 0] )
+            return vectors
+
+        preconditioner = None
+        if self.eigen_solver == "amg":
+            if pyamg is None:
+                logging.warn("pyamg is not installed, using plain LOBPCG.")
+            else:
+                shifted = laplacian + 1e-5 * scipy.sparse.identity( n_points )
+                solver  = pyamg.smoothed_aggregation_solver( shifted.tocsr() )
+                preconditioner = solver.aspreconditioner()
+
+        (values, vectors) = lobpcg( laplacian, initial, M=preconditioner,
+                                    tol=self.tol, maxiter=self.max_iter,
+                                    largest=False )
+        return vectors
+
+
+    def fit( self, data ):
+        """
+        Fit: embed and label every row of the data.
+        """
+
+        data   = unit_rows( data )
+        random = numpy.random.RandomState( self.random_state )
+
+        initial = None
+        if self.n_landmarks > 0:
+            initial = self.nystrom( data, random )
+            logging.info("Nystrom embedding from %d landmarks." %
+                         min( self.n_landmarks, data.shape[0] ))
+
+        if self.use_graph or initial is None:
+            embedding = self.embed( self.affinity( data ), initial, random )
+        else:
+            embedding = initial
+
+        embedding = normalize( embedding, norm="l2" )
+
+        km = KMeans( n_clusters=self.n_clusters,
+                     random_state=self.random_state )
+        self.labels_    = km.fit( embedding ).labels_
+        self.embedding_ = embedding
+
+        return self
+# }}}
+
+
+
+# Ward Clusterer {{{
+def ward_clusterer( n_clusters, connectivity=None ):
+    """
+    Ward Clusterer: Ward's hierarchical clustering from whichever estimator
+    the installed scikit-learn has, AgglomerativeClustering with ward
+    linkage or the older Ward.
+
+    n_clusters:   number of clusters
+    connectivity: sparse matrix of the links clusters may be merged along,
+                  or None to merge any pair
+
+    """
+
+    if AgglomerativeClustering is None:
+        return Ward( n_clusters=n_clusters, connectivity=connectivity )
+
+    return AgglomerativeClustering( n_clusters=n_clusters, linkage="ward",
+                                    connectivity=connectivity )
+# }}}
+
+
+
+# Connected Ward {{{
+class ConnectedWard( object ):
+    """
+    Connected Ward: Ward's hierarchical clustering of reduced, dense vectors,
+    restricted to merging clusters linked in a k-nearest-neighbor cosine
+    graph. The tree is built from the graph's links rather than from every
+    pair of clusters, so memory grows with N * k.
+
+    With subclusters the posts are first compressed into that many
+    MiniBatchKMeans centroids, in the manner of BIRCH's pre-clustering, and
+    only the centroids are merged; each post takes its centroid's cluster.
+
+    n_clusters:    number of clusters
+    n_neighbors:   number of neighbors linked to each post (or centroid)
+    n_subclusters: number of pre-clustering centroids, 0 to merge the posts
+                   themselves
+    batch_size:    MiniBatchKMeans batch size for the pre-clustering
+    block_size:    number of rows compared at a time in the graph search
+    random_state:  seed for the pre-clustering
+
+    """
+
+    def __init__( self, n_clusters=8, n_neighbors=10, n_subclusters=0,
+                  batch_size=1000, block_size=1000, random_state=0 ):
+
+        self.n_clusters    = n_clusters
+        self.n_neighbors   = n_neighbors
+        self.n_subclusters = n_subclusters
+        self.batch_size    = batch_size
+        self.block_size    = block_size
+        self.random_state  = random_state
+
+
+    def connectivity( self, data ):
+        """
+        Connectivity: the symmetric kNN link pattern of the data, with the
+        graph's separate components chained together so that the tree can
+        still be completed.
+        """
+
+        graph = knn_graph( data, self.n_neighbors, self.block_size )
+        graph = (graph + graph.T).tocsr()
+        graph.data[:] = 1
+
+        (n_components, components) = connected_components( graph,
+                                                           directed=False )
+
+        if n_components > 1:
+            logging.info("Chaining %d unconnected components of the graph." %
+                         n_components)
+
+            (unique, first) = numpy.unique( components, return_index=True )
+            chain = scipy.sparse.csr_matrix(
+                (numpy.ones( n_components - 1 ), (first[:-1], first[1:])),
+                shape=graph.shape )
+            graph = (graph + chain + chain.T).tocsr()
+            graph.data[:] = 1
+
+        return graph
+
+
+    def fit( self, data ):
+        """
+        Fit: build the tree and label every row of the data.
+        """
+
+        data = numpy.asarray( data )
+
+        members = None
+        if self.n_subclusters > 0 and self.n_subclusters < data.shape[0]:
+            km = MiniBatchKMeans( n_clusters=self.n_subclusters,
+                                  batch_size=self.batch_size,
+                                  random_state=self.random_state )
+            members = km.fit( data ).labels_
+            data    = km.cluster_centers_
+
+            logging.info("Pre-clustered into %d subclusters." %
+                         self.n_subclusters)
+
+        wh = ward_clusterer( min( self.n_clusters, data.shape[0] ),
+                             self.connectivity( data ) )
+        labels = wh.fit( data ).labels_
+
+        if members is not None:
+            labels = labels[members]
+
+        self.labels_ = labels
+
+        return self
+# }}}
+
+
+
+# Attach Points {{{
+def attach_points( points, bandwidth, max_iter ):
+    """
+    Attach Points: mean shift worker initializer, indexing the points once
+    per worker process.
+    """
+
+    shift_state["points"]    = points
+    shift_state["bandwidth"] = bandwidth
+    shift_state["max_iter"]  = max_iter
+    shift_state["index"]     = NearestNeighbors( radius=bandwidth )
+    shift_state["index"].fit( points )
+# }}}
+
+
+
+# Shift Seeds {{{
+def shift_seeds( seeds ):
+    """
+    Shift Seeds: mean shift worker entry point. Move each seed to the mean
+    of the points within the bandwidth until it settles, returning a list of
+    (center, number of points within the bandwidth) pairs.
+    """
+
+    points    = shift_state["points"]
+    bandwidth = shift_state["bandwidth"]
+    index     = shift_state["index"]
+
+    stop_threshold = 1e-3 * bandwidth
+    shifted = []
+
+    for seed in seeds:
+        mean = seed
+
+        for iteration in xrange( shift_state["max_iter"] ):
+            within = index.radius_neighbors( [mean], bandwidth,
+                                             return_distance=False )[0]
+            if len( within ) == 0:
+                break
+
+            previous = mean
+            mean     = points[within].mean( axis=0 )
+
+            if numpy.linalg.norm( mean - previous ) < stop_threshold:
+                break
+
+        if len( within ) > 0:
+            shifted.append( (mean, len( within )) )
+
+    return shifted
+# }}}
+
+
+
+# Parallel Mean Shift {{{
+class ParallelMeanShift( object ):
+    """
+    Parallel Mean Shift: mean shift over low-dimensional dense vectors. The
+    bandwidth is estimated from a sample of the points, seeds are taken
+    from a grid of bins the width of the bandwidth, and the seeds are
+    shifted in parallel across worker processes. Centers within a
+    bandwidth of a denser center are dropped and every point is labelled
+    with its nearest remaining center.
+
+    bandwidth:         kernel bandwidth, estimated from the data if None
+    quantile:          quantile of pairwise distances used as the bandwidth
+    bandwidth_samples: number of points sampled to estimate the bandwidth
+    bin_seeding:       seed from occupied bins rather than from every point
+    min_bin_freq:      minimum number of points for a bin to be a seed
+    n_jobs:            number of worker processes, 0 for one per core
+    max_iter:          maximum number of shifts per seed
+    random_state:      seed for the bandwidth sample
+
+    """
+
+    def __init__( self, bandwidth=None, quantile=0.3, bandwidth_samples=1000,
+                  bin_seeding=True, min_bin_freq=1, n_jobs=1, max_iter=300,
+                  random_state=0 ):
+
+        self.bandwidth         = bandwidth
+        self.quantile          = quantile
+        self.bandwidth_samples = bandwidth_samples
+        self.bin_seeding       = bin_seeding
+        self.min_bin_freq      = min_bin_freq
+        self.n_jobs            = n_jobs
+        self.max_iter          = max_iter
+        self.random_state      = random_state
+
+
+    def shift( self, points, seeds, bandwidth ):
+        """
+        Shift: shift every seed, in chunks spread over worker processes.
+        """
+
+        n_jobs = self.n_jobs
+        if n_jobs <= 0:
+            n_jobs = multiprocessing.cpu_count()
+
+        # daemonic workers (eg. algorithms run concurrently) can't fork
+        if multiprocessing.current_process().daemon:
+            n_jobs = 1
+
+        n_jobs = max( min( n_jobs, len( seeds ) ), 1 )
+        chunks = numpy.array_split( seeds, n_jobs * 4 if n_jobs > 1 else 1 )
+
+        if n_jobs == 1:
+            attach_points( points, bandwidth, self.max_iter )
+            shifted = [shift_seeds( chunk ) for chunk in chunks]
+        else:
+            pool = multiprocessing.Pool( n_jobs, attach_points,
+                                         (points, bandwidth, self.max_iter) )
+            try:
+                shifted = pool.map( shift_seeds, chunks )
+            finally:
+                pool.close()
+                pool.join()
+
+        shift_state.clear()
+
+        return [center for chunk in shifted for center in chunk]
+
+
+    def fit( self, points ):
+        """
+        Fit: find the cluster centers and label every point.
+        """
+
+        points = numpy.asarray( points, dtype=numpy.float64 )
+
+        bandwidth = self.bandwidth
+        if bandwidth is None:
+            bandwidth = estimate_bandwidth(
+                points, quantile=self.quantile,
+                n_samples=min( self.bandwidth_samples, points.shape[0] ),
+                random_state=self.random_state )
+            bandwidth = max( bandwidth, 1e-6 )
+
+        if self.bin_seeding:
+            seeds = get_bin_seeds( points, bandwidth, self.min_bin_freq )
+        else:
+            seeds = points
+
+        logging.info("Mean shift: bandwidth %.4f, %d seeds for %d points." %
+                     (bandwidth, len( seeds ), points.shape[0]))
+
+        shifted = self.shift( points, seeds, bandwidth )
+
+        # keep the densest center of any within a bandwidth of one another
+        shifted.sort( key=lambda pair: pair[1], reverse=True )
+        centers = numpy.array( [center for (center, count) in shifted] )
+
+        unique = numpy.ones( len( centers ), dtype=bool )
+        index  = NearestNeighbors( radius=bandwidth ).fit( centers )
+        for (i, center) in enumerate( centers ):
+            if unique[i]:
+                nearby = index.radius_neighbors( [center],
+                                                 return_distance=False )[0]
+                unique[nearby] = False
+                unique[i] = True
+        centers = centers[unique]
+
+        # label every point with its nearest center
+        index = NearestNeighbors( n_neighbors=1 ).fit( centers )
+        (distances, nearest) = index.kneighbors( points )
+
+        self.bandwidth_       = bandwidth
+        self.cluster_centers_ = centers
+        self.labels_          = nearest.ravel()
+
+        return self
+# }}}
@@ -0,0 +1,194 @@
+"""
+Date:   2026-10-18
+Desc:   Cosine neighbor searches directly over the sparse TF-IDF matrix.
+        Similarities are computed a block of rows at a time with a sparse
+        matrix product, so the full N x N similarity matrix is never held
+        in memory; only the neighbors that survive each block are kept.
+"""
+
+
+import logging
+
+import numpy
+import scipy.sparse
+
+from sklearn.preprocessing import normalize
+
+
+
+# Unit Rows {{{
+def unit_rows( data ):
+    """
+    Unit Rows: a CSR copy of the matrix with every row scaled to unit length,
+    so that inner products between rows are cosine similarities. TF-IDF rows
+    already are, but reduced or hashed inputs need not be.
+    """
+
+    data = scipy.sparse.csr_matrix( data, dtype=numpy.float64 )
+    return normalize( data, norm="l2", copy=True )
+# }}}
+
+
+
+# Similarity Blocks {{{
+def similarity_blocks( data, block_size, queries=None ):
+    """
+    Similarity Blocks: yield (start, block) pairs, where block is the sparse
+    matrix of cosine similarities between rows [start, start + block_size)
+    of the queries and every row of the data.
+
+    data:       unit length CSR matrix of indexed rows
+    block_size: number of query rows compared at a time
+    queries:    unit length CSR matrix of query rows, defaults to data
+
+    """
+
+    if queries is None:
+        queries = data
+
+    transposed = data.T.tocsc()
+
+    for start in xrange( 0, queries.shape[0], block_size ):
+        stop  = min( start + block_size, queries.shape[0] )
+        block = (queries[start:stop] * transposed).tocsr()
+        yield (start, block)
+# }}}
+
+
+
+# Within Rows {{{
+def within_rows( block, threshold ):
+    """
+    Within Rows: the links of a CSR block of similarities that reach the
+    threshold, as a CSR block of ones. Only the stored similarities are
+    compared, and the kept entries are copied straight out of them.
+
+    block:     CSR block of similarities
+    threshold: minimum similarity kept
+
+    """
+
+    kept = block.data >= threshold
+
+    # kept entries before each row, read off at the row boundaries
+    counts = numpy.concatenate( ([0], numpy.cumsum( kept )) )
+    indptr = counts[ block.indptr ]
+
+    return scipy.sparse.csr_matrix( (numpy.ones( indptr[-1] ),
+                                     block.indices[kept], indptr),
+                                    shape=block.shape )
+# }}}
+
+
+
+# Radius Graph {{{
+def radius_graph( data, radius, block_size=1000 ):
+    """
+    Radius Graph: the sparse adjacency matrix linking every pair of rows
+    within a cosine distance of radius of one another. Every row is linked
+    to itself.
+
+    data:       sparse (or dense) matrix, one sample per row
+    radius:     maximum cosine distance (1 - cosine similarity)
+    block_size: number of rows compared at a time
+
+    """
+
+    data   = unit_rows( data )
+    blocks = [within_rows( block, 1.0 - radius )
+              for (start, block) in similarity_blocks( data, block_size )]
+
+    # empty rows have no similarity to anything, themselves included
+    graph = scipy.sparse.vstack( blocks, format="csr" )
+    graph = (graph + scipy.sparse.identity( data.shape[0], format="csr" ))
+    graph = graph.tocsr()
+    graph.data[:] = 1
+
+    logging.info("Radius graph: %d rows, %d links within distance %.3f." %
+                 (graph.shape[0], graph.nnz, radius))
+
+    return graph
+# }}}
+
+
+
+# Top K Rows {{{
+def top_k_rows( block, k, start=None ):
+    """
+    Top K Rows: keep only the k largest entries of each row of a CSR block.
+
+    block: CSR block of similarities
+    k:     number of entries to keep per row
+    start: if set, the block holds rows [start, ...) of a self-comparison,
+           and each row's similarity to itself is dropped
+
+    """
+
+    indptr  = [0]
+    indices = []
+    values  = []
+
+    for row in xrange( block.shape[0] ):
+        lo = block.indptr[row]
+        hi = block.indptr[row + 1]
+
+        columns = block.indices[lo:hi]
+        weights = block.data[lo:hi]
+
+        if start is not None:
+            others  = columns != start + row
+            columns = columns[others]
+            weights = weights[others]
+
+        if len( weights ) > k:
+            top     = numpy.argpartition( -weights, k - 1 )[:k]
+            columns = columns[top]
+            weights = weights[top]
+
+        indices.append( columns )
+        values.append( weights )
+        indptr.append( indptr[-1] + len( columns ) )
+
+    if len( indices ) > 0:
+        indices = numpy.concatenate( indices )
+        values  = numpy.concatenate( values )
+
+    return scipy.sparse.csr_matrix( (values, indices, indptr),
+                                    shape=block.shape )
+# }}}
+
+
+
+# KNN Graph {{{
+def knn_graph( data, k, block_size=1000, queries=None ):
+    """
+    KNN Graph: the sparse matrix of cosine similarities from each query row
+    to its k most similar data rows. Without queries each data row is linked
+    to its k most similar other rows. Rows sharing no terms are never
+    linked, so a row may have fewer than k neighbors.
+
+    data:       sparse (or dense) matrix, one sample per row
+    k:          number of neighbors per row
+    block_size: number of rows compared at a time
+    queries:    optional sparse (or dense) matrix of query rows
+
+    """
+
+    data   = unit_rows( data )
+    blocks = []
+
+    if queries is None:
+        for (start, block) in similarity_blocks( data, block_size ):
+            blocks.append( top_k_rows( block, k, start ) )
+    else:
+        queries = unit_rows( queries )
+        for (start, block) in similarity_blocks( data, block_size, queries ):
+            blocks.append( top_k_rows( block, k ) )
+
+    graph = scipy.sparse.vstack( blocks, format="csr" )
+
+    logging.info("KNN graph: %d rows, %d links to %d nearest neighbors." %
+                 (graph.shape[0], graph.nnz, k))
+
+    return graph
+# }}}
@@ -0,0 +1,308 @@
+"""
+Date:   2026-10-18
+Desc:   Train linear and naive Bayes site classifiers out of core. Posts are
+        streamed from a bounded number of sites at once, hashed into sparse
+        chunks and fed to each model's partial_fit, so memory is bounded by
+        the chunk size rather than the size of the dump. A seeded share of
+        every site's posts is held out of training and streamed again for
+        evaluation.
+"""
+
+
+import sys
+import random
+import logging
+import ConfigParser
+from time import time
+
+import numpy
+
+from sklearn import metrics
+from sklearn import linear_model
+from sklearn import naive_bayes
+
+from options import get_option
+from vectorize_data import list_sites, iter_posts, site_random
+from features import HashingTfidf
+from parallel_run import report
+from metrics_log import emit_record
+from memory import MemoryWatch
+
+
+
+# Streamed models, by name.
+MODELS = ["hinge", "log", "multinomial"]
+
+
+
+# Make Model {{{
+def make_model( name, config ):
+    """
+    Make Model: build an (unfitted) model supporting partial_fit.
+
+    name:   "hinge" (linear SVM), "log" (logistic regression), both trained
+            by stochastic gradient descent, or "multinomial" (naive Bayes)
+    config: ConfigParser with documented fields
+
+    """
+
+    if name == "multinomial":
+        nb_alpha = get_option( config, "stream", "nb_alpha", 1.0 )
+        return naive_bayes.MultinomialNB( alpha=nb_alpha )
+
+    alpha = get_option( config, "stream", "alpha", 0.0001 )
+
+    return linear_model.SGDClassifier(
+        loss=name,          # hinge for an SVM, log for logistic regression
+        alpha=alpha,        # regularization strength
+        random_state=0,     # repeatable shuffling
+    )
+# }}}
+
+
+
+# Iterate Stream {{{
+def iter_stream( sites, config, held_out ):
+    """
+    Iterate Stream: read the sites max_open at a time, interleaving their
+    posts so each chunk mixes categories, and yield (posts, labels) chunks
+    of at most chunk_size posts. A site is only opened once another has been
+    read to the end, so at most max_open files and parsers are held at once.
+    Each post is held out with a fixed, seeded probability, so every pass
+    over the sites splits the posts the same way.
+
+    sites:    list of (fullpath, category) tuples, as from list_sites
+    config:   ConfigParser with documented fields
+    held_out: yield the held out posts, rather than the training posts
+
+    """
+
+    chunk_size = get_option( config, "stream", "chunk_size", 10000 )
+    holdout    = get_option( config, "stream", "holdout", 0.2 )
+    max_open   = get_option( config, "stream", "max_open", 32 )
+
+    if max_open <= 0:
+        max_open = len( sites )
+
+    pending = list( reversed( sites ) )
+    streams = []
+
+    # take an equal share of each chunk from every site being read
+    share = max( chunk_size // max( min( len( sites ), max_open ), 1 ), 1 )
+
+    posts  = []
+    labels = []
+
+    while len( streams ) > 0 or len( pending ) > 0:
+
+        # open sites in the order listed, as earlier ones are finished;
+        # the split draws from its own generator per site, seeded from (but
+        # separate to) the one sampling the site's posts
+        while len( streams ) < max_open and len( pending ) > 0:
+            (fullpath, category) = pending.pop()
+            rng = random.Random( site_random( fullpath, config ).random() )
+            streams.append( (category, iter_posts( fullpath, config ), rng) )
+
+        remaining = []
+
+        for (category, stream, rng) in streams:
+            taken = 0
+
+            for post in stream:
+                if (rng.random() < holdout) == held_out:
+                    posts.append( post )
+                    labels.append( category )
+
+                # a chunk is full as soon as it reaches chunk_size
+                if len( posts ) >= chunk_size:
+                    yield (posts, labels)
+                    posts  = []
+                    labels = []
+
+                taken += 1
+                if taken >= share:
+                    remaining.append( (category, stream, rng) )
+                    break
+
+        streams = remaining
+
+    if len( posts ) > 0:
+        yield (posts, labels)
+# }}}
+
+
+
+# Fit Frequencies {{{
+def fit_frequencies( sites, config, vectorizer ):
+    """
+    Fit Frequencies: stream the training posts once, summing the document
+    frequency of each hashed feature chunk by chunk, then fit the pruning
+    and idf weights of the vectorizer.
+
+    sites:      list of (fullpath, category) tuples, as from list_sites
+    config:     ConfigParser with documented fields
+    vectorizer: an unfitted HashingTfidf
+
+    """
+
+    df = numpy.zeros( vectorizer.n_features, dtype=numpy.int64 )
+    num_docs = 0
+
+    for (posts, labels) in iter_stream( sites, config, held_out=False ):
+        df += vectorizer.frequencies( vectorizer.count( posts ) )
+        num_docs += len( posts )
+
+    vectorizer.fit_frequencies( df, num_docs )
+
+    logging.info("Fitted idf weights over %d posts, keeping %d features." %
+                 (num_docs, len( vectorizer.kept )))
+
+    return num_docs
+# }}}
+
+
+
+# Stream Classification {{{
+def stream_classification( names, config ):
+    """
+    Stream Classification: train every named model over the same stream of
+    hashed chunks, then evaluate each over the held out stream. Returns a
+    list of (name, metrics) tuples.
+
+    names:  list of model names, from MODELS
+    config: ConfigParser with documented fields
+
+    """
+
+    n_epochs = get_option( config, "stream", "n_epochs", 1 )
+
+    sites   = list_sites( config )
+    classes = numpy.array( sorted( set( category
+                                        for (fullpath, category) in sites ) ))
+
+    models       = dict( (name, make_model( name, config )) for name in names )
+    fit_time     = dict( (name, 0.0) for name in names )
+    predict_time = dict( (name, 0.0) for name in names )
+
+    memory = MemoryWatch()
+    memory.start()
+    t0 = time()
+
+    # fit the idf weights over a first pass of the training posts
+    vectorizer = HashingTfidf( config )
+    fit_frequencies( sites, config, vectorizer )
+
+    # train every model on each chunk as it is vectorized
+    n_train = 0
+    nnz     = 0
+    for epoch in xrange( n_epochs ):
+        for (posts, labels) in iter_stream( sites, config, held_out=False ):
+            data = vectorizer.transform( posts )
+
+            for name in names:
+                t1 = time()
+                models[ name ].partial_fit( data, labels, classes=classes )
+                fit_time[ name ] += time() - t1
+
+            if epoch == 0:
+                n_train += data.shape[0]
+                nnz     += data.nnz
+
+        logging.info("Finished training epoch %d of %d." %
+                     (epoch + 1, n_epochs))
+
+    t2 = time()
+
+    # evaluate on the held out posts
+    y_test    = []
+    y_predict = dict( (name, []) for name in names )
+
+    for (posts, labels) in iter_stream( sites, config, held_out=True ):
+        data = vectorizer.transform( posts )
+        y_test.extend( labels )
+
+        for name in names:
+            t1 = time()
+            y_predict[ name ].extend( models[ name ].predict( data ) )
+            predict_time[ name ] += time() - t1
+
+    t3 = time()
+    memory.stop()
+    peak_rss = memory.peak_mb
+
+    logging.info("Streamed %d training and %d held out posts in %.3fs "
+                 "(%.0f posts/s)." %
+                 (n_train, len( y_test ), t3 - t0,
+                  (n_train * (n_epochs + 1) + len( y_test )) /
+                  max( t3 - t0, 1e-9 )))
+
+    results = []
+    for name in names:
+        accuracy = metrics.accuracy_score( y_test, y_predict[ name ] )
+
+        logging.info("Streamed %s classifier:" % name)
+        logging.info("  |-        Execution time: %fs" % fit_time[ name ])
+        logging.info("  |-       Prediction time: %fs" % predict_time[ name ])
+        logging.info("  |-              Accuracy: %.3f" % accuracy)
+        logging.debug("Classification report:\n%s" %
+                      metrics.classification_report( y_test,
+                                                     y_predict[ name ] ))
+
+        values = {
+            "runtime":      fit_time[ name ],
+            "predict_time": predict_time[ name ],
+            "accuracy":     accuracy,
+        }
+        results.append( (name, values) )
+
+        timings = {
+            "fit_time":     fit_time[ name ],
+            "predict_time": predict_time[ name ],
+            "peak_rss_mb":  peak_rss,
+        }
+        emit_record( config, "classifier", "stream_%s" % name,
+                     (n_train, len( vectorizer.kept ), nnz), timings, values )
+
+    logging.info("Training took %.3fs of wall time, peak memory %.1f MB." %
+                 (t2 - t0, peak_rss))
+
+    return results
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    # algorithm options
+    algorithm_options = "|".join( MODELS )
+
+    # ensure we have at least the minimum required params
+    if len( sys.argv ) < 4:
+        logging.error( "Usage: python stream_classifier.py [input.ini] "
+                       "[classifier.ini] [%s]" % algorithm_options )
+        sys.exit( 1 )
+
+    # pull in parameters from the command line
+    input_file  = sys.argv[1]
+    config_file = sys.argv[2]
+    requested_models = sys.argv[3:]
+
+    # read configuration file
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    config.readfp( open( input_file ) )
+    config.readfp( open( config_file ) )
+
+    # verify that requested models are known
+    for name in requested_models:
+        if name not in MODELS:
+            logging.error( "Model \"%s\" is not recognized." % name )
+
+    requested_models = [name for name in requested_models if name in MODELS]
+
+    report( stream_classification( requested_models, config ) )
+# }}}
@@ -0,0 +1,245 @@
+"""
+Date:   2026-10-18
+Desc:   Sweep algorithm and vectorization parameters over grids of values.
+        The corpus is vectorized once per distinct [tfidf] setting, the
+        algorithm runs are scheduled across cores, and configurations whose
+        results are already stored are skipped.
+"""
+
+import sys
+import json
+import logging
+import itertools
+import ConfigParser
+
+from options import get_option, copy_config, section_values
+from vectorize_data import vectorize_data
+from parallel_run import run_tasks, report
+from metrics_log import ALGORITHM_SECTIONS, result_key
+
+
+
+# Read Grid {{{
+def read_grid( sweep_config ):
+    """
+    Read Grid: read the value grids from a sweep configuration, where each
+    key holds a comma separated list of values to try. The [sweep] section
+    holds settings for the sweep itself and is not part of the grid.
+    Returns a list of (section, option, values) tuples.
+
+    sweep_config: ConfigParser of the sweep file
+
+    """
+
+    grid = []
+
+    for section in sweep_config.sections():
+        if section == "sweep":
+            continue
+
+        for (option, values) in sweep_config.items( section ):
+            values = [value.strip() for value in values.split(",")]
+            grid.append( (section, option, values) )
+
+    return grid
+# }}}
+
+
+
+# Expand Grid {{{
+def expand_grid( config, grid ):
+    """
+    Expand Grid: build one configuration for every combination of values
+    in the grid, on top of the base configuration. Fitted models are not
+    saved during a sweep, since every grid point would overwrite the last.
+
+    config: ConfigParser with documented fields
+    grid:   list of (section, option, values) tuples, as from read_grid
+
+    """
+
+    configs = []
+
+    value_lists = [values for (section, option, values) in grid]
+
+    for combination in itertools.product( *value_lists ):
+        combined = copy_config( config )
+
+        if combined.has_section( "output" ):
+            combined.set( "output", "model_dir", "" )
+
+        for ((section, option, values), value) in zip( grid, combination ):
+            if not combined.has_section( section ):
+                combined.add_section( section )
+            combined.set( section, option, value )
+
+        configs.append( combined )
+
+    return configs
+# }}}
+
+
+
+# Run Label {{{
+def run_label( algorithm, params, grid ):
+    """
+    Run Label: name a run by its algorithm and the swept values it used.
+
+    algorithm: the algorithm name
+    params:    the run's configuration values, as from result_key
+    grid:      list of (section, option, values) tuples
+
+    """
+
+    swept = ["%s.%s=%s" % (section, option, params[ section ][ option ])
+             for (section, option, values) in grid
+             if option in params.get( section, {} )]
+
+    return "%s [%s]" % (algorithm, ", ".join( swept ))
+# }}}
+
+
+
+# Load Results {{{
+def load_results( results_file ):
+    """
+    Load Results: read previously stored sweep results, keyed by their
+    result key. A missing file holds no results.
+
+    results_file: JSON lines file of stored results
+
+    """
+
+    results = {}
+
+    try:
+        with open( results_file ) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads( line )
+                    results[ record["key"] ] = record
+    except IOError:
+        pass
+
+    return results
+# }}}
+
+
+
+# Sweep {{{
+def sweep( driver, requested, config, grid, results_file ):
+    """
+    Sweep: run every requested algorithm over every combination of values
+    in the grid, skipping runs whose results are already stored. Runs are
+    grouped by their [tfidf] values, so that the corpus is vectorized once
+    per group. Returns the list of (run label, metrics) tuples run.
+
+    driver:       the driver module, "cluster" or "classifier"
+    requested:    list of algorithm names
+    config:       ConfigParser with documented fields
+    grid:         list of (section, option, values) tuples
+    results_file: JSON lines file of stored results
+
+    """
+
+    stored = load_results( results_file )
+
+    # Work out which runs are still needed, grouped by tfidf settings
+    groups = {}
+    for combined in expand_grid( config, grid ):
+        for algorithm in requested:
+
+            (key, params) = result_key( driver, algorithm, combined )
+
+            if key in stored:
+                logging.debug("Skipping stored run of %s (%s)." %
+                              (algorithm, key))
+                continue
+
+            group = json.dumps( section_values( combined, ["input", "tfidf"] ),
+                                sort_keys=True )
+            tasks = groups.setdefault( group, {} )
+            tasks[ key ] = (algorithm, combined, params)
+
+    num_runs = sum( len( tasks ) for tasks in groups.values() )
+    logging.info("%d runs stored, %d runs to go in %d vectorizations." %
+                 (len( stored ), num_runs, len( groups )) )
+
+    results = []
+
+    for group in sorted( groups ):
+        tasks = sorted( groups[ group ].items() )
+        group_config = tasks[0][1][1]
+
+        # read and vectorize the data once for the whole group
+        (labels, data) = vectorize_data( group_config )
+
+        metrics = run_tasks( driver,
+                             [(algorithm, combined)
+                              for (key, (algorithm, combined, _)) in tasks],
+                             data, labels, group_config )
+
+        # store each result as soon as its group finishes
+        with open( results_file, "a" ) as f:
+            for ((key, (algorithm, _, params)), values) in zip( tasks, metrics ):
+                record = {
+                    "key":       key,
+                    "driver":    driver,
+                    "algorithm": algorithm,
+                    "params":    params,
+                    "metrics":   values,
+                }
+                f.write( json.dumps( record, sort_keys=True ) + "\n" )
+
+                results.append( (run_label( algorithm, params, grid ), values) )
+
+    return results
+# }}}
+
+
+
+# Executable (Main) {{{
+if __name__ == "__main__":
+
+    # turn on logging
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(levelname)s: %(message)s')
+
+    # ensure we have at least the minimum required params
+    if len( sys.argv ) < 6 or sys.argv[4] not in ALGORITHM_SECTIONS:
+        logging.error( "Usage: python sweep.py [input.ini] [config.ini] "
+                       "[sweep.ini] [cluster|classifier] [algorithm ...]" )
+        sys.exit( 1 )
+
+    # pull in parameters from the command line
+    input_file  = sys.argv[1]
+    config_file = sys.argv[2]
+    sweep_file  = sys.argv[3]
+    driver      = sys.argv[4]
+    requested_algorithms = sys.argv[5:]
+
+    # read configuration files
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+    config.readfp( open( input_file ) )
+    config.readfp( open( config_file ) )
+
+    sweep_config = ConfigParser.ConfigParser( allow_no_value=True )
+    sweep_config.readfp( open( sweep_file ) )
+
+    results_file = get_option( sweep_config, "sweep", "results_file",
+                               "sweep_results.jsonl" )
+
+    # verify that requested algorithms are known
+    known_algorithms = ALGORITHM_SECTIONS[ driver ]
+    for algorithm in requested_algorithms:
+        if algorithm not in known_algorithms:
+            logging.error( "Algorithm \"%s\" is not recognized." % algorithm )
+
+    requested_algorithms = [algorithm for algorithm in requested_algorithms
+                            if algorithm in known_algorithms]
+
+    # run the sweep
+    results = sweep( driver, requested_algorithms, config,
+                     read_grid( sweep_config ), results_file )
+    report( results )
+# }}}
@@ -0,0 +1,192 @@
+"""
+Date:   2026-10-18
+Desc:   Small synthetic Stack Exchange dumps and configurations shared by the
+        tests, so each can build a corpus in a temporary directory, and
+        random post vectors for the estimators.
+"""
+
+
+import os
+import random
+import ConfigParser
+from xml.sax.saxutils import quoteattr
+
+import numpy
+import scipy.sparse
+
+
+
+# Words each synthetic site draws its posts from, by site directory.
+SITES = {
+    "cooking.stackexchange.com":
+        "egg bake oven flour sugar butter recipe salt pan knife".split(),
+    "gaming.stackexchange.com":
+        "level boss quest weapon armor skill console player mod".split(),
+    "math.stackexchange.com":
+        "integral matrix prime proof theorem group ring limit series".split(),
+}
+
+
+
+# Write Corpus {{{
+def write_corpus( data_dir, n_posts=60, seed=0 ):
+    """
+    Write Corpus: write a Posts.xml file for every site in SITES under
+    data_dir, one row per line as in the dumps. Every tenth post is empty.
+
+    data_dir: directory to write the site directories into
+    n_posts:  number of rows written per site
+    seed:     seed for the words drawn
+
+    """
+
+    rng = random.Random( seed )
+
+    for (site, words) in sorted( SITES.items() ):
+        site_dir = os.path.join( data_dir, site )
+        if not os.path.isdir( site_dir ):
+            os.makedirs( site_dir )
+
+        with open( os.path.join( site_dir, "Posts.xml" ), "w" ) as f:
+            f.write( '<?xml version="1.0" encoding="utf-8"?>\n<posts>\n' )
+
+            for row in xrange( n_posts ):
+                body = ""
+                if row % 10 != 0:
+                    body = "<p>%s <b>%s</b></p>" % (
+                        " ".join( rng.choice( words ) for i in xrange( 12 ) ),
+                        rng.choice( words ))
+
+                f.write( '  <row Id="%d" Body=%s />\n' %
+                         (row + 1, quoteattr( body )) )
+
+            f.write( "</posts>\n" )
+# }}}
+
+
+
+# Make Config {{{
+def make_config( data_dir, **options ):
+    """
+    Make Config: the configuration for reading a corpus from disk, without
+    caching, sampling or parallelism, overridden by keyword arguments of
+    the form section_option.
+
+    data_dir: directory holding the site directories
+
+    """
+
+    config = ConfigParser.ConfigParser( allow_no_value=True )
+
+    defaults = {
+        "input": {
+            "in_protocol":   "disk",
+            "data_dir":      data_dir,
+            "s3_url":        "",
+            "s3_index_file": "",
+            "post_file":     "Posts.xml",
+            "n_workers":     "1",
+            "cache_dir":     "",
+        },
+        "tfidf": {
+            "sample_size": "0",
+            "max_df":      "0.9",
+            "min_df":      "2",
+        },
+        "output": {
+            "metrics_file": "",
+            "model_dir":    "",
+        },
+    }
+
+    for (section, values) in defaults.items():
+        config.add_section( section )
+        for (option, value) in values.items():
+            config.set( section, option, value )
+
+    for (name, value) in options.items():
+        (section, option) = name.split( "_", 1 )
+        if not config.has_section( section ):
+            config.add_section( section )
+        config.set( section, option, str( value ) )
+
+    return config
+# }}}
+
+
+
+# Random Posts {{{
+def random_posts( n_posts, n_terms=40, density=0.15, seed=0 ):
+    """
+    Random Posts: a random sparse matrix of unit length rows standing in for
+    TF-IDF vectors, with no empty rows.
+
+    n_posts: number of rows
+    n_terms: number of columns
+    density: fraction of entries stored, before every row gets one more
+    seed:    seed for the matrix
+
+    """
+
+    random = numpy.random.RandomState( seed )
+
+    data = scipy.sparse.rand( n_posts, n_terms, density=density,
+                              format="lil", random_state=random )
+    for row in xrange( n_posts ):
+        data[row, random.randint( n_terms )] = random.rand() + 0.1
+
+    data = data.tocsr()
+    norms = numpy.sqrt( data.multiply( data ).sum( axis=1 ) ).A.ravel()
+
+    return (scipy.sparse.diags( 1.0 / norms, 0 ) * data).tocsr()
+# }}}
+
+
+
+# Grouped Posts {{{
+def grouped_posts( n_groups=3, n_per_group=40, n_terms=10, seed=0 ):
+    """
+    Grouped Posts: random unit length posts in groups drawing on disjoint
+    blocks of terms, so that each group is a well separated cluster.
+    Returns the CSR matrix and the group of every post.
+
+    n_groups:    number of groups
+    n_per_group: number of posts in each group
+    n_terms:     number of terms in each group's block
+    seed:        seed for the matrix
+
+    """
+
+    random = numpy.random.RandomState( seed )
+
+    blocks = []
+    for group in xrange( n_groups ):
+        block = numpy.zeros( (n_per_group, n_groups * n_terms) )
+        block[:, group * n_terms : (group + 1) * n_terms] = (
+            random.rand( n_per_group, n_terms ) + 0.2 )
+        blocks.append( block )
+
+    data = numpy.vstack( blocks )
+    data /= numpy.sqrt( (data ** 2).sum( axis=1 ) )[:, None]
+
+    labels = numpy.repeat( numpy.arange( n_groups ), n_per_group )
+
+    return (scipy.sparse.csr_matrix( data ), labels)
+# }}}
+
+
+
+# Same Partition {{{
+def same_partition( first, second ):
+    """
+    Same Partition: whether two labellings group the points the same way,
+    whatever the labels themselves.
+    """
+
+    first  = numpy.asarray( first )
+    second = numpy.asarray( second )
+
+    pairs = set( zip( first, second ) )
+    return (len( pairs ) == len( set( first ) ) and
+            len( pairs ) == len( set( second ) ))
+# }}}
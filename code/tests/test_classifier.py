@@ -0,0 +1,86 @@
+"""
+Date:   2026-10-18
+Desc:   Check that cross validation scores every post once, whether the folds
+        are fitted serially or by a pool of workers, and saves a model
+        refitted on every post together with its reduction.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+import numpy
+
+from sklearn import naive_bayes
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import make_config, grouped_posts
+from classifier import run_cross_validation, do_dtree
+from model_store import load_estimator
+
+
+
+# Test Cross Validation {{{
+class TestCrossValidation( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        (self.data, self.labels) = grouped_posts( n_groups=4, n_per_group=30 )
+
+        # pretend there is a core for every fold
+        self.cpu_count = multiprocessing.cpu_count
+        multiprocessing.cpu_count = lambda: 4
+
+
+    def tearDown( self ):
+        multiprocessing.cpu_count = self.cpu_count
+        shutil.rmtree( self.root )
+
+
+    def test_workers_unchanged( self ):
+        results = []
+
+        for n_jobs in [1, 3]:
+            config = make_config( "", crossval_n_jobs=n_jobs )
+            results.append( run_cross_validation(
+                naive_bayes.MultinomialNB(), self.data, self.labels, 3,
+                config, "nbayes" ) )
+
+        self.assertEqual( results[1]["accuracy"], results[0]["accuracy"] )
+        self.assertEqual( results[0]["accuracy"], 1.0 )
+        self.assertEqual( results[0]["accuracy_std"], 0.0 )
+        for name in ["runtime", "runtime_std", "predict_time",
+                     "predict_time_std"]:
+            self.assertIn( name, results[0] )
+
+
+    def test_saves_model_fitted_on_every_post( self ):
+        model_dir = os.path.join( self.root, "models" )
+        config = make_config( "", crossval_n_folds=3, dtree_max_depth=5,
+                              reduce_n_components=6,
+                              output_model_dir=model_dir )
+
+        results = do_dtree( self.data, self.labels, config )
+        self.assertIn( "accuracy_std", results )
+
+        (estimator, reduction, info) = load_estimator( model_dir, "dtree" )
+
+        # reduced as the folds were, and fitted on all of the posts
+        self.assertEqual( reduction.components_.shape, (6, 40) )
+        self.assertEqual( info["n_features"], 6 )
+        self.assertEqual( estimator.tree_.n_node_samples[0], 120 )
+
+        reduced = reduction.transform( self.data )
+        numpy.testing.assert_array_equal( estimator.predict( reduced ),
+                                          self.labels )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Date:   2026-10-18
+Desc:   Check that metrics logs are compared run for run, grouping records of
+        the same parameters and dataset, and that only growth beyond the
+        tolerance is flagged.
+"""
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import make_config
+from metrics_log import emit_record
+from compare_metrics import load_records, record_key, compare
+
+
+
+# Test Compare Metrics {{{
+class TestCompareMetrics( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def write( self, name, runs ):
+        """
+        Write: a metrics log of (min_df, rows, fit_time, peak_rss_mb) kmeans
+        runs. Returns its path.
+        """
+
+        path = os.path.join( self.root, name )
+
+        for (min_df, rows, fit_time, peak_rss) in runs:
+            config = make_config( "data", output_metrics_file=path,
+                                  tfidf_min_df=min_df, kmeans_n_init=1 )
+            timings = {"fit_time": fit_time, "peak_rss_mb": peak_rss}
+            emit_record( config, "cluster", "kmeans", (rows, 50, 500),
+                         timings, {"v_measure": 0.5} )
+
+        return path
+
+
+    def test_records_grouped_by_run( self ):
+        records = load_records( self.write( "metrics.jsonl",
+                                            [(2, 100, 1.0, 10.0),
+                                             (2, 100, 3.0, 30.0),
+                                             (3, 100, 1.0, 10.0),
+                                             (2, 200, 1.0, 10.0)] ) )
+
+        # other parameters or another dataset size are other runs
+        self.assertEqual( sorted( len( group ) for group in records.values() ),
+                          [1, 1, 2] )
+        for key in records:
+            self.assertEqual( key[:2], ("cluster", "kmeans") )
+
+
+    def test_key_recomputed_for_old_records( self ):
+        path = self.write( "metrics.jsonl", [(2, 100, 1.0, 10.0)] )
+
+        with open( path ) as f:
+            record = json.loads( f.readline() )
+
+        key = record.pop( "key" )
+        self.assertEqual( record_key( record ), key )
+
+
+    def test_regressions_flagged( self ):
+        baseline = load_records( self.write( "baseline.jsonl",
+                                             [(2, 100, 1.0, 10.0),
+                                              (2, 100, 3.0, 10.0),
+                                              (3, 100, 1.0, None)] ) )
+        current  = load_records( self.write( "current.jsonl",
+                                             [(2, 100, 2.1, 10.5),
+                                              (3, 100, 5.0, 20.0),
+                                              (2, 200, 9.0, 90.0)] ) )
+
+        regressions = compare( baseline, current, 0.1 )
+
+        # compared with the baseline's mean, within tolerance isn't flagged
+        # and runs or measurements without a baseline are skipped
+        self.assertEqual( [(measurement, before, after)
+                           for (key, measurement, before, after)
+                           in regressions],
+                          [("fit_time", 1.0, 5.0)] )
+
+        self.assertEqual( compare( baseline, current, 5.0 ), [] )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
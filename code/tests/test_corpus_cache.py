@@ -0,0 +1,251 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the corpus cache hands back the corpus it stored, and that
+        its key follows the inputs and options which change the vectors and
+        ignores those which don't.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config, SITES
+from corpus_cache import fingerprint, load_corpus
+from vectorize_data import vectorize_data, list_sites
+from post_index import build_index
+from post_store import write_store
+from s3_store import S3Store
+
+
+
+# Test Corpus Cache {{{
+class TestCorpusCache( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root     = tempfile.mkdtemp()
+        self.data_dir = os.path.join( self.root, "data" )
+        write_corpus( self.data_dir )
+
+        self.config = make_config( self.data_dir,
+                                   input_cache_dir=os.path.join( self.root,
+                                                                 "cache" ) )
+        self.sites = list_sites( self.config )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_miss_then_hit( self ):
+        self.assertIsNone( load_corpus( self.config, self.sites ) )
+
+        (labels, data, vectorizer) = vectorize_data( self.config,
+                                                     return_vectorizer=True )
+        self.assertIsNotNone( load_corpus( self.config, self.sites ) )
+
+        (cached_labels, cached, cached_vectorizer) = vectorize_data(
+            self.config, return_vectorizer=True )
+
+        self.assertEqual( cached_labels, labels )
+        self.assertEqual( (cached - data).nnz, 0 )
+
+        posts = ["bake the egg in the oven", "prime group theorem"]
+        self.assertEqual( (cached_vectorizer.transform( posts ) -
+                           vectorizer.transform( posts )).nnz, 0 )
+
+
+    def test_key_ignores_neutral_options( self ):
+        key = fingerprint( self.config, self.sites )
+
+        neutral = make_config( self.data_dir,
+                               input_cache_dir="elsewhere",
+                               input_n_workers=4,
+                               input_store_compression=6,
+                               profile_enabled="true",
+                               output_metrics_file="metrics.jsonl" )
+
+        self.assertEqual( fingerprint( neutral, self.sites ), key )
+
+
+    def test_key_follows_options( self ):
+        key = fingerprint( self.config, self.sites )
+
+        for options in [{"tfidf_min_df": 3},
+                        {"tfidf_sample_size": 10},
+                        {"input_post_format": "binary"}]:
+            changed = make_config( self.data_dir, **options )
+            self.assertNotEqual( fingerprint( changed, self.sites ), key,
+                                 options )
+
+
+    def test_key_follows_files( self ):
+        (fullpath, category) = self.sites[0]
+        keys = [fingerprint( self.config, self.sites )]
+
+        # a rewritten dump
+        with open( fullpath, "a" ) as f:
+            f.write( "\n" )
+        keys.append( fingerprint( self.config, self.sites ) )
+
+        # a row index, which changes how samples are drawn
+        build_index( fullpath )
+        keys.append( fingerprint( self.config, self.sites ) )
+
+        # a binary store, read in place of the XML
+        binary = make_config( self.data_dir, input_post_format="binary" )
+        keys.append( fingerprint( binary, self.sites ) )
+        write_store( fullpath, category, [(1, "egg")] )
+        keys.append( fingerprint( binary, self.sites ) )
+
+        self.assertEqual( len( set( keys ) ), len( keys ) )
+# }}}
+
+
+
+# Fake Key {{{
+class FakeKey( object ):
+    """
+    Fake Key: a boto key whose GET returns a fixed body.
+    """
+
+    def __init__( self, body ):
+
+        self.body = body
+        self.size = len( body )
+        self.etag = '"%x"' % hash( body )
+        self.last_modified = None
+
+
+    def open_read( self ):
+
+        self.opened = True
+
+
+    def read( self, size=-1 ):
+
+        (data, self.body) = (self.body, "")
+        return data
+
+
+    def close( self ):
+        pass
+# }}}
+
+
+
+# Fake Bucket {{{
+class FakeBucket( object ):
+    """
+    Fake Bucket: a boto bucket counting HEAD requests (get_key).
+    """
+
+    def __init__( self, objects ):
+
+        self.objects = objects
+        self.heads   = []
+
+
+    def get_key( self, name ):
+
+        self.heads.append( name )
+        if name not in self.objects:
+            return None
+        return FakeKey( self.objects[ name ] )
+
+
+    def new_key( self, name ):
+
+        return FakeKey( self.objects[ name ] )
+# }}}
+
+
+
+# Fake Connection {{{
+class FakeConnection( object ):
+    """
+    Fake Connection: a boto connection to a single fake bucket.
+    """
+
+    def __init__( self, bucket ):
+
+        self.bucket = bucket
+
+
+    def get_bucket( self, name, validate=True ):
+
+        return self.bucket
+# }}}
+
+
+
+# Test S3 Cache Key {{{
+class TestS3CacheKey( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        fake_dir  = os.path.join( self.root, "fake" )
+        write_corpus( os.path.join( fake_dir, "bucket", "data" ) )
+
+        with open( os.path.join( fake_dir, "bucket", "index.txt" ), "w" ) as f:
+            f.write( "\n".join( sorted( SITES ) ) )
+
+        self.config = make_config( "data",
+                                   input_in_protocol="s3",
+                                   input_s3_url="s3://bucket",
+                                   input_s3_index_file="index.txt",
+                                   input_s3_fake_dir=fake_dir,
+                                   input_cache_dir=os.path.join( self.root,
+                                                                 "cache" ) )
+        self.sites = list_sites( self.config )
+
+        self.disk = make_config( os.path.join( fake_dir, "bucket", "data" ) )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_key_follows_objects( self ):
+        key = fingerprint( self.config, self.sites )
+
+        (url, category) = self.sites[0]
+        path = os.path.join( self.root, "fake", url[ len( "s3://" ): ] )
+        with open( path, "a" ) as f:
+            f.write( "\n" )
+
+        self.assertNotEqual( fingerprint( self.config, self.sites ), key )
+
+
+    def test_s3_corpus_cached( self ):
+        (labels, data) = vectorize_data( self.config )
+        self.assertIsNotNone( load_corpus( self.config, self.sites ) )
+
+        (disk_labels, disk_data) = vectorize_data( self.disk )
+        self.assertEqual( labels, disk_labels )
+        self.assertEqual( (data - disk_data).nnz, 0 )
+
+
+    def test_objects_read_without_head( self ):
+        bucket = FakeBucket( {"data/Posts.xml": "<posts />"} )
+
+        store = S3Store()
+        store.local.connection = FakeConnection( bucket )
+
+        self.assertEqual( store.stat( "s3://bucket/data/Posts.xml" )[0], 9 )
+        self.assertEqual( store.open( "s3://bucket/data/Posts.xml" ).read(),
+                          "<posts />" )
+        self.assertEqual( store.stat( "s3://bucket/missing" ), (-1, "") )
+
+        # only the stat for the cache key requests the headers
+        self.assertEqual( bucket.heads, ["data/Posts.xml", "missing"] )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
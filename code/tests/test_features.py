@@ -0,0 +1,112 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the hashing engine weights posts as the TF-IDF vectorizer
+        does, whether counted at once or chunk by chunk, and that both
+        vectorizers survive being flattened into arrays.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy
+import scipy.sparse
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+from features import HashingTfidf, make_tfidf_vectorizer
+from features import vectorizer_arrays, vectorizer_from_arrays
+from vectorize_data import list_sites, iter_posts
+
+
+
+# Test Features {{{
+class TestFeatures( unittest.TestCase ):
+
+    def setUp( self ):
+        root = tempfile.mkdtemp()
+        write_corpus( root )
+
+        self.config = make_config( root )
+        self.posts  = []
+        for (fullpath, category) in list_sites( self.config ):
+            self.posts.extend( iter_posts( fullpath, self.config ) )
+
+        shutil.rmtree( root )
+
+        self.queries = ["bake the egg in a pan", "prime ring theorem proof",
+                        "nothing in the vocabulary"]
+
+
+    def test_hashing_matches_tfidf( self ):
+        tfidf   = make_tfidf_vectorizer( self.config )
+        hashing = HashingTfidf( self.config )
+
+        expected = tfidf.fit_transform( self.posts )
+        hashed   = hashing.fit_transform_counts( hashing.count( self.posts ) )
+
+        # the same features, in another order: compare the similarities
+        self.assertEqual( hashed.shape, expected.shape )
+        numpy.testing.assert_allclose( (hashed * hashed.T).toarray(),
+                                       (expected * expected.T).toarray() )
+
+        numpy.testing.assert_allclose(
+            (hashing.transform( self.queries ) * hashed.T).toarray(),
+            (tfidf.transform( self.queries ) * expected.T).toarray() )
+
+
+    def test_frequencies_skip_stored_zeros( self ):
+        hashing = HashingTfidf( make_config( "", tfidf_n_features=4 ) )
+
+        # an entry stored as zero, as left by arithmetic on the counts
+        counts = scipy.sparse.csr_matrix( (numpy.array( [2.0, 0.0, 1.0] ),
+                                           numpy.array( [0, 1, 1] ),
+                                           numpy.array( [0, 2, 3] )),
+                                          shape=(2, 4) )
+
+        numpy.testing.assert_array_equal( hashing.frequencies( counts ),
+                                          [1, 1, 0, 0] )
+
+
+    def test_counts_positive( self ):
+        hashing = HashingTfidf( self.config )
+        counts  = hashing.count( self.posts )
+
+        # every token lands as a positive count, none cancel out
+        analyze = hashing.hasher.build_analyzer()
+        self.assertTrue( (counts.data > 0).all() )
+        self.assertEqual( counts.sum(),
+                          sum( len( analyze( post ) ) for post in self.posts ) )
+
+
+    def test_chunked_counts( self ):
+        whole   = HashingTfidf( self.config )
+        chunked = HashingTfidf( make_config( "", tfidf_chunk_size=7 ) )
+
+        self.assertEqual( (whole.count( self.posts ) -
+                           chunked.count( self.posts )).nnz, 0 )
+
+
+    def test_arrays_round_trip( self ):
+        for vectorizer in [make_tfidf_vectorizer( self.config ),
+                           HashingTfidf( self.config )]:
+            if isinstance( vectorizer, HashingTfidf ):
+                vectorizer.fit_counts( vectorizer.count( self.posts ) )
+            else:
+                vectorizer.fit( self.posts )
+
+            restored = vectorizer_from_arrays( vectorizer_arrays( vectorizer ),
+                                               self.config )
+
+            self.assertEqual( (restored.transform( self.queries ) -
+                               vectorizer.transform( self.queries )).nnz, 0 )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
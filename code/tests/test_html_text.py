@@ -0,0 +1,69 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the compiled tokenizer in html_text strips post bodies to
+        exactly the text the lxml DOM path gives, or defers to it.
+"""
+
+
+import os
+import sys
+import unittest
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from html_text import fast_text_content, dom_text_content, strip_html
+
+
+
+# Bodies on which the two paths have disagreed, or easily could.
+BODIES = [
+    u"<p>it&apos;s</p>",
+    u"<p>a&#0;b&#x0;c</p>",
+    u"<p>a\x00b</p>",
+    u"<p>a\x0cb\x0bc\x01d\x1fe</p>",
+    u"<p>a&#1;b&#12;c&#x1f;d</p>",
+    u"<p>a\ufffeb\uffffc&#xFFFE;d&#xFFFF;e</p>",
+    u"<p>a&#xD800;b&#x110000;c&#99999999999;d</p>",
+    u"<p>a&#9;b&#10;c&#13;d\te\nf\rg</p>",
+    u"<p>a&#x7f;b&#128;c&#x9f;d\x85e</p>",
+    u"<p>\xe9&eacute;&#x1F600;&#x10FFFF;</p>",
+    u"<p>x&apos;&amp;apos;&amp;&lt;&gt;&quot;</p>",
+    u"<p title='a > b'>text <b>bold</b> &unknown; tail</p>",
+    u"<pre><code>if (a &lt; b &amp;&amp; c)</code></pre>",
+]
+
+
+
+# Test Strip HTML {{{
+class TestStripHTML( unittest.TestCase ):
+
+    def test_fast_path_matches_dom( self ):
+        for body in BODIES:
+            fast = fast_text_content( body )
+            if fast is not None:
+                self.assertEqual( fast, dom_text_content( body ),
+                                  repr( body ) )
+
+
+    def test_fast_path_handles_references( self ):
+        self.assertEqual( fast_text_content( u"<p>it&apos;s</p>" ), u"it's" )
+        self.assertEqual( fast_text_content( u"<p>a&#0;b</p>" ), u"ab" )
+        self.assertEqual( fast_text_content( u"<p>a\x0cb</p>" ), u"ab" )
+
+
+    def test_nul_defers_to_dom( self ):
+        self.assertIsNone( fast_text_content( u"<p>a\x00b</p>" ) )
+        self.assertEqual( strip_html( u"<p>a\x00b</p>" ),
+                          dom_text_content( u"<p>a\x00b</p>" ) )
+
+
+    def test_unsafe_markup_defers_to_dom( self ):
+        body = u"<p>a<!-- b --></p><script>c</script>"
+        self.assertIsNone( fast_text_content( body ) )
+        self.assertEqual( strip_html( body ), dom_text_content( body ) )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
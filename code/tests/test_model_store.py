@@ -0,0 +1,150 @@
+"""
+Date:   2026-10-18
+Desc:   Check that saved models come back as they were fitted: predict.py
+        labels new posts exactly as the in-memory estimator does, reduced
+        input included, and model arrays are read back memory-mapped.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from sklearn import svm, tree
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+from model_store import save_model, load_model
+from model_store import save_vectorizer, save_estimator, load_estimator
+from reduction import reduce_dimensions
+from vectorize_data import vectorize_data, list_sites, iter_posts
+from predict import predict_posts
+
+
+
+# Test Model Store {{{
+class TestModelStore( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root      = tempfile.mkdtemp()
+        self.data_dir  = os.path.join( self.root, "data" )
+        self.model_dir = os.path.join( self.root, "models" )
+        self.out_file  = os.path.join( self.root, "predictions.tsv" )
+
+        write_corpus( self.data_dir )
+
+        self.config = make_config( self.data_dir,
+                                   output_model_dir=self.model_dir,
+                                   predict_batch_size=13,
+                                   predict_predictions_file=self.out_file )
+
+        (self.labels, self.data, self.vectorizer) = vectorize_data(
+            self.config, return_vectorizer=True )
+        save_vectorizer( self.config, self.vectorizer )
+
+        self.sites = list_sites( self.config )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def predicted( self, name ):
+        """
+        Predicted: the labels predict.py writes for every site, in order.
+        """
+
+        if os.path.exists( self.out_file ):
+            os.remove( self.out_file )
+
+        post_files = [fullpath for (fullpath, category) in self.sites]
+        predict_posts( self.config, name, post_files )
+
+        with open( self.out_file ) as f:
+            return [line.rstrip( "\n" ).split( "\t" )[2] for line in f]
+
+
+    def posts( self ):
+        """
+        Posts: the cleaned posts of every site, in order.
+        """
+
+        posts = []
+        for (fullpath, category) in self.sites:
+            posts.extend( iter_posts( fullpath, self.config ) )
+
+        return posts
+
+
+    def test_predict_sparse( self ):
+        estimator = svm.LinearSVC().fit( self.data, self.labels )
+        save_estimator( self.config, "svm", estimator, self.data )
+
+        expected = estimator.predict( self.vectorizer.transform(
+            self.posts() ) )
+
+        self.assertEqual( self.predicted( "svm" ), list( expected ) )
+
+
+    def test_predict_reduced( self ):
+        (reduced, svd) = reduce_dimensions( self.data, self.config, 5 )
+
+        estimator = tree.DecisionTreeClassifier( random_state=0 )
+        estimator.fit( reduced, self.labels )
+        save_estimator( self.config, "dtree", estimator, reduced, svd )
+
+        (loaded, reduction, info) = load_estimator( self.model_dir, "dtree" )
+        self.assertEqual( info["n_features"], 5 )
+        numpy.testing.assert_array_equal( reduction.components_,
+                                          svd.components_ )
+
+        expected = estimator.predict( svd.transform(
+            self.vectorizer.transform( self.posts() ) ) )
+
+        self.assertEqual( self.predicted( "dtree" ), list( expected ) )
+
+
+    def test_arrays_memory_mapped( self ):
+        path   = os.path.join( self.root, "online" )
+        arrays = {"centers": numpy.arange( 12.0 ).reshape( 3, 4 ),
+                  "counts":  numpy.array( [4, 5, 6] )}
+
+        save_model( path, self.config, self.vectorizer, arrays, {"n": 1} )
+        (vectorizer, loaded, info) = load_model( path )
+
+        self.assertEqual( info, {"n": 1} )
+        for (name, array) in arrays.items():
+            self.assertIsInstance( loaded[ name ], numpy.memmap )
+            numpy.testing.assert_array_equal( loaded[ name ], array )
+
+        posts = self.posts()[:5]
+        self.assertEqual( (vectorizer.transform( posts ) -
+                           self.vectorizer.transform( posts )).nnz, 0 )
+
+
+    def test_save_replaces_model( self ):
+        path = os.path.join( self.root, "online" )
+
+        for n in [1, 2]:
+            save_model( path, self.config, None,
+                        {"counts": numpy.array( [n] )}, {"n": n} )
+
+        (vectorizer, loaded, info) = load_model( path )
+        self.assertIsNone( vectorizer )
+        self.assertEqual( info, {"n": 2} )
+        self.assertEqual( list( loaded["counts"] ), [2] )
+
+        # no staging or retired directories are left beside it
+        self.assertEqual( sorted( os.listdir( self.root ) ),
+                          ["data", "models", "online"] )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the online clustering resumes from its saved centroids,
+        folds new posts into them only when updating, and assigns every new
+        post to a cluster.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config, same_partition, SITES
+from model_store import load_model
+from online_cluster import fit_model, update_model
+from online_cluster import restore_clusterer, clusterer_arrays
+from vectorize_data import list_sites
+
+
+
+# Test Online Cluster {{{
+class TestOnlineCluster( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root     = tempfile.mkdtemp()
+        self.data_dir = os.path.join( self.root, "data" )
+        write_corpus( self.data_dir )
+
+        # new posts arriving for every site
+        self.delta_dir = os.path.join( self.root, "delta" )
+        write_corpus( self.delta_dir, n_posts=30, seed=1 )
+        self.deltas = [fullpath for (fullpath, category)
+                       in list_sites( make_config( self.delta_dir ) )]
+
+        self.model_dir   = os.path.join( self.root, "model" )
+        self.assignments = os.path.join( self.root, "assignments.tsv" )
+
+        self.config = make_config( self.data_dir,
+                                   kmeans_init="k-means++",
+                                   kmeans_n_init=3,
+                                   kmeans_init_size=180,
+                                   kmeans_batch_size=20,
+                                   online_model_dir=self.model_dir,
+                                   online_batch_size=8,
+                                   online_assignments_file=self.assignments )
+        fit_model( self.config )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def read_assignments( self ):
+        """
+        Read Assignments: the (file, post, cluster) lines written so far.
+        """
+
+        with open( self.assignments ) as f:
+            return [(fields[0], int( fields[1] ), int( fields[2] ))
+                    for fields in (line.split( "\t" ) for line in f)]
+
+
+    def test_fit_saves_model( self ):
+        (vectorizer, arrays, info) = load_model( self.model_dir )
+
+        self.assertEqual( arrays["centers"].shape[0], len( SITES ) )
+        self.assertEqual( info["n_posts"], 3 * 54 )
+        self.assertEqual( info["updates"], [] )
+        self.assertEqual( vectorizer.transform( ["egg"] ).shape[1],
+                          arrays["centers"].shape[1] )
+
+
+    def test_restore_round_trip( self ):
+        (vectorizer, arrays, info) = load_model( self.model_dir )
+        km = restore_clusterer( self.config, arrays )
+
+        for (name, array) in clusterer_arrays( km ).items():
+            numpy.testing.assert_array_equal( array, arrays[ name ] )
+
+        # the restored arrays are copies, free to be updated in place
+        self.assertNotIsInstance( km.cluster_centers_, numpy.memmap )
+
+
+    def test_assign_leaves_model( self ):
+        (vectorizer, before, info) = load_model( self.model_dir, None )
+
+        update_model( self.config, self.deltas, learn=False )
+
+        (vectorizer, after, info) = load_model( self.model_dir, None )
+        for name in before:
+            numpy.testing.assert_array_equal( after[ name ], before[ name ] )
+        self.assertEqual( info["updates"], [] )
+
+        # every new post is assigned, in file order
+        assigned = self.read_assignments()
+        self.assertEqual( len( assigned ), 3 * 27 )
+
+        for in_file in self.deltas:
+            posts = [post for (name, post, label) in assigned
+                     if name == in_file]
+            self.assertEqual( posts, range( 27 ) )
+
+        # the sites share no words, so each lands in a cluster of its own
+        self.assertTrue( same_partition(
+            [label for (name, post, label) in assigned],
+            [name for (name, post, label) in assigned] ) )
+
+
+    def test_update_folds_posts_in( self ):
+        (vectorizer, before, info) = load_model( self.model_dir, None )
+
+        update_model( self.config, self.deltas )
+
+        (vectorizer, after, info) = load_model( self.model_dir, None )
+        self.assertEqual( after["counts"].sum(),
+                          before["counts"].sum() + 3 * 27 )
+        self.assertFalse( numpy.allclose( after["centers"],
+                                          before["centers"] ) )
+
+        self.assertEqual( info["n_posts"], 3 * 54 + 3 * 27 )
+        self.assertEqual( [update["n_posts"] for update in info["updates"]],
+                          [3 * 27] )
+        self.assertEqual( info["updates"][0]["files"], self.deltas )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
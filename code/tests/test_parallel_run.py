@@ -0,0 +1,166 @@
+"""
+Date:   2026-10-18
+Desc:   Check that concurrent runs hand every worker process a memory-mapped
+        view of one shared copy of the corpus, and report what a serial run
+        would.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+import numpy
+import scipy.sparse
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import make_config
+from parallel_run import share_matrix, attach_matrix, run_tasks
+from parallel_run import run_algorithms, worker_count
+
+
+
+# Mapped {{{
+def mapped( array ):
+    """
+    Mapped: whether an array is, or is a view of, a memory-mapped file.
+    """
+
+    while array is not None:
+        if isinstance( array, numpy.memmap ):
+            return True
+        array = array.base
+
+    return False
+# }}}
+
+
+
+# Describe {{{
+def describe( data, labels, config ):
+    """
+    Describe: an algorithm reporting what the process running it was given.
+    """
+
+    if scipy.sparse.issparse( data ):
+        shared = mapped( data.data ) and mapped( data.indices )
+    else:
+        shared = mapped( data )
+
+    return {"pid":    os.getpid(),
+            "shared": float( shared ),
+            "total":  float( data.sum() ) * config.getint( "test", "scale" ),
+            "labels": float( sum( labels ) )}
+# }}}
+
+# Table of algorithms run by the tests, looked up by module name.
+algorithms = {"describe": describe}
+
+
+
+# Test Parallel Run {{{
+class TestParallelRun( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+
+        rng = numpy.random.RandomState( 0 )
+        self.dense  = rng.rand( 30, 8 ) * (rng.rand( 30, 8 ) > 0.6)
+        self.sparse = scipy.sparse.csr_matrix( self.dense )
+        self.labels = range( 30 )
+
+        # pretend there is a core for every task
+        self.cpu_count = multiprocessing.cpu_count
+        multiprocessing.cpu_count = lambda: 4
+
+
+    def tearDown( self ):
+        multiprocessing.cpu_count = self.cpu_count
+        shutil.rmtree( self.root )
+
+
+    def test_share_round_trip( self ):
+        for data in [self.sparse, self.dense]:
+            path = tempfile.mkdtemp( dir=self.root )
+            share_matrix( path, data, self.labels )
+
+            (attached, labels) = attach_matrix( path )
+            self.assertEqual( labels, self.labels )
+
+            if scipy.sparse.issparse( data ):
+                self.assertEqual( (attached - data).nnz, 0 )
+                array = attached.data
+            else:
+                numpy.testing.assert_array_equal( attached, data )
+                array = attached
+
+            # mapped copy-on-write: writes never reach the shared files
+            self.assertTrue( mapped( array ) )
+            array[:] = 0
+
+            (again, labels) = attach_matrix( path )
+            self.assertNotEqual( again.sum(), 0 )
+
+
+    def test_worker_count( self ):
+        self.assertEqual( worker_count( 3, make_config( "" ) ), 1 )
+        self.assertEqual(
+            worker_count( 3, make_config( "", parallel_n_jobs=0 ) ), 3 )
+        self.assertEqual(
+            worker_count( 9, make_config( "", parallel_n_jobs=8 ) ), 4 )
+
+
+    def test_workers_map_shared_corpus( self ):
+        serial   = make_config( "", test_scale=1 )
+        parallel = make_config( "", test_scale=1, parallel_n_jobs=2 )
+
+        # scratch copies of the corpus go under the test's directory
+        tempdir = tempfile.tempdir
+        tempfile.tempdir = self.root
+        try:
+            for data in [self.sparse, self.dense]:
+                tasks = [("describe", make_config( "", test_scale=scale ))
+                         for scale in [1, 2, 3]]
+
+                expected = run_tasks( __name__, tasks, data, self.labels,
+                                      serial )
+                results  = run_tasks( __name__, tasks, data, self.labels,
+                                      parallel )
+
+                # the same metrics, in task order
+                for (result, metrics) in zip( results, expected ):
+                    self.assertAlmostEqual( result["total"],
+                                            metrics["total"] )
+                    self.assertEqual( result["labels"], metrics["labels"] )
+
+                # workers mapped the corpus rather than receiving a copy
+                for result in results:
+                    self.assertEqual( result["shared"], 1.0 )
+                    self.assertNotEqual( result["pid"], os.getpid() )
+                self.assertEqual( expected[0]["shared"], 0.0 )
+
+                # the shared copy is removed once every task is done
+                self.assertEqual( os.listdir( self.root ), [] )
+        finally:
+            tempfile.tempdir = tempdir
+
+
+    def test_run_algorithms( self ):
+        config  = make_config( "", test_scale=1, parallel_n_jobs=2 )
+        results = run_algorithms( __name__, ["describe", "describe"],
+                                  self.sparse, self.labels, config )
+
+        self.assertEqual( [algorithm for (algorithm, metrics) in results],
+                          ["describe", "describe"] )
+        for (algorithm, metrics) in results:
+            self.assertEqual( metrics["shared"], 1.0 )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the row index of a Posts.xml file points at its rows, and
+        that reservoir samples of an indexed site are read through it.
+"""
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+from post_index import build_index, load_index, RowReader
+import vectorize_data as vectorize_module
+from vectorize_data import list_sites, iter_posts
+
+
+
+# Test Post Index {{{
+class TestPostIndex( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        write_corpus( self.root )
+
+        self.sites = list_sites( make_config( self.root ) )
+        self.path  = self.sites[0][0]
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def read( self, **options ):
+        """
+        Read: the posts of every site, under the given options.
+        """
+
+        config = make_config( self.root, **options )
+        return [list( iter_posts( fullpath, config ) )
+                for (fullpath, category) in self.sites]
+
+
+    def test_offsets_point_at_rows( self ):
+        self.assertEqual( build_index( self.path ), 60 )
+
+        rows = [row.get( "Body", u"" )
+                for (event, row) in etree.iterparse( self.path, tag="row" )]
+
+        reader = RowReader( self.path )
+        try:
+            self.assertEqual( [reader.body( offset )
+                               for offset in load_index( self.path )], rows )
+        finally:
+            reader.close()
+
+
+    def test_stale_index_ignored( self ):
+        build_index( self.path )
+
+        stamp = time.time() + 10
+        os.utime( self.path, (stamp, stamp) )
+
+        self.assertIsNone( load_index( self.path ) )
+
+
+    def test_indexed_sample( self ):
+        every = self.read()
+
+        for (fullpath, category) in self.sites:
+            build_index( fullpath )
+
+        # an indexed site is never parsed from the top
+        iterparse = etree.iterparse
+        def unused( *args, **kwargs ):
+            raise AssertionError( "indexed site parsed in full" )
+
+        vectorize_module.etree.iterparse = unused
+        try:
+            for sample_size in [7, 1000]:
+                options = {"tfidf_sample_size": sample_size,
+                           "tfidf_sampling":    "reservoir"}
+
+                first  = self.read( **options )
+                second = self.read( **options )
+                self.assertEqual( first, second )
+
+                for (sample, posts) in zip( first, every ):
+                    self.assertEqual( len( sample ),
+                                      min( sample_size, len( posts ) ) )
+
+                    # a sample of the posts, kept in file order
+                    positions = [posts.index( post ) for post in sample]
+                    self.assertEqual( positions, sorted( positions ) )
+        finally:
+            vectorize_module.etree.iterparse = iterparse
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
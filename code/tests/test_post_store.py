@@ -0,0 +1,126 @@
+"""
+Date:   2026-10-18
+Desc:   Check that binary post stores read back what was written, and that
+        sampling a site through its store draws the same posts as reading
+        its XML.
+"""
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+from post_store import write_store, load_store
+from vectorize_data import list_sites, iter_posts, iter_clean_posts
+
+
+
+# Test Post Store {{{
+class TestPostStore( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join( self.root, "Posts.xml" )
+
+        with open( self.path, "w" ) as f:
+            f.write( "<posts />\n" )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_round_trip( self ):
+        posts = [(3, "plain"), (5, ""), (8, "caf\xc3\xa9"), (9, u"caf\xe9")]
+
+        for compression in [0, 6]:
+            self.assertEqual( write_store( self.path, "cooking", posts,
+                                           compression ), 4 )
+
+            store = load_store( self.path )
+            self.assertEqual( store.label, "cooking" )
+            self.assertEqual( list( store.ids ), [3, 5, 8, 9] )
+
+            bodies = [store.body( position ) for position in xrange( 4 )]
+            store.close()
+
+            # byte strings come back as written, unicode as UTF-8
+            self.assertEqual( bodies,
+                              ["plain", "", "caf\xc3\xa9", "caf\xc3\xa9"] )
+            for body in bodies:
+                self.assertIsInstance( body, str )
+
+
+    def test_stale_store_ignored( self ):
+        write_store( self.path, "cooking", [(1, "egg")] )
+
+        stamp = os.path.getmtime( self.path ) + 10
+        os.utime( self.path, (stamp, stamp) )
+
+        self.assertIsNone( load_store( self.path ) )
+# }}}
+
+
+
+# Test Store Sampling {{{
+class TestStoreSampling( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root     = tempfile.mkdtemp()
+        self.data_dir = os.path.join( self.root, "data" )
+        write_corpus( self.data_dir )
+
+        self.sites = list_sites( make_config( self.data_dir ) )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def read( self, **options ):
+        """
+        Read: the posts of every site, under the given options.
+        """
+
+        config = make_config( self.data_dir, **options )
+        return [list( iter_posts( fullpath, config ) )
+                for (fullpath, category) in self.sites]
+
+
+    def convert( self ):
+        """
+        Convert: write the binary store of every site.
+        """
+
+        for (fullpath, category) in self.sites:
+            with open( fullpath ) as f:
+                write_store( fullpath, category, iter_clean_posts( f ) )
+
+
+    def test_store_matches_xml( self ):
+        for sampling in ["reservoir", "first"]:
+            for sample_size in [0, 7, 1000]:
+                options = {"tfidf_sample_size": sample_size,
+                           "tfidf_sampling":    sampling}
+
+                xml = self.read( **options )
+                self.convert()
+                stored = self.read( input_post_format="binary", **options )
+
+                self.assertEqual( stored, xml, options )
+
+                # the XML posts are stripped, ASCII byte strings too
+                for posts in stored:
+                    for post in posts:
+                        self.assertIsInstance( post, str )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
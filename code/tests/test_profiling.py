@@ -0,0 +1,162 @@
+"""
+Date:   2026-10-18
+Desc:   Check that pipeline phases measure and report only when profiling is
+        on, release their memory watchers once reported, and dump cProfile
+        statistics for the selected phase.
+"""
+
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import unittest
+import threading
+from StringIO import StringIO
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import make_config
+from profiling import Phase, CountingReader
+
+
+
+# Recording Handler {{{
+class RecordingHandler( logging.Handler ):
+    """
+    Recording Handler: keep the messages logged while it is attached to the
+    root logger, at INFO and above.
+    """
+
+    def __init__( self ):
+
+        logging.Handler.__init__( self )
+        self.messages = []
+
+
+    def emit( self, record ):
+
+        self.messages.append( record.getMessage() )
+
+
+    def __enter__( self ):
+
+        root = logging.getLogger()
+        self.root_level = root.level
+
+        root.addHandler( self )
+        root.setLevel( logging.INFO )
+        return self
+
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+
+        root = logging.getLogger()
+        root.removeHandler( self )
+        root.setLevel( self.root_level )
+        return False
+# }}}
+
+
+
+# Test Phase {{{
+class TestPhase( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root    = tempfile.mkdtemp()
+        self.config  = make_config( "", profile_enabled="true",
+                                    profile_dump_dir=self.root )
+        self.threads = threading.active_count()
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_disabled_is_silent( self ):
+        for config in [None, make_config( "" )]:
+            phase = Phase( "read_posts", config )
+
+            with RecordingHandler() as handler:
+                with phase:
+                    self.assertEqual( threading.active_count(),
+                                      self.threads )
+                    phase.add( posts=3 )
+
+            self.assertFalse( phase.enabled )
+            self.assertEqual( handler.messages, [] )
+
+
+    def test_report( self ):
+        phase = Phase( "read_posts", self.config, "cooking" )
+
+        # started and stopped repeatedly, reported once
+        for i in xrange( 3 ):
+            phase.start()
+            phase.start()
+            phase.add( posts=2, num_bytes=1048576 )
+            phase.stop()
+
+        self.assertEqual( threading.active_count(), self.threads + 1 )
+
+        with RecordingHandler() as handler:
+            phase.report()
+
+        self.assertEqual( len( handler.messages ), 1 )
+        self.assertTrue( handler.messages[0].startswith(
+            "Phase read_posts (cooking): wall " ) )
+        self.assertIn( ", 6 posts (", handler.messages[0] )
+        self.assertIn( ", 3.0 MB read (", handler.messages[0] )
+        self.assertIn( ", peak memory ", handler.messages[0] )
+
+        # the memory watcher is stopped by the report
+        self.assertEqual( threading.active_count(), self.threads )
+
+
+    def test_report_stops_running_phase( self ):
+        phase = Phase( "fit", self.config )
+
+        with RecordingHandler() as handler:
+            try:
+                with phase:
+                    raise ValueError( "fit failed" )
+            except ValueError:
+                pass
+
+        self.assertIsNone( phase.started )
+        self.assertEqual( len( handler.messages ), 1 )
+        self.assertEqual( threading.active_count(), self.threads )
+
+
+    def test_cprofile_dumps( self ):
+        config = make_config( "", profile_enabled="true",
+                              profile_dump_dir=self.root,
+                              profile_cprofile_phase="fit" )
+
+        for name in ["fit", "fit", "metrics"]:
+            with Phase( name, config ):
+                sorted( range( 1000 ) )
+
+        # one numbered dump per run of the selected phase only
+        dumps = sorted( os.listdir( self.root ) )
+        self.assertEqual( len( dumps ), 2 )
+        for dump in dumps:
+            self.assertTrue( dump.startswith( "fit.%d." % os.getpid() ) )
+
+
+    def test_counting_reader( self ):
+        reader = CountingReader( StringIO( "x" * 100 ) )
+
+        self.assertEqual( len( reader.read( 30 ) ), 30 )
+        self.assertEqual( len( reader.read() ), 70 )
+        self.assertEqual( reader.count, 100 )
+
+        reader.close()
+        self.assertTrue( reader.handle.closed )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
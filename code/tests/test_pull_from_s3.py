@@ -0,0 +1,159 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the s3 downloader resumes partial files with ranged reads,
+        and removes files failing verification so that a rerun starts over.
+"""
+
+
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), "..",
+                                  "scripts" ) )
+
+import pull_from_s3 as pull_module
+from pull_from_s3 import pull_site
+
+
+
+# Posts stored in the fake bucket.
+BODY = "".join( '  <row Id="%d" Body="post %d" />\n' % (i, i)
+                for i in xrange( 50 ) )
+
+
+
+# Range Key {{{
+class RangeKey( object ):
+    """
+    Range Key: a boto key serving a fixed body, honouring Range headers and
+    recording the ranges asked for.
+    """
+
+    def __init__( self, body ):
+
+        self.body   = body
+        self.size   = len( body )
+        self.etag   = '"%s"' % hashlib.md5( body ).hexdigest()
+        self.ranges = []
+
+
+    def open_read( self, headers=None ):
+
+        offset = int( headers["Range"][ len( "bytes=" ) : -1 ] )
+        self.ranges.append( offset )
+        self.position = offset
+
+
+    def read( self, size ):
+
+        data = self.body[ self.position : self.position + size ]
+        self.position += len( data )
+        return data
+
+
+    def close( self ):
+        pass
+# }}}
+
+
+
+# Test Pull Site {{{
+class TestPullSite( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join( self.root, "cooking", "Posts.xml" )
+        self.key  = RangeKey( BODY )
+
+        # serve the fake key, in chunks smaller than the file
+        self.get_key    = pull_module.get_key
+        self.chunk_size = pull_module.CHUNK_SIZE
+        pull_module.get_key    = lambda url: self.key
+        pull_module.CHUNK_SIZE = 64
+
+        self.job = ("s3://bucket", "cooking", self.root)
+
+
+    def tearDown( self ):
+        pull_module.get_key    = self.get_key
+        pull_module.CHUNK_SIZE = self.chunk_size
+        shutil.rmtree( self.root )
+
+
+    def write_local( self, data ):
+        """
+        Write Local: leave a local copy of the site from an earlier run.
+        """
+
+        os.makedirs( os.path.dirname( self.path ) )
+        with open( self.path, "wb" ) as f:
+            f.write( data )
+
+
+    def read_local( self ):
+        """
+        Read Local: the local copy of the site.
+        """
+
+        with open( self.path, "rb" ) as f:
+            return f.read()
+
+
+    def test_fresh_download( self ):
+        self.assertEqual( pull_site( self.job ),
+                          ("cooking", len( BODY ), True) )
+        self.assertEqual( self.read_local(), BODY )
+        self.assertEqual( self.key.ranges, [0] )
+
+
+    def test_resume_partial( self ):
+        self.write_local( BODY[:100] )
+
+        self.assertEqual( pull_site( self.job ),
+                          ("cooking", len( BODY ) - 100, True) )
+        self.assertEqual( self.read_local(), BODY )
+        self.assertEqual( self.key.ranges, [100] )
+
+        # a complete file is not downloaded again
+        self.assertEqual( pull_site( self.job ), ("cooking", 0, True) )
+        self.assertEqual( self.key.ranges, [100] )
+
+
+    def test_larger_local_restarted( self ):
+        self.write_local( BODY + "stale" )
+
+        self.assertEqual( pull_site( self.job ),
+                          ("cooking", len( BODY ), True) )
+        self.assertEqual( self.read_local(), BODY )
+
+
+    def test_corrupt_file_removed( self ):
+        self.write_local( "x" * 100 )
+
+        self.assertEqual( pull_site( self.job ),
+                          ("cooking", len( BODY ) - 100, False) )
+        self.assertFalse( os.path.exists( self.path ) )
+
+        # a rerun downloads the whole file again
+        self.assertEqual( pull_site( self.job ),
+                          ("cooking", len( BODY ), True) )
+        self.assertEqual( self.read_local(), BODY )
+        self.assertEqual( self.key.ranges, [100, 0] )
+
+
+    def test_missing_site( self ):
+        pull_module.get_key = lambda url: None
+
+        self.assertEqual( pull_site( self.job ), ("cooking", 0, False) )
+        self.assertFalse( os.path.exists( self.path ) )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Date:   2026-10-18
+Desc:   Check that the directory store stands in for s3, and that prefetching
+        hands back every object in order while keeping at most its depth of
+        objects in flight.
+"""
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config, SITES
+from s3_store import DirectoryStore, S3Store, make_store, prefetch
+from vectorize_data import vectorize_data, list_sites
+
+
+
+# Recording Store {{{
+class RecordingStore( DirectoryStore ):
+    """
+    Recording Store: a directory store recording the objects opened, from
+    whichever thread opens them.
+    """
+
+    def __init__( self, root ):
+
+        DirectoryStore.__init__( self, root )
+
+        self.lock   = threading.Lock()
+        self.opened = []
+
+
+    def open( self, url ):
+
+        with self.lock:
+            self.opened.append( url )
+
+        return DirectoryStore.open( self, url )
+# }}}
+
+
+
+# Test Directory Store {{{
+class TestDirectoryStore( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        os.makedirs( os.path.join( self.root, "bucket", "data" ) )
+
+        self.path = os.path.join( self.root, "bucket", "data", "Posts.xml" )
+        with open( self.path, "wb" ) as f:
+            f.write( "<posts />" )
+
+        self.store = DirectoryStore( self.root )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_open( self ):
+        for url in ["s3://bucket/data/Posts.xml",
+                    "https://bucket.s3.amazonaws.com/data/Posts.xml"]:
+            handle = self.store.open( url )
+            self.assertEqual( handle.read(), "<posts />" )
+            handle.close()
+
+        with self.assertRaises( IOError ):
+            self.store.open( "s3://bucket/missing" )
+
+
+    def test_stat( self ):
+        (size, version) = self.store.stat( "s3://bucket/data/Posts.xml" )
+        self.assertEqual( size, 9 )
+
+        # rewriting the object changes its version
+        stamp = os.path.getmtime( self.path ) + 10
+        os.utime( self.path, (stamp, stamp) )
+        self.assertNotEqual( self.store.stat( "s3://bucket/data/Posts.xml" ),
+                             (size, version) )
+
+        self.assertEqual( self.store.stat( "s3://bucket/missing" ), (-1, "") )
+
+
+    def test_make_store( self ):
+        fake = make_store( make_config( "", input_s3_fake_dir=self.root ) )
+        self.assertIsInstance( fake, DirectoryStore )
+        self.assertEqual( fake.root, self.root )
+
+        self.assertIsInstance( make_store( make_config( "" ) ), S3Store )
+# }}}
+
+
+
+# Test Prefetch {{{
+class TestPrefetch( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        self.urls = []
+
+        for i in xrange( 6 ):
+            path = os.path.join( self.root, "bucket", "object%d" % i )
+            if not os.path.isdir( os.path.dirname( path ) ):
+                os.makedirs( os.path.dirname( path ) )
+            with open( path, "wb" ) as f:
+                f.write( str( i ) * (100 * (i + 1)) )
+
+            self.urls.append( "s3://bucket/object%d" % i )
+
+        self.store = RecordingStore( self.root )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_objects_in_order( self ):
+        fetched = []
+        for (url, handle) in prefetch( self.store, self.urls, 3, 1024 ):
+            fetched.append( (url, handle.read()) )
+
+        self.assertEqual( fetched,
+                          [(url, str( i ) * (100 * (i + 1)))
+                           for (i, url) in enumerate( self.urls )] )
+        self.assertEqual( sorted( self.store.opened ), self.urls )
+
+
+    def test_depth_bounds_fetches( self ):
+        for depth in [1, 2, 4]:
+            self.store.opened = []
+
+            for (index, (url, handle)) in enumerate(
+                    prefetch( self.store, self.urls, depth, 1024 ) ):
+
+                # give the pool time to run ahead, if it were to
+                time.sleep( 0.05 )
+                self.assertTrue( len( self.store.opened ) <= index + depth )
+                self.assertIn( url, self.store.opened )
+
+
+    def test_buffers_closed_and_spilled( self ):
+        handles = []
+        for (url, handle) in prefetch( self.store, self.urls, 2, 300 ):
+            handles.append( handle )
+
+            # only objects larger than the buffer spill to disk
+            self.assertEqual( handle._rolled, url >= "s3://bucket/object3" )
+
+        for handle in handles:
+            self.assertTrue( handle.closed )
+# }}}
+
+
+
+# Test Prefetched Ingestion {{{
+class TestPrefetchedIngestion( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        fake_dir  = os.path.join( self.root, "fake" )
+        write_corpus( os.path.join( fake_dir, "bucket", "data" ) )
+
+        with open( os.path.join( fake_dir, "bucket", "index.txt" ), "w" ) as f:
+            f.write( "\n".join( sorted( SITES ) ) )
+
+        self.options = {"input_in_protocol":   "s3",
+                        "input_s3_url":        "s3://bucket",
+                        "input_s3_index_file": "index.txt",
+                        "input_s3_fake_dir":   fake_dir}
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_matches_streamed( self ):
+        streamed = make_config( "data", **self.options )
+        fetched  = make_config( "data", input_s3_prefetch=2,
+                                input_s3_buffer_mb=1, **self.options )
+
+        self.assertEqual( list_sites( fetched ), list_sites( streamed ) )
+
+        (labels, data) = vectorize_data( fetched )
+        (streamed_labels, streamed_data) = vectorize_data( streamed )
+
+        self.assertEqual( labels, streamed_labels )
+        self.assertEqual( (data - streamed_data).nnz, 0 )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Date:   2026-10-18
+Desc:   Check the sparse k-nearest-neighbor classifier against a brute force
+        vote over the full cosine similarity matrix, and that cutting the
+        search keeps it close.
+"""
+
+
+import os
+import sys
+import unittest
+
+import numpy
+
+from sklearn.base import clone
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import random_posts
+from sparse_classifier import SparseKNeighborsClassifier
+
+
+
+# Test Sparse K Neighbors Classifier {{{
+class TestSparseKNeighborsClassifier( unittest.TestCase ):
+
+    def test_exact_search_matches_brute_force( self ):
+        data    = random_posts( 150 )
+        queries = random_posts( 40, seed=1 )
+        labels  = numpy.arange( 150 ) % 3
+        k = 5
+
+        # brute force majority vote over the k most similar posts
+        similarities = (queries * data.T).toarray()
+        expected = []
+        for row in similarities:
+            votes = numpy.bincount( labels[numpy.argsort( -row )[:k]],
+                                    minlength=3 )
+            expected.append( numpy.argmax( votes ) )
+
+        for block_size in [7, 1000]:
+            kn = SparseKNeighborsClassifier( n_neighbors=k,
+                                             n_candidates=150,
+                                             block_size=block_size )
+            predicted = kn.fit( data, labels ).predict( queries )
+
+            numpy.testing.assert_array_equal( predicted, expected )
+
+
+    def test_cut_search_stays_close( self ):
+        data    = random_posts( 150 )
+        labels  = numpy.arange( 150 ) % 3
+
+        exact = SparseKNeighborsClassifier( n_neighbors=1 ).fit( data, labels )
+        cut   = SparseKNeighborsClassifier( n_neighbors=1, query_terms=3,
+                                            postings=20 ).fit( data, labels )
+
+        # every training post is its own nearest neighbor either way
+        numpy.testing.assert_array_equal( exact.predict( data ), labels )
+        numpy.testing.assert_array_equal( cut.predict( data ), labels )
+
+
+    def test_string_labels_and_clone( self ):
+        data   = random_posts( 60 )
+        labels = numpy.array( ["cooking", "gaming", "math"] )[
+            numpy.arange( 60 ) % 3]
+
+        # cloned for cross validation folds, keeping its parameters
+        kn = clone( SparseKNeighborsClassifier( n_neighbors=1,
+                                                weights="similarity" ) )
+        self.assertEqual( kn.get_params()["weights"], "similarity" )
+
+        kn.fit( data, labels )
+        numpy.testing.assert_array_equal( kn.predict( data ), labels )
+        self.assertEqual( kn.score( data, labels ), 1.0 )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
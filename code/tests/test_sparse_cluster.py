@@ -0,0 +1,265 @@
+"""
+Date:   2026-10-18
+Desc:   Check the sparse clusterers against their dense counterparts in
+        scikit-learn, and that their block size never changes the result.
+"""
+
+
+import os
+import sys
+import unittest
+
+import numpy
+from scipy.sparse.csgraph import connected_components
+
+from sklearn.cluster import DBSCAN, MeanShift
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import random_posts, grouped_posts, same_partition
+from sparse_cluster import SparseDBSCAN, SparseAffinityPropagation
+from sparse_cluster import SparseSpectralClustering, ConnectedWard
+from sparse_cluster import ward_clusterer, ParallelMeanShift
+import sparse_cluster as sparse_cluster_module
+
+
+
+# Test Sparse DBSCAN {{{
+class TestSparseDBSCAN( unittest.TestCase ):
+
+    def test_matches_dbscan( self ):
+        data = random_posts( 150 )
+
+        distances = 1.0 - (data * data.T).toarray()
+        distances[distances < 0] = 0
+
+        for (eps, min_samples) in [(0.4, 3), (0.5, 5)]:
+            expected = DBSCAN( eps=eps, min_samples=min_samples,
+                               metric="precomputed" ).fit( distances )
+
+            for block_size in [7, 1000]:
+                db = SparseDBSCAN( eps=eps, min_samples=min_samples,
+                                   block_size=block_size ).fit( data )
+
+                self.assertEqual( sorted( db.core_sample_indices_ ),
+                                  sorted( expected.core_sample_indices_ ) )
+
+                # border points reached from two clusters may go either way,
+                # so only compare the core points and the noise
+                core = expected.core_sample_indices_
+                self.assertTrue( same_partition( db.labels_[core],
+                                                 expected.labels_[core] ) )
+                numpy.testing.assert_array_equal( db.labels_ == -1,
+                                                  expected.labels_ == -1 )
+# }}}
+
+
+
+# Test Sparse Affinity Propagation {{{
+class TestSparseAffinityPropagation( unittest.TestCase ):
+
+    def test_block_size_unchanged( self ):
+        data = random_posts( 200 )
+
+        fits = [SparseAffinityPropagation( n_neighbors=8, damping=0.7,
+                                           block_size=block_size ).fit( data )
+                for block_size in [1, 13, 1000]]
+
+        for ap in fits[1:]:
+            numpy.testing.assert_array_equal( ap.labels_, fits[0].labels_ )
+            self.assertEqual( ap.n_iter_, fits[0].n_iter_ )
+
+
+    def test_labels_exemplars( self ):
+        data = random_posts( 200 )
+        ap = SparseAffinityPropagation( n_neighbors=8, damping=0.7 ).fit( data )
+
+        centers = ap.cluster_centers_indices_
+        self.assertTrue( len( centers ) > 0 )
+        numpy.testing.assert_array_equal( ap.labels_[centers],
+                                          numpy.arange( len( centers ) ) )
+
+        # every post joins its most similar exemplar
+        similarities = (data * data[centers].T).toarray()
+        best = similarities.max( axis=1 )
+        numpy.testing.assert_allclose(
+            similarities[numpy.arange( data.shape[0] ), ap.labels_], best )
+# }}}
+
+
+
+# Test Sparse Spectral Clustering {{{
+class TestSparseSpectralClustering( unittest.TestCase ):
+
+    def setUp( self ):
+        (self.data, self.labels) = grouped_posts()
+
+
+    def test_recovers_groups( self ):
+        for (solver, n_landmarks, use_graph) in [("lobpcg", 0,  True),
+                                                 ("lobpcg", 30, True),
+                                                 ("amg",    30, True),
+                                                 ("lobpcg", 30, False)]:
+            sc = SparseSpectralClustering( n_clusters=3, n_neighbors=8,
+                                           n_landmarks=n_landmarks,
+                                           eigen_solver=solver,
+                                           use_graph=use_graph )
+            sc.fit( self.data )
+
+            self.assertEqual( sc.embedding_.shape, (120, 3) )
+            self.assertTrue( same_partition( sc.labels_, self.labels ),
+                             (solver, n_landmarks, use_graph) )
+
+
+    def test_solvers_agree( self ):
+        sc    = SparseSpectralClustering( n_clusters=3, n_neighbors=8,
+                                          max_iter=1000, tol=1e-8 )
+        graph = sc.affinity( random_posts( 150 ) )
+        self.assertEqual( connected_components( graph )[0], 1 )
+
+        # the same leading eigenvectors, up to a rotation among them
+        spaces = []
+        for solver in ["arpack", "lobpcg", "amg"]:
+            sc.eigen_solver = solver
+            vectors = sc.embed( graph, None, numpy.random.RandomState( 0 ) )
+            spaces.append( numpy.linalg.qr( vectors )[0] )
+
+        for space in spaces[1:]:
+            cosines = numpy.linalg.svd( numpy.dot( spaces[0].T, space ),
+                                        compute_uv=False )
+            numpy.testing.assert_allclose( cosines, 1.0, atol=1e-4 )
+
+
+    def test_affinity( self ):
+        data = random_posts( 100 )
+
+        graphs = [SparseSpectralClustering( n_neighbors=6,
+                                            block_size=block_size )
+                  .affinity( data ) for block_size in [7, 1000]]
+
+        # symmetric and non-negative, whatever the block size
+        for graph in graphs:
+            self.assertEqual( abs( graph - graph.T ).max(), 0 )
+            self.assertTrue( (graph.data > 0).all() )
+        self.assertEqual( abs( graphs[0] - graphs[1] ).max(), 0 )
+
+
+    def test_small_input( self ):
+        (data, labels) = grouped_posts( n_per_group=3 )
+
+        sc = SparseSpectralClustering( n_clusters=3, n_neighbors=2 )
+        self.assertTrue( same_partition( sc.fit( data ).labels_, labels ) )
+# }}}
+
+
+
+# Test Connected Ward {{{
+class TestConnectedWard( unittest.TestCase ):
+
+    def setUp( self ):
+        (data, self.labels) = grouped_posts()
+        self.data = data.toarray()
+
+
+    def test_recovers_groups( self ):
+        for n_subclusters in [0, 30, 1000]:
+            wh = ConnectedWard( n_clusters=3, n_neighbors=5,
+                                n_subclusters=n_subclusters, block_size=7 )
+
+            labels = wh.fit( self.data ).labels_
+            self.assertEqual( len( labels ), 120 )
+            self.assertTrue( same_partition( labels, self.labels ),
+                             n_subclusters )
+
+
+    def test_components_chained( self ):
+        wh = ConnectedWard( n_neighbors=3 )
+
+        # each group alone is linked, and the chain joins them
+        graph = wh.connectivity( self.data )
+        self.assertEqual( connected_components( graph )[0], 1 )
+        self.assertEqual( abs( graph - graph.T ).max(), 0 )
+        self.assertEqual( (graph[:40, 40:] != 0).sum(), 1 )
+
+
+    def test_ward_estimator( self ):
+        try:
+            from sklearn.cluster import AgglomerativeClustering
+        except ImportError:
+            AgglomerativeClustering = None
+
+        if AgglomerativeClustering is not None:
+            wh = ward_clusterer( 3 )
+            self.assertIsInstance( wh, AgglomerativeClustering )
+            self.assertEqual( wh.linkage, "ward" )
+
+        # releases before AgglomerativeClustering fall back on Ward
+        made = []
+        def ward( **params ):
+            made.append( params )
+            return params
+
+        saved = (sparse_cluster_module.AgglomerativeClustering,
+                 getattr( sparse_cluster_module, "Ward", None ))
+        sparse_cluster_module.AgglomerativeClustering = None
+        sparse_cluster_module.Ward = ward
+        try:
+            ward_clusterer( 4, "links" )
+        finally:
+            (sparse_cluster_module.AgglomerativeClustering,
+             sparse_cluster_module.Ward) = saved
+
+        self.assertEqual( made, [{"n_clusters": 4, "connectivity": "links"}] )
+# }}}
+
+
+
+# Test Parallel Mean Shift {{{
+class TestParallelMeanShift( unittest.TestCase ):
+
+    def setUp( self ):
+        random = numpy.random.RandomState( 0 )
+
+        # three well separated blobs, as reduced vectors
+        means = numpy.array( [[0.0, 0.0, 0.0], [4.0, 0.0, 1.0],
+                              [0.0, 5.0, -2.0]] )
+        self.labels = numpy.repeat( numpy.arange( 3 ), 50 )
+        self.points = means[self.labels] + random.randn( 150, 3 ) * 0.4
+
+
+    def test_matches_mean_shift( self ):
+        expected = MeanShift( bandwidth=1.5, bin_seeding=True ).fit(
+            self.points )
+
+        ms = ParallelMeanShift( bandwidth=1.5 ).fit( self.points )
+
+        self.assertTrue( same_partition( ms.labels_, expected.labels_ ) )
+        numpy.testing.assert_allclose(
+            sorted( map( tuple, ms.cluster_centers_ ) ),
+            sorted( map( tuple, expected.cluster_centers_ ) ), atol=1e-2 )
+
+
+    def test_workers_unchanged( self ):
+        fits = [ParallelMeanShift( n_jobs=n_jobs ).fit( self.points )
+                for n_jobs in [1, 2]]
+
+        self.assertTrue( same_partition( fits[0].labels_, self.labels ) )
+        numpy.testing.assert_array_equal( fits[1].labels_, fits[0].labels_ )
+        numpy.testing.assert_allclose( fits[1].cluster_centers_,
+                                       fits[0].cluster_centers_ )
+
+
+    def test_seeding( self ):
+        binned = ParallelMeanShift( bandwidth=1.5 ).fit( self.points )
+        every  = ParallelMeanShift( bandwidth=1.5, bin_seeding=False ).fit(
+            self.points )
+
+        # seeding from bins finds the same clusters as seeding from points
+        self.assertTrue( same_partition( binned.labels_, every.labels_ ) )
+        self.assertTrue( same_partition( binned.labels_, self.labels ) )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
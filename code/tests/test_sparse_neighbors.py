@@ -0,0 +1,76 @@
+"""
+Date:   2026-10-18
+Desc:   Check the blocked sparse neighbor searches against brute force over
+        the full cosine similarity matrix, and that their block size never
+        changes the result.
+"""
+
+
+import os
+import sys
+import unittest
+
+import numpy
+import scipy.sparse
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import random_posts
+from sparse_neighbors import knn_graph, radius_graph, within_rows
+
+
+
+# Test Sparse Neighbors {{{
+class TestSparseNeighbors( unittest.TestCase ):
+
+    def setUp( self ):
+        self.data    = random_posts( 120 )
+        self.queries = random_posts( 30, seed=1 )
+
+
+    def test_knn_graph( self ):
+        k = 5
+        similarities = (self.queries * self.data.T).toarray()
+
+        for block_size in [1, 7, 1000]:
+            graph = knn_graph( self.data, k, block_size,
+                               queries=self.queries ).toarray()
+
+            for (row, expected) in enumerate( similarities ):
+                found = numpy.flatnonzero( graph[row] )
+                best  = numpy.argsort( -expected )[:k]
+
+                self.assertEqual( sorted( found ), sorted( best ) )
+                numpy.testing.assert_allclose( graph[row, found],
+                                               expected[found] )
+
+
+    def test_radius_graph( self ):
+        radius   = 0.6
+        expected = (self.data * self.data.T).toarray() >= 1.0 - radius
+        expected[numpy.diag_indices_from( expected )] = True
+
+        for block_size in [1, 7, 1000]:
+            graph = radius_graph( self.data, radius, block_size )
+
+            self.assertTrue( (graph.data == 1).all() )
+            numpy.testing.assert_array_equal( graph.toarray() > 0, expected )
+
+
+    def test_within_rows( self ):
+        block = scipy.sparse.csr_matrix( numpy.array( [[0.9, 0.0, 0.2],
+                                                       [0.0, 0.0, 0.0],
+                                                       [0.1, 0.5, 0.6]] ) )
+
+        kept = within_rows( block, 0.5 )
+
+        # stored entries under the threshold are dropped, not zeroed
+        self.assertEqual( kept.nnz, 3 )
+        numpy.testing.assert_array_equal( kept.toarray(),
+                                          [[1, 0, 0], [0, 0, 0], [0, 1, 1]] )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Date:   2026-10-18
+Desc:   Check that streamed training splits every site's posts the same way
+        however many sites are read at once, never holds more sites open
+        than allowed, and trains every streamed model.
+"""
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+import stream_classifier as stream_module
+from stream_classifier import iter_stream, stream_classification, MODELS
+from vectorize_data import list_sites, iter_posts
+
+
+
+# Test Stream Classifier {{{
+class TestStreamClassifier( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root     = tempfile.mkdtemp()
+        self.data_dir = os.path.join( self.root, "data" )
+        write_corpus( self.data_dir, n_posts=200 )
+
+        self.config = make_config( self.data_dir )
+        self.sites  = list_sites( self.config )
+
+        # count the sites being read at any one time
+        self.open = [0, 0]
+
+        def counting( fullpath, config ):
+            self.open[0] += 1
+            self.open[1]  = max( self.open )
+            try:
+                for post in iter_posts( fullpath, config ):
+                    yield post
+            finally:
+                self.open[0] -= 1
+
+        stream_module.iter_posts = counting
+
+
+    def tearDown( self ):
+        stream_module.iter_posts = iter_posts
+        shutil.rmtree( self.root )
+
+
+    def stream( self, held_out, **options ):
+        """
+        Stream: every (label, post) pair streamed under the given options,
+        checking the size of each chunk on the way.
+        """
+
+        config = make_config( self.data_dir, **options )
+        chunk_size = config.getint( "stream", "chunk_size" )
+
+        pairs = []
+        for (posts, labels) in iter_stream( self.sites, config, held_out ):
+            self.assertEqual( len( posts ), len( labels ) )
+            self.assertTrue( 0 < len( posts ) <= chunk_size )
+            pairs.extend( zip( labels, posts ) )
+
+        return sorted( pairs )
+
+
+    def test_split_independent_of_max_open( self ):
+        every = sorted( (category, post)
+                        for (fullpath, category) in self.sites
+                        for post in iter_posts( fullpath, self.config ) )
+
+        splits = []
+        for max_open in [1, 2, 0]:
+            self.open = [0, 0]
+            options = {"stream_chunk_size": 50, "stream_max_open": max_open}
+
+            training = self.stream( False, **options )
+            held_out = self.stream( True, **options )
+
+            # every post goes one way or the other
+            self.assertEqual( sorted( training + held_out ), every )
+            splits.append( held_out )
+
+            # never more sites open than allowed
+            self.assertEqual( self.open,
+                              [0, max_open if max_open > 0 else 3] )
+
+        self.assertEqual( splits[1], splits[0] )
+        self.assertEqual( splits[2], splits[0] )
+
+        # about the configured share is held out
+        share = len( splits[0] ) / float( len( every ) )
+        self.assertTrue( 0.1 < share < 0.3, share )
+
+
+    def test_chunks_mix_sites( self ):
+        config = make_config( self.data_dir, stream_chunk_size=30,
+                              stream_max_open=3 )
+
+        (posts, labels) = next( iter_stream( self.sites, config, False ) )
+        self.assertEqual( len( set( labels ) ), 3 )
+
+
+    def test_trains_every_model( self ):
+        metrics_file = os.path.join( self.root, "metrics.jsonl" )
+        config = make_config( self.data_dir, stream_chunk_size=40,
+                              stream_max_open=2, stream_n_epochs=2,
+                              output_metrics_file=metrics_file )
+
+        results = stream_classification( MODELS, config )
+
+        self.assertEqual( [name for (name, values) in results], MODELS )
+        for (name, values) in results:
+            self.assertTrue( values["accuracy"] > 0.9, (name, values) )
+
+        with open( metrics_file ) as f:
+            records = [json.loads( line ) for line in f]
+        self.assertEqual( [record["algorithm"] for record in records],
+                          ["stream_%s" % name for name in MODELS] )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Date:   2026-10-18
+Desc:   Check that sweeps run every combination of grid values once,
+        vectorizing once per [tfidf] setting, and skip stored results.
+"""
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import ConfigParser
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+import sweep as sweep_module
+from sweep import read_grid, expand_grid, sweep, load_results
+
+
+
+# Test Sweep {{{
+class TestSweep( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root     = tempfile.mkdtemp()
+        self.data_dir = os.path.join( self.root, "data" )
+        write_corpus( self.data_dir )
+
+        self.models  = os.path.join( self.root, "models" )
+        self.results = os.path.join( self.root, "results.jsonl" )
+
+        self.config = make_config( self.data_dir,
+                                   output_model_dir=self.models,
+                                   kmeans_init="k-means++",
+                                   kmeans_n_init=1,
+                                   kmeans_init_size=60,
+                                   kmeans_batch_size=20 )
+
+        # count the vectorizations
+        self.vectorized = []
+        self.vectorize_data = sweep_module.vectorize_data
+
+        def counting( config ):
+            self.vectorized.append( config.get( "tfidf", "min_df" ) )
+            return self.vectorize_data( config )
+
+        sweep_module.vectorize_data = counting
+
+
+    def tearDown( self ):
+        sweep_module.vectorize_data = self.vectorize_data
+        shutil.rmtree( self.root )
+
+
+    def test_read_grid( self ):
+        sweep_config = ConfigParser.ConfigParser( allow_no_value=True )
+        sweep_config.add_section( "sweep" )
+        sweep_config.set( "sweep", "results_file", "results.jsonl" )
+        sweep_config.add_section( "kmeans" )
+        sweep_config.set( "kmeans", "n_init", "1, 5,10" )
+
+        self.assertEqual( read_grid( sweep_config ),
+                          [("kmeans", "n_init", ["1", "5", "10"])] )
+
+
+    def test_expand_grid( self ):
+        grid = [("tfidf", "min_df", ["2", "3"]),
+                ("dbscan", "eps", ["0.3", "0.5", "0.7"])]
+
+        configs = expand_grid( self.config, grid )
+
+        self.assertEqual( sorted( (config.get( "tfidf", "min_df" ),
+                                   config.get( "dbscan", "eps" ))
+                                  for config in configs ),
+                          sorted( (min_df, eps) for min_df in ["2", "3"]
+                                  for eps in ["0.3", "0.5", "0.7"] ) )
+
+        # models are never saved, and the base configuration is untouched
+        for config in configs:
+            self.assertEqual( config.get( "output", "model_dir" ), "" )
+        self.assertEqual( self.config.get( "output", "model_dir" ),
+                          self.models )
+        self.assertFalse( self.config.has_section( "dbscan" ) )
+
+
+    def test_runs_each_combination_once( self ):
+        grid = [("tfidf", "min_df", ["2", "3"]),
+                ("kmeans", "n_init", ["1", "2"])]
+
+        results = sweep( "cluster", ["kmeans"], self.config, grid,
+                         self.results )
+
+        # four runs over two vectorizations
+        self.assertEqual( len( results ), 4 )
+        self.assertEqual( sorted( self.vectorized ), ["2", "3"] )
+        self.assertEqual( len( load_results( self.results ) ), 4 )
+        self.assertFalse( os.path.exists( self.models ) )
+
+        for (label, metrics) in results:
+            self.assertTrue( label.startswith( "kmeans [tfidf.min_df=" ) )
+            self.assertIn( "v_measure", metrics )
+
+        # stored runs are skipped, without vectorizing
+        self.vectorized = []
+        self.assertEqual( sweep( "cluster", ["kmeans"], self.config, grid,
+                                 self.results ), [] )
+        self.assertEqual( self.vectorized, [] )
+
+        # only the new values run
+        grid[1] = ("kmeans", "n_init", ["1", "2", "3"])
+        results = sweep( "cluster", ["kmeans"], self.config, grid,
+                         self.results )
+
+        self.assertEqual( len( results ), 2 )
+        self.assertEqual( sorted( self.vectorized ), ["2", "3"] )
+
+        with open( self.results ) as f:
+            records = [json.loads( line ) for line in f]
+        self.assertEqual( len( records ), 6 )
+        self.assertEqual( len( set( record["key"] for record in records ) ), 6 )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+"""
+Date:   2026-10-18
+Desc:   Check that ingestion reads every site the same way whether it is done
+        serially or by a pool of workers, and samples the posts it promises.
+"""
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import threading
+
+from lxml import etree
+
+sys.path.insert( 0, os.path.join( os.path.dirname( __file__ ), ".." ) )
+
+from corpus import write_corpus, make_config
+from test_profiling import RecordingHandler
+import vectorize_data as vectorize_module
+from vectorize_data import vectorize_data, list_sites, map_sites, read_site
+from vectorize_data import iter_posts, iter_clean_posts
+
+
+
+# Slow Site {{{
+def slow_site( job ):
+    """
+    Slow Site: a worker taking longer over the sites listed first, so a pool
+    finishes them last. Returns the category and worker process id.
+    """
+
+    (fullpath, category, config, handle) = job
+
+    time.sleep( {"cooking": 0.3, "gaming": 0.15}.get( category, 0.0 ) )
+
+    return (category, os.getpid())
+# }}}
+
+
+
+# Test Map Sites {{{
+class TestMapSites( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        write_corpus( self.root )
+
+        self.serial   = make_config( self.root )
+        self.parallel = make_config( self.root, input_n_workers=3 )
+        self.sites    = list_sites( self.serial )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_parallel_keeps_site_order( self ):
+        results = list( map_sites( slow_site, self.sites, self.parallel ) )
+
+        self.assertEqual( [category for (category, pid) in results],
+                          [category for (fullpath, category) in self.sites] )
+
+        # the sites really were spread over worker processes
+        pids = set( pid for (category, pid) in results )
+        self.assertNotIn( os.getpid(), pids )
+        self.assertTrue( len( pids ) > 1 )
+
+
+    def test_parallel_reads_match_serial( self ):
+        self.assertEqual(
+            list( map_sites( read_site, self.sites, self.parallel ) ),
+            list( map_sites( read_site, self.sites, self.serial ) ) )
+
+        (labels, data) = vectorize_data( self.parallel )
+        (serial_labels, serial_data) = vectorize_data( self.serial )
+
+        self.assertEqual( labels, serial_labels )
+        self.assertEqual( (data - serial_data).nnz, 0 )
+# }}}
+
+
+
+# Test Iterate Posts {{{
+class TestIteratePosts( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        write_corpus( self.root )
+
+        self.config = make_config( self.root )
+        self.sites  = list_sites( self.config )
+
+        # a dump cut off part way through a row
+        self.broken = os.path.join( self.root, "broken.xml" )
+        with open( self.sites[0][0] ) as f:
+            text = f.read()
+        with open( self.broken, "w" ) as f:
+            f.write( text[ : len( text ) // 2 ] )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def test_rows_cleared_as_read( self ):
+        parsed = []
+        iterparse = etree.iterparse
+
+        # record every row iterparse hands out
+        def recording( *args, **kwargs ):
+            for (event, element) in iterparse( *args, **kwargs ):
+                parsed.append( element )
+                yield (event, element)
+
+        vectorize_module.etree.iterparse = recording
+        try:
+            with open( self.sites[0][0] ) as f:
+                for (post_id, body) in iter_clean_posts( f ):
+
+                    # the row is emptied, and the rows before it dropped
+                    row = parsed[-1]
+                    self.assertEqual( len( row.attrib ), 0 )
+                    self.assertIsNone( row.getprevious() )
+                    self.assertTrue( body )
+        finally:
+            vectorize_module.etree.iterparse = iterparse
+
+        # every tenth row is empty and skipped
+        self.assertEqual( len( parsed ), 60 )
+
+
+    def test_file_closed_on_parse_error( self ):
+        for config in [self.config,
+                       make_config( self.root, profile_enabled="true" )]:
+            handle = open( self.broken )
+
+            with self.assertRaises( etree.XMLSyntaxError ):
+                list( iter_posts( self.broken, config, handle ) )
+
+            self.assertTrue( handle.closed )
+
+
+    def test_phases_reported_on_parse_error( self ):
+        config  = make_config( self.root, profile_enabled="true" )
+        threads = threading.active_count()
+
+        with RecordingHandler() as handler:
+            with self.assertRaises( etree.XMLSyntaxError ):
+                list( iter_posts( self.broken, config ) )
+
+        # both phases report, and stop watching memory
+        phases = [message.split( ":" )[0] for message in handler.messages
+                  if message.startswith( "Phase " )]
+        self.assertEqual( phases, ["Phase strip_html (%s)" % self.broken,
+                                   "Phase read_posts (%s)" % self.broken] )
+        self.assertEqual( threading.active_count(), threads )
+
+
+    def test_no_memory_thread_unless_profiling( self ):
+        threads = threading.active_count()
+
+        posts = iter_posts( self.sites[0][0], self.config )
+        next( posts )
+        self.assertEqual( threading.active_count(), threads )
+
+        posts.close()
+# }}}
+
+
+
+# Test Sampling {{{
+class TestSampling( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = tempfile.mkdtemp()
+        write_corpus( self.root )
+
+        self.sites = list_sites( make_config( self.root ) )
+
+
+    def tearDown( self ):
+        shutil.rmtree( self.root )
+
+
+    def read( self, **options ):
+        """
+        Read: the posts of every site, under the given options.
+        """
+
+        config = make_config( self.root, **options )
+        return [list( iter_posts( fullpath, config ) )
+                for (fullpath, category) in self.sites]
+
+
+    def test_first_by_default( self ):
+        every  = self.read()
+        sample = self.read( tfidf_sample_size=7 )
+
+        self.assertEqual( sample, [posts[:7] for posts in every] )
+        self.assertEqual( self.read( tfidf_sample_size=7,
+                                     tfidf_sampling="first" ), sample )
+
+
+    def test_reservoir_sample( self ):
+        every = self.read()
+        first = self.read( tfidf_sample_size=7, tfidf_sampling="reservoir" )
+
+        # the same seed draws the same sample, another seed does not
+        self.assertEqual( self.read( tfidf_sample_size=7,
+                                     tfidf_sampling="reservoir" ), first )
+        self.assertNotEqual( self.read( tfidf_sample_size=7,
+                                        tfidf_sampling="reservoir",
+                                        tfidf_sample_seed=1 ), first )
+        self.assertNotEqual( first, [posts[:7] for posts in every] )
+
+        for (sample, posts) in zip( first, every ):
+            self.assertEqual( len( sample ), 7 )
+
+            # a sample of the posts, kept in file order
+            positions = [posts.index( post ) for post in sample]
+            self.assertEqual( positions, sorted( positions ) )
+# }}}
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,79 +8,290 @@ Desc:   Read in an input directory of files and vectorize them into memory.
 import os
 import sys
 import time
+import zlib
 import random
+import itertools
 import logging
 import ConfigParser
+import multiprocessing
 
 import numpy
-
-from s3file import s3open
+import scipy.sparse
+
+from options import get_option
+from features import make_tfidf_vectorizer, HashingTfidf
+from features import vectorizer_from_arrays
+from corpus_cache import load_corpus, store_corpus
+from html_text import strip_html
+from memory import MemoryWatch
+from post_index import load_index, RowReader
+from post_store import load_store
+from s3_store import make_store, prefetch
+from profiling import Phase, CountingReader
 
 from collections import Counter
 
 from lxml import etree
-from lxml.html import document_fromstring
 
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 
 
 
 # Vectorize Data {{{
-def vectorize_data( config ):
+def vectorize_data( config, return_vectorizer=False ):
     """
     Vectorize Data: read in all Posts.xml files from a directory of
     directories, ie. the main data dump directory. Read entire dataset into
     memory, then perform TF-IDF vectorization and clean the data further.
 
-    config: ConfigParser with documented fields
+    config:            ConfigParser with documented fields
+    return_vectorizer: also return the fitted vectorizer, as a third value
 
     """
 
     # Read in necessary config values.
     in_protocol   = config.get("input", "in_protocol")
-    data_dir      = config.get("input", "data_dir")
-    post_file     = config.get("input", "post_file")
-
-    s3_url        = config.get("input", "s3_url")
-    s3_index_file = config.get("input", "s3_index_file")
-
-    max_df   = config.getfloat("tfidf", "max_df")
-    min_df     = config.getint("tfidf", "min_df")
+    engine        = get_option( config, "tfidf", "engine", "tfidf" )
 
     # Verify that we have a valid input protocol, default to disk.
     if in_protocol not in ["s3", "disk"]:
         logging.error("Invalid input protocol.")
         sys.exit(1)
 
+    # Verify that we have a valid vectorization engine.
+    if engine not in ["tfidf", "hashing"]:
+        logging.error("Invalid vectorization engine.")
+        sys.exit(1)
+
+
+    # Figure out which sites we're going to read in, in a fixed order.
+    sites = list_sites( config )
+
+    # Skip parsing and vectorizing entirely if the corpus is already cached.
+    cached = load_corpus( config, sites )
+    if cached is not None:
+        (labels, vectorized_posts, arrays) = cached
+
+        logging.info("  Number of entries:    %d." % vectorized_posts.shape[0])
+        logging.info("  Number of features:   %d." % vectorized_posts.shape[1])
+        logging.info("  Number of categories: %d." % len( set( labels ) ) )
+
+        if return_vectorizer:
+            vectorizer = vectorizer_from_arrays( arrays, config )
+            return (labels, vectorized_posts, vectorizer)
+
+        return (labels, vectorized_posts)
+
+
+    # Hash posts into a fixed feature space as they stream in, or collect
+    # them all in memory and fit a vocabulary over them.
+    with Phase( "vectorize_data", config ) as phase:
+        if engine == "hashing":
+            (labels, vectorized_posts, vectorizer) = vectorize_hashed( sites,
+                                                                       config )
+        else:
+            (labels, vectorized_posts, vectorizer) = vectorize_posts( sites,
+                                                                      config )
+        phase.add( posts=len( labels ) )
+
+    logging.info("Data vectorized.")
+    logging.info("  Number of entries:    %d." % vectorized_posts.shape[0])
+    logging.info("  Number of features:   %d." % vectorized_posts.shape[1])
+    logging.info("  Number of categories: %d." % len( set( labels ) ) )
+
+
+    # save the result so later runs can skip straight to the algorithms
+    store_corpus( config, sites, labels, vectorized_posts, vectorizer )
+
+    if return_vectorizer:
+        return (labels, vectorized_posts, vectorizer)
+
+    return (labels, vectorized_posts)
+# }}}
+
+
+
+# Vectorize Posts {{{
+def vectorize_posts( sites, config ):
+    """
+    Vectorize Posts: read every post into memory, then fit a TF-IDF
+    vectorizer over the whole collection. Returns a (labels, data,
+    vectorizer) tuple.
+
+    sites:  list of (fullpath, category) tuples, as from list_sites
+    config: ConfigParser with documented fields
+
+    """
 
     # Set up empty data stores
     posts = []      # store plain post data
     labels = []     # list of labels, corresponds to each post
 
+    for (category, post_data) in map_sites( read_site, sites, config ):
 
-    # Store Posts function {{{
-    def store_posts( fullpath, category ):
-        """
-        Store the documents in a dictionary based on their category.
+        # store the post data in the posts list
+        posts.extend( post_data )
 
-        in_file: the input filename to read (for category)
-        category: the category (label) of these posts
+        # generate an appropriate num of labels for the posts
+        num_posts = len( post_data )
+        labels.extend( [category] * num_posts )
 
-        """
+        logging.debug("Read %d posts from %s." % (num_posts, category) )
+
+
+    # cap the size of each category before fitting
+    keep = stratify( labels, config )
+    if keep is not None:
+        posts  = [posts[ i ] for i in keep]
+        labels = [labels[ i ] for i in keep]
+
+
+    # create a tf_idf vectorizer machine
+    tfidf_vectorizer = make_tfidf_vectorizer( config )
+
+
+    # remove HTML entities and perform stop word removal
+    logging.info("Vectorizing dataset.")
+    with Phase( "tfidf_fit", config ) as phase:
+        vectorized_posts = tfidf_vectorizer.fit_transform( posts )
+        phase.add( posts=len( posts ) )
+
+    return (labels, vectorized_posts, tfidf_vectorizer)
+# }}}
 
-        # read in the post data and store it in the posts list
-        post_data = read_posts( fullpath, config )
-        posts.extend( post_data )
+
+
+# Vectorize Hashed {{{
+def vectorize_hashed( sites, config ):
+    """
+    Vectorize Hashed: stream posts through a hashing vectorizer, building the
+    term count matrix in chunks without ever holding the raw posts or a
+    vocabulary in memory. Document frequencies are then computed over the
+    counts for pruning and IDF weighting. Returns a (labels, data,
+    vectorizer) tuple.
+
+    sites:  list of (fullpath, category) tuples, as from list_sites
+    config: ConfigParser with documented fields
+
+    """
+
+    counts = []     # term count matrices, one per site
+    labels = []     # list of labels, corresponds to each post
+
+    logging.info("Vectorizing dataset.")
+
+    for (category, site_counts) in map_sites( hash_site, sites, config ):
+
+        counts.append( site_counts )
 
         # generate an appropriate num of labels for the posts
-        num_posts = len( post_data )
+        num_posts = site_counts.shape[0]
         labels.extend( [category] * num_posts )
 
         logging.debug("Read %d posts from %s." % (num_posts, category) )
 
+    counts = scipy.sparse.vstack( counts, format="csr" )
+
+    # cap the size of each category before fitting
+    keep = stratify( labels, config )
+    if keep is not None:
+        counts = counts[ keep ]
+        labels = [labels[ i ] for i in keep]
+
+    # prune by document frequency and apply the idf weighting
+    vectorizer = HashingTfidf( config )
+    with Phase( "tfidf_fit", config ) as phase:
+        vectorized_posts = vectorizer.fit_transform_counts( counts )
+        phase.add( posts=counts.shape[0] )
+
+    return (labels, vectorized_posts, vectorizer)
+# }}}
+
+
+
+# Map Sites {{{
+def map_sites( worker, sites, config ):
+    """
+    Map Sites: apply a worker function to every site, yielding its results
+    in site order. With more than one worker configured, each site is
+    handled in a separate process; the pool hands results back in
+    submission order, so labels stay aligned with the posts. Reading from
+    s3 with a single worker, the next few sites are downloaded in the
+    background while the current one is parsed.
+
+    worker: module-level function taking a (fullpath, category, config,
+            handle) job, where handle is an open file or None
+    sites:  list of (fullpath, category) tuples, as from list_sites
+    config: ConfigParser with documented fields
+
+    """
+
+    in_protocol = config.get("input", "in_protocol")
+    n_workers   = get_option( config, "input", "n_workers", 1 )
+    s3_prefetch = get_option( config, "input", "s3_prefetch", 0 )
+    s3_buffer   = get_option( config, "input", "s3_buffer_mb", 256 )
+
+    jobs = [(fullpath, category, config, None)
+            for (fullpath, category) in sites]
+
+    # Prefetched s3 ingestion {{{
+    if in_protocol == "s3" and s3_prefetch > 0 and n_workers <= 1:
+        logging.info("Prefetching up to %d sites ahead." % s3_prefetch)
+
+        urls = [fullpath for (fullpath, category) in sites]
+        fetched = prefetch( make_store( config ), urls, s3_prefetch,
+                            s3_buffer * 1024 * 1024 )
+        fetched = itertools.izip( sites, fetched )
+
+        for ((fullpath, category), (url, handle)) in fetched:
+            yield worker( (fullpath, category, config, handle) )
+        return
     # }}}
 
+    # Serial ingestion {{{
+    if n_workers <= 1 or len( jobs ) <= 1:
+        for job in jobs:
+            yield worker( job )
+        return
+    # }}}
+
+    # Parallel ingestion {{{
+    logging.info("Reading %d sites with %d workers." %
+                 (len( jobs ), n_workers) )
+
+    pool = multiprocessing.Pool( processes=min( n_workers, len( jobs ) ) )
+
+    try:
+        for result in pool.imap( worker, jobs ):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+    # }}}
+# }}}
+
+
+
+# List Sites {{{
+def list_sites( config ):
+    """
+    List Sites: enumerate the Posts.xml files making up the corpus, either
+    from the s3 index file or the local data directory, in a fixed order.
+    Returns a list of (fullpath, category) tuples.
+
+    config: ConfigParser with documented fields
+
+    """
+
+    # Read in necessary config values.
+    in_protocol   = config.get("input", "in_protocol")
+    data_dir      = config.get("input", "data_dir")
+    post_file     = config.get("input", "post_file")
+
+    s3_url        = config.get("input", "s3_url")
+    s3_index_file = config.get("input", "s3_index_file")
+
+    sites = []
 
     # S3 Data {{{
     # Set up an s3 connection for reading the input over an s3 stream.
@@ -89,16 +300,20 @@ def vectorize_data( config ):
 
         # Read in the index file (since this is s3)
         index_filename = s3_url + "/" + s3_index_file
-        index_file = s3open( index_filename )
+        index_file = make_store( config ).open( index_filename )
+
+        for f in index_file.read().splitlines():
 
-        for f in index_file.readlines():
+            f = f.strip()
+            if not f:
+                continue
 
-            f = f[:-1] # strip out newlines
             fullpath = s3_url + "/" + data_dir + "/" + f + "/" + post_file
             category  = f[ : f.index(".") ]
 
-            # store the vectors in the corpus
-            store_posts( fullpath, category )
+            sites.append( (fullpath, category) )
+
+        index_file.close()
     # }}}
 
 
@@ -108,111 +323,476 @@ def vectorize_data( config ):
         logging.info("Reading from disk.")
 
         # Loop over the contents of the data directory
-        for in_file in os.listdir( data_dir ):
+        for in_file in sorted( os.listdir( data_dir ) ):
 
             # Regenerate a full reference to the file we're reading in
             fullpath = os.path.join( data_dir, in_file, post_file )
             category  = in_file[ : in_file.index(".") ]
 
-            # store the vectors in the corpus
-            store_posts( fullpath, category )
+            sites.append( (fullpath, category) )
     # }}}
 
+    return sites
+# }}}
 
-    # create a tf_idf vectorizer machine
-    tfidf_vectorizer = TfidfVectorizer(
-        input="content",        # will pass input directly
-        encoding="ascii",       # use basic ascii encoding
-        decode_error="ignore",  # ignore decoding errors
-        strip_accents="ascii",  # strip fancy characters
-        stop_words="english",   # remove english stopwords
-        lowercase=True,         # lowercase everything
-        use_idf=True,           # inverse document frequency (weighting)
-        smooth_idf=True,        # smooth the data out
 
-        max_df=max_df,          # terms must occur in under X documents
-        min_df=min_df,          # terms must occur in at least X documents
-    )
 
+# Read Site {{{
+def read_site( job ):
+    """
+    Read Site: worker entry point for parallel ingestion. Parses a single
+    site's Posts.xml and hands back its category alongside the posts.
 
-    # remove HTML entities and perform stop word removal
-    logging.info("Vectorizing dataset.")
-    vectorized_posts = tfidf_vectorizer.fit_transform( posts )
+    job: a (fullpath, category, config, handle) tuple
 
-    logging.info("Data vectorized.")
-    logging.info("  Number of entries:    %d." % vectorized_posts.shape[0])
-    logging.info("  Number of features:   %d." % vectorized_posts.shape[1])
-    logging.info("  Number of categories: %d." % len( set( labels ) ) )
+    """
 
+    (fullpath, category, config, handle) = job
+    return (category, read_posts( fullpath, config, handle ))
+# }}}
 
-    return (labels, vectorized_posts)
+
+
+# Hash Site {{{
+def hash_site( job ):
+    """
+    Hash Site: worker entry point for the hashing engine. Streams a single
+    site's posts into a term count matrix, chunk by chunk.
+
+    job: a (fullpath, category, config, handle) tuple
+
+    """
+
+    (fullpath, category, config, handle) = job
+
+    hasher = HashingTfidf( config )
+    return (category, hasher.count( iter_posts( fullpath, config, handle ) ))
 # }}}
 
 
 
 # Read Posts {{{
-def read_posts( in_file, config ):
+def read_posts( in_file, config, handle=None ):
     """
     Read Posts: read in data from file, parse the XML and spit the cleaned
     output back in an array.
 
     config: ConfigParser with documented fields
+    handle: an already open (eg. prefetched) handle on in_file, if any
 
-    In order to clean posts, we remove html tags and (later) perform stop-word
-    removal.
+    """
+
+    return list( iter_posts( in_file, config, handle ) )
+# }}}
+
+
+
+# Iterate Posts {{{
+def iter_posts( in_file, config, handle=None ):
+    """
+    Iterate Posts: read in data from file, parse the XML and yield the
+    cleaned posts one at a time.
+
+    config: ConfigParser with documented fields
+    handle: an already open (eg. prefetched) handle on in_file, if any
+
+    If a sample size is configured, posts are truncated to the first
+    sample_size posts, or with reservoir sampling drawn uniformly at random
+    in a single pass with a seeded reservoir, still yielded in file order.
+
+    With the binary post format, sites converted by convert_corpus.py are
+    read from their pre-parsed store instead of the XML.
     """
 
     # Read in necessary config values.
-    protocol       = config.get("input", "in_protocol")
+    protocol    = config.get("input", "in_protocol")
     sample_size = config.getint("tfidf", "sample_size")
+    sampling    = get_option( config, "tfidf", "sampling", "first" )
+    post_format = get_option( config, "input", "post_format", "xml" )
 
-    f = None # empty file handle
+    # Time reading the site, and stripping html in particular.
+    read_phase  = Phase( "read_posts", config, in_file )
+    strip_phase = Phase( "strip_html", config, in_file )
+    read_phase.start()
 
-    # Reading in from an s3 bucket
-    if protocol == "s3":
-        f = s3open( in_file )
+    # Measure the memory this site takes on its own, when profiling.
+    memory = None
+    if read_phase.enabled:
+        memory = MemoryWatch()
+        memory.start()
 
-    # Reading in from local disk storage
-    else:
-        f = open( in_file, 'r' )
+    f = handle # already open file handle, if any
+    store = None
+    offsets = None
+
+    try:
+        # Read the pre-parsed posts if the site has been converted.
+        if post_format == "binary" and protocol == "disk" and handle is None:
+            store = load_store( in_file )
+
+        # Seek straight to a random sample of rows if the file is indexed.
+        if (store is None and sample_size > 0 and sampling == "reservoir" and
+                protocol == "disk" and handle is None):
+            offsets = load_index( in_file )
+
+        if store is not None:
+            selected = store_sample( store, sample_size, sampling,
+                                     site_random( in_file, config ) )
+
+        elif offsets is not None:
+            rng = site_random( in_file, config )
+            selected = indexed_sample( in_file, offsets, sample_size, rng )
+
+        else:
+
+            # Reading in from an s3 bucket, as a stream
+            if f is None and protocol == "s3":
+                f = make_store( config ).open( in_file )
+
+            # Reading in from local disk storage
+            elif f is None:
+                f = open( in_file, 'r' )
+
+            # Count the bytes parsed when profiling
+            if read_phase.enabled:
+                f = CountingReader( f )
+
+            posts = iter_clean_rows( f, strip_phase )
+
+            # Uniform random sample of the whole file
+            if sample_size > 0 and sampling == "reservoir":
+                rng = site_random( in_file, config )
+                selected = reservoir_sample( posts, sample_size, rng )
+
+            # Only read in at most sample data points. This is only a uniform
+            # random sample if the file has been shuffled beforehand.
+            elif sample_size > 0:
+                selected = itertools.islice( posts, sample_size )
+
+            else:
+                selected = posts
+
+        # Hand back the posts, not counting the consumer's time as reading.
+        for body in selected:
+            read_phase.stop()
+            read_phase.add( posts=1 )
+
+            yield body
+
+            read_phase.start()
 
-    # logging.debug("Vectorizing over input file.")
+    # Release the site, and report its phases, even if parsing it failed
+    # part way.
+    finally:
+        if f is not None:
+            f.close()
+            read_phase.add( num_bytes=getattr( f, "count", 0 ) )
+
+        if store is not None:
+            store.close()
+
+        strip_phase.report()
+        read_phase.report()
+
+        if memory is not None:
+            memory.stop()
+            logging.debug("Parsed %s, peak memory %.1f MB (%+.1f MB)." %
+                          (in_file, memory.peak_mb, memory.delta_mb) )
+# }}}
+
+
+
+# Iterate Clean Rows {{{
+def iter_clean_rows( f, strip_phase=None ):
+    """
+    Iterate Clean Rows: parse a Posts.xml stream and yield the body of every
+    row with its html stripped, skipping empty posts.
+
+    f:           an open Posts.xml file handle
+    strip_phase: optional Phase timing the html stripping
+
+    """
+
+    for (post_id, body) in iter_clean_posts( f, strip_phase ):
+        yield body
+# }}}
+
+
+
+# Iterate Clean Posts {{{
+def iter_clean_posts( f, strip_phase=None ):
+    """
+    Iterate Clean Posts: parse a Posts.xml stream and yield an (id, body)
+    pair for every row, with the body's html stripped, skipping empty posts.
 
-    # Read in and clean the bodies of the rows.
-    posts = []
-    for event, element in etree.iterparse( f ):
+    f:           an open Posts.xml file handle
+    strip_phase: optional Phase timing the html stripping
+
+    In order to clean posts, we remove html tags and (later) perform stop-word
+    removal.
+    """
+
+    # Read in and clean the bodies of the rows. Only the end of each row is
+    # of interest, and each row is freed as soon as its body is read, along
+    # with any siblings before it, so the tree never grows with the file.
+    for event, element in etree.iterparse( f, events=("end",), tag="row" ):
 
         # Read in the row
-        body = element.get( "Body", u"" )
-        body = body.strip()
+        post_id = int( element.get( "Id", -1 ) )
+        body    = element.get( "Body", u"" )
 
-        # Strip out empty posts before processing
-        if len( body ) == 0:
-            continue
+        # Free the row and everything parsed before it
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
 
-        # Strip out html
+        if strip_phase is not None:
+            strip_phase.start()
 
-        try:
-            body = document_fromstring( body )
-            body = body.text_content()
-            body = body.encode("ascii", "ignore")
-            body = body.strip()
-        except:
-            continue
+        body = clean_body( body )
+
+        if strip_phase is not None:
+            strip_phase.stop()
+            strip_phase.add( posts=1 )
+
+        if body is not None:
+            yield (post_id, body)
+# }}}
+
+
+
+# Iterate Batches {{{
+def iter_batches( in_file, batch_size ):
+    """
+    Iterate Batches: stream the cleaned posts of a Posts.xml file, yielding
+    them in lists of at most batch_size posts.
+
+    in_file:    the Posts.xml file to read
+    batch_size: number of posts per batch
+
+    """
+
+    batch = []
+
+    with open( in_file, "r" ) as f:
+        for body in iter_clean_rows( f ):
+            batch.append( body )
+
+            if len( batch ) >= batch_size:
+                yield batch
+                batch = []
+
+    if len( batch ) > 0:
+        yield batch
+# }}}
+
+
+
+# Clean Body {{{
+def clean_body( body ):
+    """
+    Clean Body: strip the html out of a raw post body. Returns None for
+    posts which are empty, before or after processing, or unparseable.
+
+    body: the raw Body attribute of a row
+
+    """
+
+    body = body.strip()
+
+    # Strip out empty posts before processing
+    if len( body ) == 0:
+        return None
+
+    # Strip out html, skipping bodies which can't be parsed at all
+    body = strip_html( body )
+    if body is None:
+        return None
+
+    body = body.encode("ascii", "ignore")
+    body = body.strip()
+
+    # Strip out empty posts after processing
+    if len( body ) == 0:
+        return None
 
-        # Strip out empty posts after processing
-        if len( body ) == 0:
+    return body
+# }}}
+
+
+
+# Site Random {{{
+def site_random( in_file, config ):
+    """
+    Site Random: a random number generator for sampling a single site,
+    seeded from the configured seed and the site's name, so that every site
+    draws an independent but repeatable sample.
+
+    in_file: the Posts.xml file (or s3 url) of the site
+    config:  ConfigParser with documented fields
+
+    """
+
+    seed = get_option( config, "tfidf", "sample_seed", 0 )
+    site = os.path.basename( os.path.dirname( in_file ) )
+
+    return random.Random( seed ^ (zlib.crc32( site ) & 0xffffffff) )
+# }}}
+
+
+
+# Reservoir Sample {{{
+def reservoir_sample( items, sample_size, rng ):
+    """
+    Reservoir Sample: draw a uniform random sample of a stream of unknown
+    length in a single pass, holding at most sample_size items in memory.
+    Returns the sample in stream order.
+
+    items:       an iterable to sample from
+    sample_size: the number of items to keep
+    rng:         a random.Random instance
+
+    """
+
+    reservoir = []
+
+    for (index, item) in enumerate( items ):
+
+        if index < sample_size:
+            reservoir.append( (index, item) )
             continue
 
-        posts.append( body )
+        slot = rng.randint( 0, index )
+        if slot < sample_size:
+            reservoir[ slot ] = (index, item)
+
+    reservoir.sort( key=lambda pair: pair[0] )
+
+    return [item for (index, item) in reservoir]
+# }}}
+
+
+
+# Indexed Sample {{{
+def indexed_sample( in_file, offsets, sample_size, rng ):
+    """
+    Indexed Sample: draw a uniform random sample of non-empty posts from an
+    indexed Posts.xml file by seeking to randomly chosen rows, without
+    scanning the rest of the file. Returns the sample in file order.
+
+    in_file:     the Posts.xml file
+    offsets:     byte offsets of every row, as from load_index
+    sample_size: the number of posts to keep
+    rng:         a random.Random instance
+
+    """
+
+    num_rows = len( offsets )
+    reader   = RowReader( in_file )
+
+    seen   = set()
+    sample = []
+
+    # Draw rows in random batches until enough non-empty posts turn up, or
+    # until every row has been tried.
+    while len( sample ) < sample_size and len( seen ) < num_rows:
+
+        wanted = min( 2 * (sample_size - len( sample )) + 16,
+                      num_rows - len( seen ) )
+
+        # once most rows are used up, go through the rest in random order
+        if 2 * len( seen ) > num_rows:
+            batch = [row for row in xrange( num_rows ) if row not in seen]
+            rng.shuffle( batch )
+        else:
+            batch = [row for row in rng.sample( xrange( num_rows ), wanted )
+                     if row not in seen]
+
+        for row in batch:
+            seen.add( row )
+
+            body = clean_body( reader.body( offsets[ row ] ) )
+            if body is None:
+                continue
+
+            sample.append( (row, body) )
+            if len( sample ) >= sample_size:
+                break
+
+    reader.close()
+
+    sample.sort( key=lambda pair: pair[0] )
+
+    return [body for (row, body) in sample]
+# }}}
+
+
+
+# Store Sample {{{
+def store_sample( store, sample_size, sampling, rng ):
+    """
+    Store Sample: yield the posts of a binary store, or the configured
+    sample of them, in store order. The store only holds non-empty posts,
+    so a reservoir drawn over their positions picks the same posts the
+    reservoir over the parsed Posts.xml would, reading only those.
+
+    store:       an open PostStore, as from load_store
+    sample_size: the number of posts to keep, 0 for all
+    sampling:    "reservoir" for a uniform random sample, else the first
+    rng:         a random.Random instance
+
+    """
+
+    positions = xrange( len( store ) )
+
+    if sample_size > 0 and sampling == "reservoir":
+        positions = reservoir_sample( positions, sample_size, rng )
+
+    elif sample_size > 0:
+        positions = xrange( min( sample_size, len( store ) ) )
+
+    for position in positions:
+        yield store.body( position )
+# }}}
+
+
+
+# Stratify {{{
+def stratify( labels, config ):
+    """
+    Stratify: cap the number of posts in each category, drawing a seeded
+    random subset of any category above the cap. Several sites can share
+    a category (eg. meta sites). Returns the sorted indices of the posts
+    to keep, or None if no cap is configured.
+
+    labels: vector of ground-truth labels
+    config: ConfigParser with documented fields
+
+    """
+
+    category_cap = get_option( config, "tfidf", "category_cap", 0 )
+    seed         = get_option( config, "tfidf", "sample_seed", 0 )
+
+    if category_cap <= 0:
+        return None
+
+    members = {}
+    for (index, label) in enumerate( labels ):
+        members.setdefault( label, [] ).append( index )
+
+    rng  = random.Random( seed )
+    keep = []
+
+    for label in sorted( members ):
+        indices = members[ label ]
+
+        if len( indices ) > category_cap:
+            indices = rng.sample( indices, category_cap )
+            logging.debug("Capped %s at %d posts." % (label, category_cap))
 
-        # Only read in at most sample data points. We assume that the posts
-        # are in no particularly relevant order, so this simulates uniform
-        # random sampling.
-        if sample_size > 0 and len( posts ) >= sample_size:
-            break
+        keep.extend( indices )
 
-    return posts
+    return numpy.array( sorted( keep ), dtype=numpy.int64 )
 # }}}
 
 